@@ -5,6 +5,9 @@ from schema_agent.core.ir import IR
 
 
 class SchemaAdapter(ABC):
+    # Adapters that can read a tree from git objects accept emit_ir(..., git_ref=...)
+    supports_git_ref: bool = False
+
     @abstractmethod
     def emit_ir(self, repo_path: str, module_hint: str | None = None) -> IR:  # pragma: no cover - interface
         """Return normalized IR by loading models inside repo_path."""
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from importlib.abc import InspectLoader, MetaPathFinder
+from importlib.machinery import ModuleSpec
+from contextlib import contextmanager
+from typing import IO, Dict, Iterator, Optional, Set
+
+
+class GitTree:
+    """Read-only view of ``<ref>:<subdir>`` served straight from the object store."""
+
+    def __init__(self, repo_path: str, ref: str) -> None:
+        abs_path = os.path.abspath(repo_path or ".")
+        self.ref = ref
+        self.toplevel = self._git(abs_path, "rev-parse", "--show-toplevel").strip()
+        self.commit = self._git(abs_path, "rev-parse", "--verify", f"{ref}^{{commit}}").strip()
+        prefix = os.path.relpath(abs_path, self.toplevel).replace(os.sep, "/")
+        self.prefix = "" if prefix == "." else prefix.rstrip("/") + "/"
+        self._files: Optional[Dict[str, str]] = None
+        self._dirs: Optional[Set[str]] = None
+        self._batch: Optional[subprocess.Popen] = None
+
+    @staticmethod
+    def _git(cwd: str, *args: str) -> str:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+            ).stdout
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"git {' '.join(args)} failed: {e.stderr.strip()}") from e
+
+    def files(self) -> Dict[str, str]:
+        """Map of path (relative to the subdir) -> blob id, for every file in the tree."""
+        if self._files is None:
+            out = subprocess.run(
+                ["git", "ls-tree", "-r", "-z", "--full-tree", self.commit, "--", self.prefix or "."],
+                cwd=self.toplevel,
+                check=True,
+                capture_output=True,
+            ).stdout
+            files: Dict[str, str] = {}
+            for entry in out.split(b"\0"):
+                if not entry:
+                    continue
+                meta, path = entry.split(b"\t", 1)
+                _, kind, oid = meta.split(b" ")
+                if kind != b"blob":
+                    continue
+                rel = path.decode("utf-8")[len(self.prefix):]
+                files[rel] = oid.decode("ascii")
+            self._files = files
+        return self._files
+
+    def is_dir(self, path: str) -> bool:
+        if self._dirs is None:
+            dirs: Set[str] = set()
+            for f in self.files():
+                parts = f.split("/")[:-1]
+                for i in range(1, len(parts) + 1):
+                    dirs.add("/".join(parts[:i]))
+            self._dirs = dirs
+        return path in self._dirs
+
+    def read(self, path: str) -> bytes:
+        oid = self.files()[path]
+        if self._batch is None:
+            self._batch = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.toplevel,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        assert self._batch.stdin is not None and self._batch.stdout is not None
+        self._batch.stdin.write(oid.encode("ascii") + b"\n")
+        self._batch.stdin.flush()
+        header = self._batch.stdout.readline().split()
+        if len(header) != 3 or header[1] != b"blob":
+            raise RuntimeError(f"Cannot read {self.ref}:{self.prefix}{path} from git")
+        data = self._batch.stdout.read(int(header[2]))
+        self._batch.stdout.read(1)  # trailing LF
+        return data
+
+    @contextmanager
+    def open_blob(self, path: str) -> Iterator[IO[bytes]]:
+        """Stream one file of the tree without reading it into memory."""
+        proc = subprocess.Popen(
+            ["git", "cat-file", "blob", f"{self.commit}:{self.prefix}{path}"],
+            cwd=self.toplevel,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        assert proc.stdout is not None
+        try:
+            yield proc.stdout
+        finally:
+            proc.stdout.close()
+            stderr = proc.stderr.read() if proc.stderr else b""
+            if proc.wait() != 0:
+                raise RuntimeError(f"Cannot read {self.ref}:{self.prefix}{path} from git: {stderr.decode(errors='replace').strip()}")
+
+    def top_level_packages(self) -> Set[str]:
+        """Top-level directories of the tree that are regular packages (have an __init__.py)."""
+        return {path.split("/", 1)[0] for path in self.files() if path.count("/") == 1 and path.endswith("/__init__.py")}
+
+    def close(self) -> None:
+        if self._batch is not None:
+            if self._batch.stdin:
+                self._batch.stdin.close()
+            self._batch.wait()
+            self._batch = None
+
+    def __enter__(self) -> "GitTree":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _GitBlobLoader(InspectLoader):
+    def __init__(self, tree: GitTree, path: Optional[str], is_package: bool) -> None:
+        self.tree = tree
+        self.path = path
+        self._is_package = is_package
+
+    def is_package(self, fullname: str) -> bool:
+        return self._is_package
+
+    def get_source(self, fullname: str) -> str:
+        if self.path is None:
+            return ""  # namespace-style package directory without __init__.py
+        return self.tree.read(self.path).decode("utf-8")
+
+    def get_code(self, fullname: str):
+        origin = f"{self.tree.ref}:{self.tree.prefix}{self.path or fullname.replace('.', '/')}"
+        return compile(self.get_source(fullname), origin, "exec", dont_inherit=True)
+
+
+class GitTreeFinder(MetaPathFinder):
+    """Meta-path finder that imports the tree's top-level packages from git blobs, in memory.
+
+    It claims the model's root package and the tree's other regular packages (directories with
+    an __init__.py). Names the tree cannot resolve are left to the rest of sys.meta_path, so a
+    stray setup.py or a docs/ directory never shadows an installed library. Submodules of a
+    claimed package still resolve only from the tree: its packages have no filesystem path.
+    """
+
+    def __init__(self, tree: GitTree, root_package: str) -> None:
+        self.tree = tree
+        # except packages the host process already runs on (e.g. this tool, when diffing its own repo)
+        self.packages = {root_package} | {m for m in tree.top_level_packages() if m not in sys.modules}
+
+    def find_spec(self, fullname: str, path=None, target=None) -> Optional[ModuleSpec]:
+        if fullname.split(".")[0] not in self.packages:
+            return None
+        files = self.tree.files()
+        rel = fullname.replace(".", "/")
+        if f"{rel}/__init__.py" in files:
+            loader = _GitBlobLoader(self.tree, f"{rel}/__init__.py", True)
+        elif f"{rel}.py" in files:
+            loader = _GitBlobLoader(self.tree, f"{rel}.py", False)
+        elif self.tree.is_dir(rel):
+            loader = _GitBlobLoader(self.tree, None, True)
+        else:
+            return None
+        spec = ModuleSpec(fullname, loader, origin=f"{self.tree.ref}:{self.tree.prefix}{loader.path or rel}", is_package=loader.is_package(fullname))
+        if spec.submodule_search_locations is not None:
+            # no filesystem locations: submodules resolve through this finder only
+            spec.submodule_search_locations = []
+        return spec
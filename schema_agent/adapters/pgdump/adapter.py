@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import os
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Optional
+
+from schema_agent.adapters.base import SchemaAdapter
+from schema_agent.adapters.git_tree import GitTree
+from schema_agent.adapters.pgdump.parser import DumpParser, keep_statement
+from schema_agent.adapters.pgdump.splitter import iter_statements
+from schema_agent.core.cache import IRCache
+from schema_agent.core.ir import IR
+
+# Bump whenever the IR parsed from the same dump changes, so cached IRs are invalidated
+PGDUMP_ADAPTER_VERSION = "2"
+
+
+class PgDumpAdapter(SchemaAdapter):
+    """Builds IR from a ``pg_dump --schema-only`` (plain format) SQL file, optionally gzipped.
+
+    The dump is ``module_hint`` resolved against ``repo_path``, or ``repo_path`` itself when no
+    hint is given. It is read as a stream: only the statement being parsed is held in memory.
+    """
+
+    supports_git_ref = True
+
+    def __init__(self, cache: Optional[IRCache] = None, default_schema: str = "public") -> None:
+        self.cache = cache
+        # Tables in this schema are keyed by bare name, like SQLAlchemy models without a schema
+        self.default_schema = default_schema
+        self.unresolved: List[str] = []
+
+    def emit_ir(self, repo_path: str, module_hint: str | None = None, git_ref: Optional[str] = None) -> IR:
+        tree = GitTree(repo_path, git_ref) if git_ref else None
+        path = module_hint or ("" if tree else repo_path)
+        if tree is None and module_hint:
+            path = os.path.join(repo_path or ".", module_hint)
+        if not path:
+            raise RuntimeError("pgdump adapter needs the dump file as the module hint when reading a git ref")
+        try:
+            key = None
+            if self.cache is not None:
+                digest = tree.files().get(path) if tree else _file_digest(path)
+                if digest:
+                    key = hashlib.sha256(
+                        "\0".join(("pgdump", PGDUMP_ADAPTER_VERSION, self.default_schema, digest)).encode("utf-8")
+                    ).hexdigest()
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        return cached
+
+            with _open_dump(path, tree) as lines:
+                parser = DumpParser(default_schema=self.default_schema)
+                for stmt in iter_statements(lines, keep=keep_statement):
+                    parser.feed(stmt)
+            self.unresolved.extend(parser.unresolved)
+            ir = parser.build()
+            if key is not None:
+                self.cache.put(key, ir)
+            return ir
+        finally:
+            if tree is not None:
+                tree.close()
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@contextmanager
+def _open_dump(path: str, tree: Optional[GitTree]) -> Iterator[IO[str]]:
+    if tree is not None:
+        with tree.open_blob(path) as raw:
+            yield _text(raw, path)
+    else:
+        with open(path, "rb") as raw:
+            yield _text(raw, path)
+
+
+def _text(raw: IO[bytes], path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        raw = gzip.GzipFile(fileobj=raw, mode="rb")
+    return io.TextIOWrapper(raw, encoding="utf-8", newline="")
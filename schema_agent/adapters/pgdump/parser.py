@@ -0,0 +1,531 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from schema_agent.core.ir import Column, ForeignKey, IR, Index, Table
+
+# (leading whitespace, token); findall plus a running offset is much cheaper than match objects
+_TOKEN = re.compile(
+    r"""(\s*)(
+      [EeNn]?'(?:[^']|'')*'
+    | "(?:[^"]|"")*"
+    | \$(?P<tag>[A-Za-z_][A-Za-z0-9_]*)?\$.*?\$(?P=tag)\$
+    | \d+(?:\.\d+)?(?:[eE][+-]?\d+)?
+    | [A-Za-z_][A-Za-z0-9_$]*
+    | ::
+    | [^\sA-Za-z0-9_]
+    )""",
+    re.X | re.S,
+)
+
+# Leading words of the statements the parser reads; everything else is skipped unbuffered
+_HEADS = (
+    "CREATE TABLE ",
+    "CREATE UNLOGGED TABLE ",
+    "CREATE TYPE ",
+    "CREATE INDEX ",
+    "CREATE UNIQUE INDEX ",
+    "CREATE EXTENSION ",
+    "ALTER TABLE ",
+    "ALTER SEQUENCE ",
+    "COMMENT ON TABLE ",
+    "COMMENT ON COLUMN ",
+)
+
+# PostgreSQL type names as pg_dump prints them -> as SQLAlchemy's postgresql dialect compiles them
+_TYPE_NAMES = {
+    "character varying": "VARCHAR",
+    "varchar": "VARCHAR",
+    "character": "CHAR",
+    "char": "CHAR",
+    "bpchar": "CHAR",
+    "text": "TEXT",
+    "integer": "INTEGER",
+    "int": "INTEGER",
+    "int4": "INTEGER",
+    "bigint": "BIGINT",
+    "int8": "BIGINT",
+    "smallint": "SMALLINT",
+    "int2": "SMALLINT",
+    "boolean": "BOOLEAN",
+    "bool": "BOOLEAN",
+    "double precision": "DOUBLE PRECISION",
+    "float8": "DOUBLE PRECISION",
+    "real": "REAL",
+    "float4": "REAL",
+    "numeric": "NUMERIC",
+    "decimal": "NUMERIC",
+    "timestamp": "TIMESTAMP",
+    "time": "TIME",
+    "date": "DATE",
+    "interval": "INTERVAL",
+    "uuid": "UUID",
+    "json": "JSON",
+    "jsonb": "JSONB",
+    "bytea": "BYTEA",
+    "inet": "INET",
+    "cidr": "CIDR",
+    "macaddr": "MACADDR",
+    "money": "MONEY",
+    "oid": "OID",
+    "tsvector": "TSVECTOR",
+    "xml": "XML",
+    "bit": "BIT",
+    "bit varying": "BIT VARYING",
+}
+_TYPE_RE = re.compile(
+    r"^(?P<base>[a-z_][a-z0-9_ ]*?)\s*(?:\((?P<args>[^)]*)\))?\s*(?P<tz>with(?:out)? time zone)?\s*(?P<arr>(?:\[\d*\]\s*)*)$"
+)
+
+_COLUMN_STOP = {"COLLATE", "NOT", "NULL", "DEFAULT", "CONSTRAINT", "PRIMARY", "UNIQUE", "CHECK", "REFERENCES", "GENERATED"}
+_TABLE_CONSTRAINTS = {"CONSTRAINT", "PRIMARY", "UNIQUE", "CHECK", "FOREIGN", "EXCLUDE", "LIKE"}
+_FK_ACTIONS = ("CASCADE", "RESTRICT", "SET NULL", "SET DEFAULT", "NO ACTION")
+
+
+# (kind, key, start, end) as a plain tuple: dumps have millions of tokens and NamedTuple construction
+# dominates tokenizing. key is upper-cased for words, so keyword checks are a plain comparison.
+_Tok = Tuple[str, str, int, int]
+
+
+class _ParseError(Exception):
+    pass
+
+
+def keep_statement(head: str) -> bool:
+    return head.startswith(_HEADS)
+
+
+def _tokenize(sql: str) -> List[_Tok]:
+    toks: List[_Tok] = []
+    append = toks.append
+    pos = 0
+    for ws, text, _ in _TOKEN.findall(sql):
+        start = pos + len(ws)
+        pos = start + len(text)
+        c = text[0]
+        if text[-1] == "'" and len(text) > 1:
+            append(("str", text, start, pos))
+        elif c.isalpha() or c == "_":
+            append(("word", text.upper(), start, pos))
+        elif c == '"':
+            append(("qid", text, start, pos))
+        elif c.isdigit():
+            append(("num", text, start, pos))
+        elif c == "$" and len(text) > 1:
+            append(("dollar", text, start, pos))
+        else:
+            append(("op", text, start, pos))
+    return toks
+
+
+def _ident(tok: _Tok) -> str:
+    if tok[0] == "qid":
+        return tok[1][1:-1].replace('""', '"')
+    if tok[0] == "word":
+        return tok[1].lower()
+    raise _ParseError(f"expected identifier, got {tok[1]!r}")
+
+
+def _string(tok: _Tok) -> str:
+    if tok[0] != "str":
+        raise _ParseError(f"expected string literal, got {tok[1]!r}")
+    body = tok[1][tok[1].index("'") + 1:-1]
+    return body.replace("''", "'")
+
+
+def _split_top(toks: List[_Tok]) -> List[List[_Tok]]:
+    parts: List[List[_Tok]] = [[]]
+    depth = 0
+    for t in toks:
+        if t[1] in ("(", "["):
+            depth += 1
+        elif t[1] in (")", "]"):
+            depth -= 1
+        elif t[1] == "," and depth == 0:
+            parts.append([])
+            continue
+        parts[-1].append(t)
+    return [p for p in parts if p]
+
+
+def _strip_parens(text: str) -> str:
+    # pg_dump wraps CHECK bodies in an extra pair of parentheses
+    while text.startswith("(") and text.endswith(")"):
+        depth = 0
+        for i, ch in enumerate(text):
+            depth += ch == "("
+            depth -= ch == ")"
+            if depth == 0 and i < len(text) - 1:
+                return text
+        text = text[1:-1].strip()
+    return text
+
+
+class _Cursor:
+    def __init__(self, sql: str, toks: List[_Tok]) -> None:
+        self.sql = sql
+        self.toks = toks
+        self.keys = tuple(t[1] for t in toks)
+        self.i = 0
+
+    def done(self) -> bool:
+        return self.i >= len(self.toks)
+
+    def peek(self, k: int = 0) -> Optional[_Tok]:
+        j = self.i + k
+        return self.toks[j] if j < len(self.toks) else None
+
+    def at_value(self, value: str) -> bool:
+        return self.i < len(self.keys) and self.keys[self.i] == value
+
+    def at(self, *words: str) -> bool:
+        return self.keys[self.i:self.i + len(words)] == words
+
+    def accept(self, *words: str) -> bool:
+        if self.at(*words):
+            self.i += len(words)
+            return True
+        return False
+
+    def expect(self, *words: str) -> None:
+        if not self.accept(*words):
+            raise _ParseError(f"expected {' '.join(words)}")
+
+    def next(self) -> _Tok:
+        t = self.peek()
+        if t is None:
+            raise _ParseError("unexpected end of statement")
+        self.i += 1
+        return t
+
+    def name(self) -> List[str]:
+        parts = [_ident(self.next())]
+        while (t := self.peek()) is not None and t[1] == "." and self.peek(1) is not None:
+            self.i += 1
+            parts.append(_ident(self.next()))
+        return parts
+
+    def group(self) -> List[_Tok]:
+        if self.next()[1] != "(":
+            raise _ParseError("expected (")
+        start = self.i
+        depth = 1
+        while depth:
+            t = self.next()
+            depth += t[1] == "("
+            depth -= t[1] == ")"
+        return self.toks[start:self.i - 1]
+
+    def text(self, toks: List[_Tok]) -> str:
+        return self.sql[toks[0][2]:toks[-1][3]] if toks else ""
+
+    def rest(self) -> List[_Tok]:
+        toks = self.toks[self.i:]
+        self.i = len(self.toks)
+        return toks
+
+
+# IR objects are frozen, and later statements (ALTER TABLE, COMMENT ON, OWNED BY) keep filling
+# in tables and columns, so the parser collects their fields as plain dicts and build()
+# constructs each Table and Column exactly once
+_Fields = Dict[str, Any]
+
+
+def _new_table(name: str) -> _Fields:
+    return {"name": name, "columns": {}, "primary_key": [], "uniques": [], "checks": {}, "indexes": {}, "fks": {}}
+
+
+class DumpParser:
+    """Builds IR from a stream of pg_dump statements; feed() each statement, then build()."""
+
+    def __init__(self, default_schema: str = "public") -> None:
+        self.default_schema = default_schema
+        self.tables: Dict[str, _Fields] = {}
+        self.enums: Dict[str, List[str]] = {}
+        self.extensions: List[str] = []
+        self.unresolved: List[str] = []
+        # sequence key -> (table key, column) from ALTER SEQUENCE ... OWNED BY, i.e. serial columns
+        self._owned_sequences: Dict[str, Tuple[str, str]] = {}
+        # type text as dumped -> normalized; a dump repeats a handful of types many times over
+        self._types: Dict[str, str] = {}
+
+    def _key(self, parts: List[str]) -> str:
+        if len(parts) > 1 and parts[-2] == self.default_schema:
+            return parts[-1]
+        return ".".join(parts[-2:])
+
+    def _type(self, text: str) -> str:
+        out = self._types.get(text)
+        if out is None:
+            out = self._types[text] = self._normalize_type(text)
+        return out
+
+    def _normalize_type(self, text: str) -> str:
+        raw = " ".join(text.split())
+        prefix = self.default_schema + "."
+        if raw.lower().startswith(prefix):
+            raw = raw[len(prefix):]
+        if raw.startswith('"'):
+            return raw  # user-defined type with a case-sensitive name
+        m = _TYPE_RE.match(raw.lower())
+        if m is None or m.group("base") not in _TYPE_NAMES:
+            return raw  # enums, domains and other user-defined types compile to their own name
+        out = _TYPE_NAMES[m.group("base")]
+        if m.group("args"):
+            out += "(" + ", ".join(a.strip() for a in m.group("args").split(",")) + ")"
+        if m.group("tz"):
+            out += " " + m.group("tz").upper()
+        if m.group("arr"):
+            out += "[]" * m.group("arr").count("[")
+        return out
+
+    def _table(self, parts: List[str], stmt: str) -> Optional[_Fields]:
+        table = self.tables.get(self._key(parts))
+        if table is None:
+            self.unresolved.append(f"{stmt[:80]}: unknown table {'.'.join(parts)}")
+        return table
+
+    def feed(self, stmt: str) -> None:
+        cur = _Cursor(stmt, _tokenize(stmt))
+        try:
+            if cur.accept("CREATE"):
+                cur.accept("UNLOGGED")
+                if cur.accept("TABLE"):
+                    self._create_table(cur)
+                elif cur.accept("TYPE"):
+                    self._create_type(cur)
+                elif cur.at("INDEX") or cur.at("UNIQUE", "INDEX"):
+                    self._create_index(cur)
+                elif cur.accept("EXTENSION"):
+                    cur.accept("IF", "NOT", "EXISTS")
+                    name = ".".join(cur.name())
+                    if name not in self.extensions:
+                        self.extensions.append(name)
+            elif cur.accept("ALTER", "TABLE"):
+                self._alter_table(cur)
+            elif cur.accept("ALTER", "SEQUENCE"):
+                seq = cur.name()
+                if cur.accept("OWNED", "BY") and not cur.at("NONE"):
+                    target = cur.name()
+                    self._owned_sequences[self._key(seq)] = (self._key(target[:-1]), target[-1])
+            elif cur.accept("COMMENT", "ON"):
+                self._comment(cur)
+        except _ParseError as e:
+            self.unresolved.append(f"{' '.join(stmt[:80].split())}: {e}")
+
+    def _create_table(self, cur: _Cursor) -> None:
+        cur.accept("IF", "NOT", "EXISTS")
+        parts = cur.name()
+        if cur.at("PARTITION", "OF") or cur.at("OF"):
+            return  # partitions and typed tables are not modelled in the IR
+        table = _new_table(parts[-1])
+        for element in _split_top(cur.group()):
+            self._table_element(table, _Cursor(cur.sql, element))
+        while not cur.done():
+            if cur.accept("PARTITION", "BY"):
+                method = cur.next()[1].upper()
+                table["partitioning"] = f"{method} ({cur.text(cur.group())})"
+            else:
+                cur.next()
+        self.tables[self._key(parts)] = table
+
+    def _table_element(self, table: _Fields, cur: _Cursor) -> None:
+        first = cur.peek()
+        if first is not None and first[0] == "word" and first[1] in _TABLE_CONSTRAINTS:
+            self._constraint(table, cur)
+            return
+        name = _ident(cur.next())
+        type_toks: List[_Tok] = []
+        while (t := cur.peek()) is not None and not (t[0] == "word" and t[1] in _COLUMN_STOP):
+            type_toks.append(cur.next())
+        col = table["columns"][name] = {"name": name, "data_type": self._type(cur.text(type_toks)), "nullable": True}
+        while not cur.done():
+            if cur.accept("COLLATE"):
+                col["collation"] = cur.name()[-1]
+            elif cur.accept("NOT", "NULL"):
+                col["nullable"] = False
+            elif cur.accept("NULL"):
+                col["nullable"] = True
+            elif cur.accept("DEFAULT"):
+                col["default"] = cur.text(self._until(cur, _COLUMN_STOP))
+            elif cur.accept("GENERATED"):
+                if cur.accept("ALWAYS", "AS") and cur.at_value("("):
+                    cur.group()
+                    col["generated"] = "computed"
+                self._until(cur, _COLUMN_STOP - {"GENERATED"})
+            elif cur.accept("CONSTRAINT"):
+                cname = _ident(cur.next())
+                self._column_constraint(table, col, cur, cname)
+            else:
+                self._column_constraint(table, col, cur, None)
+
+    def _until(self, cur: _Cursor, stop) -> List[_Tok]:
+        toks: List[_Tok] = []
+        depth = 0
+        while (t := cur.peek()) is not None:
+            if depth == 0 and t[0] == "word" and t[1] in stop:
+                break
+            depth += t[1] == "("
+            depth -= t[1] == ")"
+            toks.append(cur.next())
+        return toks
+
+    def _column_constraint(self, table: _Fields, col: _Fields, cur: _Cursor, cname: Optional[str]) -> None:
+        if cur.accept("PRIMARY", "KEY"):
+            col["nullable"] = False
+            table["primary_key"] = [col["name"]]
+        elif cur.accept("UNIQUE"):
+            table["uniques"].append([col["name"]])
+        elif cur.accept("CHECK"):
+            table["checks"][cname or f"{table['name']}_{col['name']}_check"] = _strip_parens(cur.text(cur.group()))
+            cur.accept("NO", "INHERIT")
+        elif cur.accept("REFERENCES"):
+            fk_name = cname or f"{table['name']}_{col['name']}_fkey"
+            table["fks"][fk_name] = self._references(cur, fk_name, [col["name"]])
+        elif cur.accept("NOT", "NULL"):
+            col["nullable"] = False
+        elif cur.accept("NULL"):
+            pass
+        else:
+            raise _ParseError(f"unsupported column clause {cur.next()[1]!r}")
+
+    def _constraint(self, table: _Fields, cur: _Cursor) -> None:
+        cname = _ident(cur.next()) if cur.accept("CONSTRAINT") else None
+        if cur.accept("PRIMARY", "KEY"):
+            table["primary_key"] = [_ident(t) for t in cur.group() if t[1] != ","]
+            for c in table["primary_key"]:
+                if c in table["columns"]:
+                    table["columns"][c]["nullable"] = False
+        elif cur.accept("UNIQUE"):
+            cur.accept("NULLS", "NOT", "DISTINCT")
+            table["uniques"].append([_ident(t) for t in cur.group() if t[1] != ","])
+        elif cur.accept("CHECK"):
+            table["checks"][cname or f"{table['name']}_check"] = _strip_parens(cur.text(cur.group()))
+        elif cur.accept("FOREIGN", "KEY"):
+            cols = [_ident(t) for t in cur.group() if t[1] != ","]
+            cur.expect("REFERENCES")
+            fk_name = cname or f"{table['name']}_{'_'.join(cols)}_fkey"
+            table["fks"][fk_name] = self._references(cur, fk_name, cols)
+        else:
+            raise _ParseError(f"unsupported constraint {cur.next()[1]!r}")
+
+    def _references(self, cur: _Cursor, name: str, cols: List[str]) -> ForeignKey:
+        ref = cur.name()
+        ref_cols = [_ident(t) for t in cur.group() if t[1] != ","] if cur.at_value("(") else []
+        fk: _Fields = {"name": name, "columns": cols, "ref_table": ref[-1], "ref_columns": ref_cols}
+        while not cur.done():
+            if cur.accept("ON", "DELETE"):
+                fk["on_delete"] = self._fk_action(cur)
+            elif cur.accept("ON", "UPDATE"):
+                fk["on_update"] = self._fk_action(cur)
+            elif cur.accept("NOT", "DEFERRABLE"):
+                fk["deferrable"] = False
+            elif cur.accept("DEFERRABLE"):
+                fk["deferrable"] = True
+            elif cur.accept("INITIALLY", "DEFERRED"):
+                fk["initially_deferred"] = True
+            elif cur.accept("INITIALLY", "IMMEDIATE") or cur.accept("NOT", "VALID"):
+                pass
+            elif cur.accept("MATCH"):
+                cur.next()
+            else:
+                break
+        return ForeignKey(**fk)
+
+    def _fk_action(self, cur: _Cursor) -> str:
+        for action in _FK_ACTIONS:
+            if cur.accept(*action.split()):
+                return action
+        raise _ParseError("unknown referential action")
+
+    def _create_type(self, cur: _Cursor) -> None:
+        parts = cur.name()
+        if not cur.accept("AS", "ENUM"):
+            return  # composite, range and base types carry no table structure
+        self.enums[self._key(parts)] = [_string(t) for t in cur.group() if t[1] != ","]
+
+    def _create_index(self, cur: _Cursor) -> None:
+        unique = cur.accept("UNIQUE")
+        cur.expect("INDEX")
+        cur.accept("CONCURRENTLY")
+        cur.accept("IF", "NOT", "EXISTS")
+        name = cur.name()[-1]
+        cur.expect("ON")
+        cur.accept("ONLY")
+        table = self._table(cur.name(), cur.sql)
+        method = "btree"
+        if cur.accept("USING"):
+            method = cur.next()[1].lower()
+        columns = []
+        for element in _split_top(cur.group()):
+            if element[0][0] in ("word", "qid") and all(
+                t[0] == "word" and t[1] in ("ASC", "DESC", "NULLS", "FIRST", "LAST") for t in element[1:]
+            ):
+                columns.append(_ident(element[0]))
+            else:
+                columns.append(cur.text(element))
+        include: List[str] = []
+        if cur.accept("INCLUDE"):
+            include = [_ident(t) for t in cur.group() if t[1] != ","]
+        cur.accept("NULLS", "NOT", "DISTINCT") or cur.accept("NULLS", "DISTINCT")
+        if cur.accept("WITH"):
+            cur.group()  # storage parameters
+        if cur.accept("TABLESPACE"):
+            cur.next()
+        where = cur.text(cur.rest()) if cur.accept("WHERE") else None
+        if table is not None:
+            table["indexes"][name] = Index(name=name, columns=columns, unique=unique, method=method, include=include, where=where)
+
+    def _alter_table(self, cur: _Cursor) -> None:
+        cur.accept("IF", "EXISTS")
+        cur.accept("ONLY")
+        parts = cur.name()
+        if cur.at("OWNER") or cur.at("ATTACH") or cur.at("REPLICA") or cur.at("CLUSTER"):
+            return
+        table = self._table(parts, cur.sql)
+        if table is None:
+            return
+        for action in _split_top(cur.rest()):
+            sub = _Cursor(cur.sql, action)
+            if sub.accept("ADD"):
+                if sub.at("CONSTRAINT") or sub.at("PRIMARY") or sub.at("UNIQUE") or sub.at("CHECK") or sub.at("FOREIGN"):
+                    self._constraint(table, sub)
+            elif sub.accept("ALTER"):
+                sub.accept("COLUMN")
+                col = table["columns"].get(_ident(sub.next()))
+                if col is None:
+                    continue
+                if sub.accept("SET", "DEFAULT"):
+                    col["default"] = sub.text(sub.rest())
+                elif sub.accept("SET", "NOT", "NULL"):
+                    col["nullable"] = False
+
+    def _comment(self, cur: _Cursor) -> None:
+        if cur.accept("TABLE"):
+            parts = cur.name()
+            cur.expect("IS")
+            table = self._table(parts, cur.sql)
+            if table is not None:
+                table["comment"] = None if cur.accept("NULL") else _string(cur.next())
+        elif cur.accept("COLUMN"):
+            parts = cur.name()
+            cur.expect("IS")
+            table = self._table(parts[:-1], cur.sql)
+            col = table["columns"].get(parts[-1]) if table is not None else None
+            if col is not None:
+                col["comment"] = None if cur.accept("NULL") else _string(cur.next())
+
+    def build(self) -> IR:
+        # serial columns: pg_dump spells them as a default on an owned sequence
+        for seq, (tkey, cname) in self._owned_sequences.items():
+            col = self.tables.get(tkey, _new_table(""))["columns"].get(cname)
+            default = col.get("default") if col is not None else None
+            if default and default.startswith("nextval("):
+                if re.search(r"'(?:[^']*\.)?\"?" + re.escape(seq.rpartition(".")[2]) + r"\"?'", default):
+                    col["default"] = None
+        tables = {
+            key: Table(**{**fields, "columns": {name: Column(**col) for name, col in fields["columns"].items()}})
+            for key, fields in self.tables.items()
+        }
+        return IR(dialect="postgresql", tables=tables, enums=self.enums, extensions=self.extensions)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import re
+from typing import Callable, Iterable, Iterator, List, Optional
+
+# Start of anything that changes lexical state outside quotes/comments
+_SPECIAL = re.compile(r"""[;'"]|--|/\*|(?<![\w$])\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$""")
+_BLOCK_COMMENT = re.compile(r"/\*|\*/")
+
+# Statements are classified once this much leading text is known
+_HEAD_CHARS = 64
+
+
+def _normalize_head(text: str) -> str:
+    return " ".join(text.split())[:_HEAD_CHARS].upper()
+
+
+def iter_statements(lines: Iterable[str], keep: Optional[Callable[[str], bool]] = None) -> Iterator[str]:
+    """Split a SQL script into statements, one line of input at a time.
+
+    Quotes, dollar-quoted bodies and nested block comments are honoured; comments are dropped and
+    ``COPY ... FROM stdin`` data blocks are skipped. ``keep`` receives the upper-cased, whitespace
+    collapsed head of each statement; statements it rejects are never buffered, so memory stays
+    bounded by the largest kept statement rather than by the script.
+    """
+    buf: List[str] = []
+    head = ""  # normalized head, once decided
+    pending = 0  # chars buffered before the keep decision
+    discard = False
+    tail = ""  # last few significant chars, to recognise COPY ... FROM stdin
+    state: Optional[str] = None  # None, "'", '"', "/*" or a dollar-quote tag
+    comment_depth = 0
+    in_copy = False
+
+    def _append(text: str) -> None:
+        nonlocal head, pending, discard, tail
+        if not text:
+            return
+        tail = (tail + text)[-32:]
+        if discard:
+            return
+        buf.append(text)
+        if keep is not None and not head:
+            pending += len(text)
+            if pending >= _HEAD_CHARS:
+                _decide()
+
+    def _decide() -> None:
+        nonlocal head, discard
+        head = _normalize_head("".join(buf)) or " "
+        if keep is not None and not keep(head):
+            discard = True
+            buf.clear()
+
+    for line in lines:
+        if in_copy:
+            if line.rstrip("\r\n") == "\\.":
+                in_copy = False
+            continue
+        pos = 0
+        n = len(line)
+        while pos < n:
+            if state is None:
+                m = _SPECIAL.search(line, pos)
+                if m is None:
+                    _append(line[pos:])
+                    break
+                _append(line[pos:m.start()])
+                tok = m.group()
+                pos = m.end()
+                if tok == ";":
+                    if not head:
+                        _decide()
+                    if head.startswith("COPY ") and " ".join(tail.split()).upper().endswith("FROM STDIN"):
+                        in_copy = True
+                    if not discard:
+                        stmt = "".join(buf).strip()
+                        if stmt:
+                            yield stmt
+                    buf.clear()
+                    head, pending, discard, tail = "", 0, False, ""
+                    if in_copy:
+                        break  # data starts on the next line
+                elif tok == "--":
+                    _append(" ")
+                    break
+                elif tok == "/*":
+                    _append(" ")
+                    state, comment_depth = "/*", 1
+                else:
+                    _append(tok)
+                    state = tok
+            elif state == "/*":
+                m = _BLOCK_COMMENT.search(line, pos)
+                if m is None:
+                    break
+                pos = m.end()
+                comment_depth += 1 if m.group() == "/*" else -1
+                if comment_depth == 0:
+                    state = None
+            elif state in ("'", '"'):
+                i = line.find(state, pos)
+                if i < 0:
+                    _append(line[pos:])
+                    break
+                if line.startswith(state, i + 1):  # doubled quote is an escaped quote
+                    _append(line[pos:i + 2])
+                    pos = i + 2
+                    continue
+                _append(line[pos:i + 1])
+                pos = i + 1
+                state = None
+            else:  # dollar-quoted body
+                i = line.find(state, pos)
+                if i < 0:
+                    _append(line[pos:])
+                    break
+                _append(line[pos:i + len(state)])
+                pos = i + len(state)
+                state = None
+
+    if not in_copy and not discard:
+        if buf and not head:
+            _decide()
+        stmt = "".join(buf).strip()
+        if stmt and not discard:
+            yield stmt
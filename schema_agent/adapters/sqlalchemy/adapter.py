@@ -1,41 +1,35 @@
 from __future__ import annotations
 
+import hashlib
 import importlib
+import logging
 import os
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from types import ModuleType
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
-from sqlalchemy import Index as SAIndex, Table as SATable
-from sqlalchemy.dialects import postgresql as pg
+import sqlalchemy
+from sqlalchemy import Column as SAColumn, Index as SAIndex, Table as SATable
 
 from schema_agent.adapters.base import SchemaAdapter
+from schema_agent.adapters.git_tree import GitTree, GitTreeFinder
+from schema_agent.adapters.sqlalchemy.compiler import CompileCache
+from schema_agent.adapters.sqlalchemy.sources import (
+    PackageSources,
+    closure_hashes,
+    module_imports,
+    scan_package_sources,
+    sources_fingerprint,
+    tree_package_sources,
+)
+from schema_agent.core.cache import IRCache, IRSnapshot
 from schema_agent.core.ir import Column, ForeignKey, IR, Index, Table
 
+# Bump whenever the IR emitted for the same models changes, so cached IRs are invalidated
+ADAPTER_VERSION = "3"
 
-def _compile_type(sa_type) -> str:
-    return sa_type.compile(dialect=pg.dialect())
-
-
-def _compile_default(default) -> Optional[str]:
-    if default is None:
-        return None
-    try:
-        # server_default may be a DefaultClause with .arg possibly a TextClause
-        if hasattr(default, "arg"):
-            arg = default.arg
-            # TextClause has .text attribute
-            if hasattr(arg, "text"):
-                return str(arg.text)
-            try:
-                return str(arg.compile(dialect=pg.dialect()))
-            except Exception:
-                return str(arg)
-        # Fallback
-        return str(default)
-    except Exception:
-        return str(default)
+_log = logging.getLogger(__name__)
 
 
 @dataclass
@@ -43,7 +37,63 @@ class LoadedModule:
     module: ModuleType
     sys_path_added: bool
     inserted_path: Optional[str] = None
+    finder: Optional[GitTreeFinder] = None
+
+
+@dataclass
+class _Incremental:
+    """Per-run state for re-emitting only tables whose source modules changed."""
+
+    previous: Optional[IRSnapshot]
+    module_hashes: Dict[str, str]
+    table_modules: Dict[str, List[str]] = field(default_factory=dict)
 
+    def reuse(self, tname: str) -> Optional[Table]:
+        prev = self.previous
+        mods = self.table_modules.get(tname)
+        if prev is None or not mods or prev.table_modules.get(tname) != mods or tname not in prev.ir.tables:
+            return None
+        if any(m not in self.module_hashes or prev.module_hashes.get(m) != self.module_hashes[m] for m in mods):
+            return None
+        return prev.ir.tables[tname]
+
+
+def _table_modules(metadata, registry, root_pkg: str) -> Dict[str, List[str]]:
+    """Map each table key to the package modules whose code contributes to its IR.
+
+    That is the modules of every class mapped onto the table (including single-table
+    inheritance subclasses), modules holding the Table or an Index on it at module level,
+    and the declaring modules of tables it references by foreign key.
+    """
+    own: Dict[str, Set[str]] = {}
+
+    def _add(table, module_name: Optional[str]) -> None:
+        key = getattr(table, "key", None)
+        if key in metadata.tables and module_name and module_name.split(".")[0] == root_pkg:
+            own.setdefault(key, set()).add(module_name)
+
+    if registry is not None:
+        for mapper in registry.mappers:
+            _add(mapper.local_table, mapper.class_.__module__)
+    for name, module in list(sys.modules.items()):
+        if module is None or name.split(".")[0] != root_pkg:
+            continue
+        for value in list(vars(module).values()):
+            if isinstance(value, SATable) and value.metadata is metadata:
+                _add(value, name)
+            elif isinstance(value, SAIndex) and value.table is not None:
+                _add(value.table, name)
+
+    result: Dict[str, List[str]] = {}
+    for key, satable in metadata.tables.items():
+        mods = set(own.get(key, ()))
+        if not mods:
+            continue  # unknown provenance: always re-emitted
+        for fk in satable.foreign_keys:
+            ref_key = fk.target_fullname.rpartition(".")[0]
+            mods |= own.get(ref_key, set())
+        result[key] = sorted(mods)
+    return result
 
 def _purge_package_cache(module_hint: str) -> None:
     root_pkg = module_hint.split(".")[0]
@@ -55,6 +105,24 @@ def _purge_package_cache(module_hint: str) -> None:
                 pass
 
 
+def _import_models_from_tree(tree: GitTree, module_hint: Optional[str]) -> LoadedModule:
+    if not module_hint:
+        raise RuntimeError("module_hint is required for SQLAlchemy adapter in MVP")
+    finder = GitTreeFinder(tree, module_hint.split(".")[0])
+    # Every top-level package of the tree is served from git, so purge all of them
+    for pkg in finder.packages:
+        _purge_package_cache(pkg)
+    sys.meta_path.insert(0, finder)
+    try:
+        module = importlib.import_module(module_hint)
+    except BaseException:
+        sys.meta_path.remove(finder)
+        for pkg in finder.packages:
+            _purge_package_cache(pkg)
+        raise
+    return LoadedModule(module=module, sys_path_added=False, finder=finder)
+
+
 def _import_models(repo_path: str, module_hint: Optional[str]) -> LoadedModule:
     if not module_hint:
         raise RuntimeError("module_hint is required for SQLAlchemy adapter in MVP")
@@ -71,15 +139,101 @@ def _import_models(repo_path: str, module_hint: Optional[str]) -> LoadedModule:
     return LoadedModule(module=module, sys_path_added=sys_path_added, inserted_path=inserted_path)
 
 
+def _snapshot_key(repo_path: str, module_hint: Optional[str], tree: Optional[GitTree]) -> str:
+    # One snapshot per tree location; its content is validated per module, so a stale one is only slower
+    location = f"{tree.toplevel}/{tree.prefix}@{tree.ref}" if tree else os.path.abspath(repo_path or ".")
+    parts = ("snapshot", location, module_hint or "", ADAPTER_VERSION, sqlalchemy.__version__)
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _package_imports(
+    sources: PackageSources, tree: Optional[GitTree], previous: Optional[IRSnapshot]
+) -> Dict[str, Optional[List[str]]]:
+    imports: Dict[str, Optional[List[str]]] = {}
+    for mod, path in sources.paths.items():
+        if previous is not None and previous.module_digests.get(mod) == sources.digests[mod] and mod in previous.module_imports:
+            imports[mod] = previous.module_imports[mod]
+            continue
+        if tree is not None:
+            source = tree.read(path)
+        else:
+            with open(path, "rb") as fh:
+                source = fh.read()
+        imports[mod] = module_imports(source, mod, os.path.basename(path) == "__init__.py", sources.paths)
+    return imports
+
+
 class SQLAlchemyAdapter(SchemaAdapter):
-    def emit_ir(self, repo_path: str, module_hint: str | None = None) -> IR:
-        loaded = _import_models(repo_path, module_hint)
+    def __init__(
+        self, cache: Optional[IRCache] = None, compiler: Optional[CompileCache] = None, incremental: bool = True
+    ) -> None:
+        self.cache = cache
+        # Shared across every emit_ir call on this adapter, i.e. across base and head
+        self.compiler = compiler or CompileCache()
+        # With a cache, keep a per-tree snapshot and re-emit only tables whose modules changed
+        self.incremental = incremental
+
+    supports_git_ref = True
+
+    def emit_ir(self, repo_path: str, module_hint: str | None = None, git_ref: Optional[str] = None) -> IR:
+        tree = GitTree(repo_path, git_ref) if git_ref else None
+        try:
+            key = None
+            sources = None
+            if self.cache is not None:
+                sources = tree_package_sources(tree, module_hint) if tree else scan_package_sources(repo_path, module_hint)
+                if sources is not None:
+                    key = sources_fingerprint(
+                        sources, extra=("sqlalchemy", ADAPTER_VERSION, sqlalchemy.__version__, module_hint or "")
+                    )
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        return cached
+
+            if sources is None or not self.incremental:
+                ir = self._emit_ir(repo_path, module_hint, tree)
+                if key is not None:
+                    self.cache.put(key, ir)
+                return ir
+
+            snapshot_key = _snapshot_key(repo_path, module_hint, tree)
+            previous = self.cache.get_snapshot(snapshot_key)
+            imports = _package_imports(sources, tree, previous)
+            inc = _Incremental(previous=previous, module_hashes=closure_hashes(sources.digests, imports))
+            ir = self._emit_ir(repo_path, module_hint, tree, inc)
+            self.cache.put(key, ir)
+            self.cache.put_snapshot(
+                snapshot_key,
+                IRSnapshot(
+                    ir=ir,
+                    module_digests=sources.digests,
+                    module_imports={m: deps for m, deps in imports.items() if deps is not None},
+                    module_hashes=inc.module_hashes,
+                    table_modules=inc.table_modules,
+                ),
+            )
+            return ir
+        finally:
+            if tree is not None:
+                tree.close()
+
+    def _emit_ir(
+        self, repo_path: str, module_hint: str | None, tree: Optional[GitTree] = None, inc: Optional[_Incremental] = None
+    ) -> IR:
+        loaded = _import_models_from_tree(tree, module_hint) if tree else _import_models(repo_path, module_hint)
         try:
             Base = getattr(loaded.module, "Base")
             metadata = Base.metadata
+            if inc is not None:
+                # provenance has to be read while the package modules are still loaded
+                inc.table_modules = _table_modules(metadata, getattr(Base, "registry", None), module_hint.split(".")[0])
         finally:
             # cleanup: purge package and sys.path insertion to avoid cross-tree bleed
             _purge_package_cache(module_hint)
+            if loaded.finder is not None:
+                sys.meta_path.remove(loaded.finder)
+                for pkg in loaded.finder.packages:
+                    _purge_package_cache(pkg)
             if loaded.sys_path_added and loaded.inserted_path:
                 try:
                     # remove by value if present anywhere
@@ -90,7 +244,10 @@ class SQLAlchemyAdapter(SchemaAdapter):
 
         tables: Dict[str, Table] = {}
         for tname, satable in metadata.tables.items():
-            tables[tname] = self._emit_table_ir(satable)
+            table = inc.reuse(tname) if inc is not None else None
+            tables[tname] = table if table is not None else self._emit_table_ir(satable)
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug("compile cache after %s: %s", module_hint or repo_path, self.compiler.format_stats())
 
         return IR(dialect="postgresql", version=None, tables=tables)
 
@@ -106,9 +263,9 @@ class SQLAlchemyAdapter(SchemaAdapter):
         for col in satable.columns:
             columns[col.name] = Column(
                 name=col.name,
-                data_type=_compile_type(col.type),
+                data_type=self.compiler.type(col.type),
                 nullable=bool(col.nullable),
-                default=_compile_default(col.server_default),
+                default=self.compiler.default(col.server_default),
                 generated=getattr(col, "computed", None) and "computed" or None,
                 collation=getattr(col, "collation", None),
                 comment=getattr(col, "comment", None),
@@ -124,7 +281,7 @@ class SQLAlchemyAdapter(SchemaAdapter):
                 uniques.append([col.name for col in c.columns])
             elif ctype == "checkconstraint":
                 try:
-                    checks[cname] = str(c.sqltext.compile(dialect=pg.dialect()))
+                    checks[cname] = self.compiler.expr(c.sqltext)
                 except Exception:
                     checks[cname] = str(c.sqltext)
             elif ctype == "foreignkeyconstraint":
@@ -145,12 +302,16 @@ class SQLAlchemyAdapter(SchemaAdapter):
         # Indexes
         for idx in satable.indexes:  # type: SAIndex
             name = idx.name
+            pg_opts = idx.dialect_options["postgresql"]
             indexes[name] = Index(
                 name=name,
-                columns=[col.name for col in idx.expressions],
+                # functional index entries are rendered as DDL expressions, e.g. "lower(email)"
+                columns=[col.name if isinstance(col, SAColumn) else self.compiler.expr(col, ddl=True) for col in idx.expressions],
                 unique=bool(idx.unique),
-                method=(idx.dialect_options.get("postgresql", {}).get("using", "btree")),
-                include=getattr(idx, "postgresql_include", []) or [],
+                # unset dialect options read back as False/None rather than missing
+                method=pg_opts.get("using") or "btree",
+                include=list(pg_opts.get("include") or []),
+                where=self.compiler.expr(pg_opts["where"], ddl=True) if pg_opts.get("where") is not None else None,
             )
 
         return Table(
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Optional
+
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.sql.type_api import ExternalType
+
+_NO_KEY = object()
+
+
+class CompileCache:
+    """Postgres compilation of types, server defaults and SQL expressions, memoized by structure.
+
+    One dialect instance is shared by every compile. Keys are the element's structural identity
+    (type class plus parameters, default text, or SQLAlchemy's statement cache key), so equal
+    elements declared on different columns or in different trees compile once.
+    """
+
+    def __init__(self) -> None:
+        self.dialect = pg.dialect()
+        self._memo: Dict[str, Dict[Hashable, str]] = {"types": {}, "defaults": {}, "exprs": {}}
+        self._hits: Dict[str, int] = {k: 0 for k in self._memo}
+        self._misses: Dict[str, int] = {k: 0 for k in self._memo}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Dialects do not pickle reliably; workers start with an empty cache
+        return {}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__()
+
+    def _lookup(self, kind: str, key: Any, compile_fn) -> str:
+        if key is _NO_KEY:
+            self._misses[kind] += 1
+            return compile_fn()
+        memo = self._memo[kind]
+        try:
+            value = memo.get(key)
+        except TypeError:  # unhashable parameters
+            self._misses[kind] += 1
+            return compile_fn()
+        if value is not None:
+            self._hits[kind] += 1
+            return value
+        self._misses[kind] += 1
+        value = compile_fn()
+        memo[key] = value
+        return value
+
+    def type(self, sa_type) -> str:
+        return self._lookup("types", _type_key(sa_type), lambda: sa_type.compile(dialect=self.dialect))
+
+    def default(self, default) -> Optional[str]:
+        if default is None:
+            return None
+        try:
+            # server_default may be a DefaultClause with .arg possibly a TextClause
+            if hasattr(default, "arg"):
+                arg = default.arg
+                # TextClause has .text attribute
+                if hasattr(arg, "text"):
+                    return str(arg.text)
+                if isinstance(arg, str):
+                    return arg
+                return self._lookup("defaults", _clause_key(arg), lambda: self._compile_default_arg(arg))
+            # Fallback
+            return str(default)
+        except Exception:
+            return str(default)
+
+    def _compile_default_arg(self, arg) -> str:
+        try:
+            return str(arg.compile(dialect=self.dialect))
+        except Exception:
+            return str(arg)
+
+    def expr(self, clause, ddl: bool = False) -> str:
+        """Compile a SQL expression; ddl=True renders it the way it appears inside DDL
+        (unqualified column names, inlined literals), as for index expressions."""
+        key = _clause_key(clause)
+        if key is not _NO_KEY:
+            key = (ddl, key)
+        if ddl:
+            kw = {"include_table": False, "literal_binds": True}
+            return self._lookup("exprs", key, lambda: str(clause.compile(dialect=self.dialect, compile_kwargs=kw)))
+        return self._lookup("exprs", key, lambda: str(clause.compile(dialect=self.dialect)))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            kind: {"hits": self._hits[kind], "misses": self._misses[kind], "entries": len(self._memo[kind])}
+            for kind in self._memo
+        }
+
+    def format_stats(self) -> str:
+        return ", ".join(f"{kind} {v['hits']} hits / {v['misses']} misses" for kind, v in self.stats().items())
+
+
+def _type_key(sa_type) -> Any:
+    # TypeDecorators without cache_ok=True have no trustworthy key (and SQLAlchemy warns on access)
+    if isinstance(sa_type, ExternalType) and not getattr(sa_type, "cache_ok", False):
+        return _NO_KEY
+    try:
+        static_key = sa_type._static_cache_key
+    except Exception:
+        return _NO_KEY
+    if not isinstance(static_key, tuple):
+        return _NO_KEY  # CacheConst.NO_CACHE
+    # SchemaType names (e.g. Enum name/schema) compile into the type but are not in the cache key
+    return (static_key, getattr(sa_type, "name", None), getattr(sa_type, "schema", None))
+
+
+def _clause_key(clause) -> Any:
+    gen = getattr(clause, "_generate_cache_key", None)
+    if gen is None:
+        return _NO_KEY
+    try:
+        ck = gen()
+    except Exception:
+        return _NO_KEY
+    if ck is None:
+        return _NO_KEY
+    # Bound values are not part of the structural key, but they can change the rendered SQL
+    return (ck.key, tuple(getattr(bp, "value", None) for bp in ck.bindparams))
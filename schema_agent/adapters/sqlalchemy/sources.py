@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import os
+import sys
+from dataclasses import dataclass, field
+from importlib.machinery import PathFinder
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
+
+if TYPE_CHECKING:
+    from schema_agent.adapters.git_tree import GitTree
+
+
+@dataclass
+class PackageSources:
+    root: str
+    # dotted module name -> absolute file path / sha256 of file contents
+    paths: Dict[str, str] = field(default_factory=dict)
+    digests: Dict[str, str] = field(default_factory=dict)
+
+
+def locate_root_package(repo_path: Optional[str], module_hint: str) -> Optional[str]:
+    """Return the file or directory of module_hint's top-level package without importing it."""
+    root_pkg = module_hint.split(".")[0]
+    search = list(sys.path)
+    if repo_path:
+        search.insert(0, os.path.abspath(repo_path))
+    spec = PathFinder.find_spec(root_pkg, search)
+    if spec is None:
+        return None
+    if spec.submodule_search_locations:
+        locations = list(spec.submodule_search_locations)
+        return locations[0] if locations else None
+    return spec.origin
+
+
+def scan_package_sources(repo_path: Optional[str], module_hint: Optional[str]) -> Optional[PackageSources]:
+    if not module_hint:
+        return None
+    root_pkg = module_hint.split(".")[0]
+    location = locate_root_package(repo_path, module_hint)
+    if not location:
+        return None
+
+    sources = PackageSources(root=root_pkg)
+    if os.path.isfile(location):
+        sources.paths[root_pkg] = location
+    else:
+        for dirpath, dirnames, filenames in os.walk(location):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d != "__pycache__")
+            rel = os.path.relpath(dirpath, location)
+            prefix = root_pkg if rel == "." else root_pkg + "." + rel.replace(os.sep, ".")
+            for fname in sorted(filenames):
+                if not fname.endswith(".py"):
+                    continue
+                stem = fname[:-3]
+                mod = prefix if stem == "__init__" else f"{prefix}.{stem}"
+                sources.paths[mod] = os.path.join(dirpath, fname)
+
+    for mod, path in sources.paths.items():
+        with open(path, "rb") as fh:
+            sources.digests[mod] = hashlib.sha256(fh.read()).hexdigest()
+    return sources
+
+
+def tree_package_sources(tree: "GitTree", module_hint: Optional[str]) -> Optional[PackageSources]:
+    """Like scan_package_sources, but for a git tree; blob ids stand in for content hashes."""
+    if not module_hint:
+        return None
+    root_pkg = module_hint.split(".")[0]
+    sources = PackageSources(root=root_pkg)
+    for path, oid in tree.files().items():
+        if not path.endswith(".py"):
+            continue
+        if path == f"{root_pkg}.py" or path.startswith(root_pkg + "/"):
+            mod = path[:-3].replace("/", ".")
+            if mod.endswith(".__init__"):
+                mod = mod[: -len(".__init__")]
+            sources.paths[mod] = path
+            sources.digests[mod] = oid
+    return sources if sources.paths else None
+
+
+def sources_fingerprint(sources: PackageSources, extra: Iterable[str] = ()) -> str:
+    h = hashlib.sha256()
+    for part in extra:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    for mod in sorted(sources.digests):
+        h.update(mod.encode("utf-8"))
+        h.update(b"\0")
+        h.update(sources.digests[mod].encode("ascii"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def module_imports(source: bytes, module: str, is_package: bool, known: Iterable[str]) -> Optional[List[str]]:
+    """In-package modules ``module`` imports directly.
+
+    Parent packages that an import runs implicitly are left out: their ``__init__`` usually just
+    aggregates the models, and counting it would make every module depend on the whole package.
+    Returns None when the source cannot be parsed, i.e. its dependencies are unknown.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    known = set(known)
+    package = module if is_package else module.rpartition(".")[0]
+    found: Set[str] = set()
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name in known:
+                    found.add(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package.split(".") if package else []
+                if node.level > 1:
+                    base_parts = base_parts[: len(base_parts) - (node.level - 1)]
+                base = ".".join(base_parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            for alias in node.names:
+                # ``from pkg import sub`` may name a submodule rather than an attribute
+                if f"{base}.{alias.name}" in known:
+                    found.add(f"{base}.{alias.name}")
+                elif base in known:
+                    found.add(base)
+    found.discard(module)
+    return sorted(found)
+
+
+def closure_hashes(digests: Dict[str, str], imports: Dict[str, Optional[List[str]]]) -> Dict[str, str]:
+    """Hash of each module's content together with everything it transitively imports in the package.
+
+    A module with unknown imports depends on the whole package.
+    """
+    everything = sorted(digests)
+    hashes: Dict[str, str] = {}
+    for mod in digests:
+        seen = {mod}
+        stack = [mod]
+        while stack:
+            deps = imports.get(stack.pop())
+            for dep in everything if deps is None else deps:
+                if dep not in seen:
+                    seen.add(dep)
+                    stack.append(dep)
+        h = hashlib.sha256()
+        for dep in sorted(seen):
+            h.update(dep.encode("utf-8"))
+            h.update(b"\0")
+            h.update(digests[dep].encode("ascii"))
+            h.update(b"\n")
+        hashes[mod] = h.hexdigest()
+    return hashes
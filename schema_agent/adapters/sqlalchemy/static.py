@@ -0,0 +1,803 @@
+from __future__ import annotations
+
+import ast
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import sqlalchemy
+from sqlalchemy import func as sa_func
+from sqlalchemy import types as sa_types
+from sqlalchemy.dialects import postgresql as pg
+
+from schema_agent.adapters.base import SchemaAdapter
+from schema_agent.adapters.git_tree import GitTree
+from schema_agent.adapters.sqlalchemy.compiler import CompileCache
+from schema_agent.adapters.sqlalchemy.sources import (
+    locate_root_package,
+    scan_package_sources,
+    sources_fingerprint,
+    tree_package_sources,
+)
+from schema_agent.adapters.workers import available_cpus
+from schema_agent.core.cache import IRCache
+from schema_agent.core.ir import Column, ForeignKey, IR, Index, Table
+
+# Bump whenever the IR emitted for the same sources changes, so cached IRs are invalidated
+STATIC_ADAPTER_VERSION = "2"
+
+# Below this many files per import round the pool costs more than it saves
+_POOL_MIN_FILES = 32
+
+_TYPE_NAMESPACES = (sa_types, sqlalchemy, pg)
+
+# Scanning runs in module-level functions (possibly in pool workers), so each process shares one cache
+_COMPILER = CompileCache()
+_log = logging.getLogger(__name__)
+
+_PY_TYPES = {
+    "int": "Integer",
+    "str": "String",
+    "float": "Float",
+    "bool": "Boolean",
+    "bytes": "LargeBinary",
+    "Decimal": "Numeric",
+    "datetime": "DateTime",
+    "date": "Date",
+    "time": "Time",
+    "timedelta": "Interval",
+    "UUID": "Uuid",
+}
+
+
+class _Unresolved(Exception):
+    pass
+
+
+@dataclass
+class _ColumnScan:
+    attr: str
+    name: str
+    data_type: Optional[str]
+    nullable: Optional[bool]
+    primary_key: bool = False
+    unique: bool = False
+    index: bool = False
+    default: Optional[str] = None
+    generated: Optional[str] = None
+    comment: Optional[str] = None
+    fks: List[Dict[str, Any]] = field(default_factory=list)
+    checks: List[Tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class _TableArgs:
+    primary_key: List[str] = field(default_factory=list)
+    uniques: List[List[str]] = field(default_factory=list)
+    checks: List[Tuple[str, str]] = field(default_factory=list)
+    indexes: List[Dict[str, Any]] = field(default_factory=list)
+    fks: List[Dict[str, Any]] = field(default_factory=list)
+    schema: Optional[str] = None
+    comment: Optional[str] = None
+
+
+@dataclass
+class _ClassScan:
+    name: str
+    module: str
+    lineno: int
+    bases: List[str]
+    tablename: Optional[str] = None
+    abstract: bool = False
+    columns: List[_ColumnScan] = field(default_factory=list)
+    table_args: Optional[_TableArgs] = None
+
+
+@dataclass
+class _ModuleScan:
+    module: str
+    path: str
+    imports: List[str] = field(default_factory=list)
+    classes: List[_ClassScan] = field(default_factory=list)
+    core_tables: List[Tuple[str, List[_ColumnScan], _TableArgs]] = field(default_factory=list)
+    # (class name, index spec) for module-level Index(...) calls on mapped attributes
+    late_indexes: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    unresolved: List[str] = field(default_factory=list)
+
+
+def _call_name(node: ast.AST) -> Optional[str]:
+    target = node.func if isinstance(node, ast.Call) else node
+    if isinstance(target, ast.Name):
+        return target.id
+    if isinstance(target, ast.Attribute):
+        return target.attr
+    return None
+
+
+def _literal(node: ast.AST) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except Exception:
+        raise _Unresolved(f"non-literal expression '{ast.unparse(node)}'")
+
+
+def _kwargs(call: ast.Call) -> Dict[str, ast.AST]:
+    out: Dict[str, ast.AST] = {}
+    for kw in call.keywords:
+        if kw.arg is None:
+            raise _Unresolved(f"**kwargs in '{ast.unparse(call)}'")
+        out[kw.arg] = kw.value
+    return out
+
+
+def _type_class(name: Optional[str]):
+    if not name:
+        return None
+    for ns in _TYPE_NAMESPACES:
+        obj = getattr(ns, name, None)
+        if isinstance(obj, type) and issubclass(obj, sa_types.TypeEngine):
+            return obj
+    return None
+
+
+def _is_type_expr(node: ast.AST) -> bool:
+    if isinstance(node, (ast.Name, ast.Attribute)):
+        return _type_class(_call_name(node)) is not None
+    if isinstance(node, ast.Call):
+        return _type_class(_call_name(node)) is not None
+    return False
+
+
+def _build_type(node: ast.AST) -> sa_types.TypeEngine:
+    if isinstance(node, (ast.Name, ast.Attribute)):
+        cls = _type_class(_call_name(node))
+        if cls is None:
+            raise _Unresolved(f"unknown type '{ast.unparse(node)}'")
+        return cls()
+    if not isinstance(node, ast.Call):
+        raise _Unresolved(f"unsupported type expression '{ast.unparse(node)}'")
+    cls = _type_class(_call_name(node))
+    if cls is None:
+        raise _Unresolved(f"unknown type '{ast.unparse(node)}'")
+    kwargs = _kwargs(node)
+    if issubclass(cls, sa_types.Enum):
+        # Enum(PyEnum) names the type after the Python class unless name= is given
+        name_node = kwargs.get("name")
+        if name_node is not None:
+            return sa_types.Enum(name=_literal(name_node))
+        if len(node.args) == 1 and isinstance(node.args[0], (ast.Name, ast.Attribute)):
+            return sa_types.Enum(name=_call_name(node.args[0]).lower())
+    args = [_build_type(a) if _is_type_expr(a) else _literal(a) for a in node.args]
+    kw = {k: (_build_type(v) if _is_type_expr(v) else _literal(v)) for k, v in kwargs.items()}
+    try:
+        return cls(*args, **kw)
+    except Exception as e:
+        raise _Unresolved(f"cannot build type '{ast.unparse(node)}': {e}")
+
+
+def _compile_type_expr(node: ast.AST) -> str:
+    return _COMPILER.type(_build_type(node))
+
+
+def _annotation_type(node: ast.AST) -> Tuple[Optional[ast.AST], bool]:
+    """Unwrap Mapped[...] into (inner python type, is_optional)."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        node = ast.parse(node.value, mode="eval").body
+    if not (isinstance(node, ast.Subscript) and _call_name(node.value) == "Mapped"):
+        return None, False
+    inner = node.slice
+    if isinstance(inner, ast.Constant) and isinstance(inner.value, str):
+        inner = ast.parse(inner.value, mode="eval").body
+    optional = False
+    if isinstance(inner, ast.Subscript) and _call_name(inner.value) == "Optional":
+        inner, optional = inner.slice, True
+    elif isinstance(inner, ast.BinOp) and isinstance(inner.op, ast.BitOr):
+        parts = [inner.left, inner.right]
+        non_none = [p for p in parts if not (isinstance(p, ast.Constant) and p.value is None)]
+        if len(non_none) == 1:
+            inner, optional = non_none[0], True
+    return inner, optional
+
+
+def _python_type(node: ast.AST) -> str:
+    name = _call_name(node)
+    sa_name = _PY_TYPES.get(name or "")
+    if sa_name is None:
+        raise _Unresolved(f"cannot map annotation '{ast.unparse(node)}' to a SQL type")
+    return _COMPILER.type(getattr(sa_types, sa_name)())
+
+
+def _server_default(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Constant):
+        if node.value is None:
+            return None
+        if isinstance(node.value, str):
+            return node.value
+    if isinstance(node, ast.Call):
+        name = _call_name(node)
+        if name == "text" and len(node.args) == 1:
+            return str(_literal(node.args[0]))
+        if isinstance(node.func, ast.Attribute) and _call_name(node.func.value) == "func":
+            fn = getattr(sa_func, node.func.attr)(*[_literal(a) for a in node.args])
+            return _COMPILER.expr(fn)
+    raise _Unresolved(f"unsupported server_default '{ast.unparse(node)}'")
+
+
+def _fk_spec(call: ast.Call, local_cols: List[str], refs: List[str]) -> Dict[str, Any]:
+    kw = _kwargs(call)
+    ref_table = ""
+    ref_cols: List[str] = []
+    for ref in refs:
+        parts = ref.split(".")
+        if len(parts) < 2:
+            raise _Unresolved(f"foreign key target '{ref}' is not 'table.column'")
+        ref_table = parts[-2]
+        ref_cols.append(parts[-1])
+    return {
+        "name": _literal(kw["name"]) if "name" in kw else None,
+        "columns": local_cols,
+        "ref_table": ref_table,
+        "ref_columns": ref_cols,
+        "ref_full": refs[0].rsplit(".", 1)[0] if refs else "",
+        "on_delete": _literal(kw["ondelete"]) if "ondelete" in kw else None,
+        "on_update": _literal(kw["onupdate"]) if "onupdate" in kw else None,
+        "deferrable": bool(_literal(kw["deferrable"])) if "deferrable" in kw else False,
+        "initially_deferred": (_literal(kw["initially"]) if "initially" in kw else None) == "DEFERRED",
+    }
+
+
+def _column_ref(node: ast.AST) -> str:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    raise _Unresolved(f"unsupported column reference '{ast.unparse(node)}'")
+
+
+def _index_spec(call: ast.Call) -> Dict[str, Any]:
+    kw = _kwargs(call)
+    if not call.args:
+        raise _Unresolved(f"Index without a name '{ast.unparse(call)}'")
+    return {
+        "name": _literal(call.args[0]),
+        "columns": [_column_ref(a) for a in call.args[1:]],
+        "unique": bool(_literal(kw["unique"])) if "unique" in kw else False,
+        "method": _literal(kw["postgresql_using"]) if "postgresql_using" in kw else "btree",
+        "include": list(_literal(kw["postgresql_include"])) if "postgresql_include" in kw else [],
+        "where": _index_where(kw["postgresql_where"]) if "postgresql_where" in kw else None,
+    }
+
+
+def _index_where(node: ast.AST) -> Optional[str]:
+    # only textual predicates (text("...") or a plain string) are resolvable without importing
+    if isinstance(node, ast.Call) and _call_name(node) == "text" and len(node.args) == 1:
+        return str(_literal(node.args[0]))
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    raise _Unresolved(f"unsupported postgresql_where '{ast.unparse(node)}'")
+
+
+def _scan_column(attr: str, call: ast.Call, annotation: Optional[ast.AST]) -> _ColumnScan:
+    kind = _call_name(call)
+    kw = _kwargs(call)
+    name = attr
+    type_node: Optional[ast.AST] = kw.get("type_")
+    col = _ColumnScan(attr=attr, name=attr, data_type=None, nullable=None)
+
+    for i, arg in enumerate(call.args):
+        if i == 0 and isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            name = arg.value
+        elif isinstance(arg, ast.Call) and _call_name(arg) == "ForeignKey":
+            if not arg.args:
+                raise _Unresolved("ForeignKey without a target")
+            col.fks.append(_fk_spec(arg, [], [_literal(arg.args[0])]))
+        elif isinstance(arg, ast.Call) and _call_name(arg) == "Computed":
+            col.generated = "computed"
+        elif isinstance(arg, ast.Call) and _call_name(arg) == "CheckConstraint":
+            ckw = _kwargs(arg)
+            col.checks.append((_literal(ckw["name"]) if "name" in ckw else "", str(_literal(arg.args[0]))))
+        elif isinstance(arg, ast.Call) and _call_name(arg) in ("Identity", "Sequence"):
+            continue
+        elif _is_type_expr(arg):
+            type_node = arg
+        else:
+            raise _Unresolved(f"unsupported argument '{ast.unparse(arg)}'")
+
+    if "name" in kw and kind == "mapped_column":
+        name = _literal(kw["name"])
+    col.name = name
+    for fk in col.fks:
+        fk["columns"] = [name]
+
+    col.primary_key = bool(_literal(kw["primary_key"])) if "primary_key" in kw else False
+    col.unique = bool(_literal(kw["unique"])) if "unique" in kw else False
+    col.index = bool(_literal(kw["index"])) if "index" in kw else False
+    if "comment" in kw:
+        col.comment = _literal(kw["comment"])
+    if "server_default" in kw:
+        col.default = _server_default(kw["server_default"])
+
+    py_type, optional = (None, False)
+    if annotation is not None:
+        py_type, optional = _annotation_type(annotation)
+    if type_node is not None:
+        col.data_type = _compile_type_expr(type_node)
+    elif py_type is not None and not col.fks:
+        col.data_type = _python_type(py_type)
+    elif py_type is not None and col.fks:
+        # FK columns take the referenced column's type; annotation is only a fallback
+        try:
+            col.data_type = _python_type(py_type)
+        except _Unresolved:
+            col.data_type = None
+
+    if "nullable" in kw:
+        col.nullable = bool(_literal(kw["nullable"]))
+    elif col.primary_key:
+        col.nullable = False
+    elif annotation is not None and py_type is not None:
+        col.nullable = optional
+    else:
+        col.nullable = True
+    return col
+
+
+def _scan_table_args(node: ast.AST, out: _TableArgs) -> None:
+    items: Iterable[ast.AST]
+    if isinstance(node, ast.Dict):
+        items = [ast.Dict(keys=node.keys, values=node.values)]
+    elif isinstance(node, (ast.Tuple, ast.List)):
+        items = node.elts
+    else:
+        raise _Unresolved(f"__table_args__ is not a literal tuple/dict: '{ast.unparse(node)}'")
+    for item in items:
+        if isinstance(item, ast.Dict):
+            opts = {_literal(k): v for k, v in zip(item.keys, item.values)}
+            if "schema" in opts:
+                out.schema = _literal(opts["schema"])
+            if "comment" in opts:
+                out.comment = _literal(opts["comment"])
+            continue
+        if not isinstance(item, ast.Call):
+            raise _Unresolved(f"unsupported __table_args__ entry '{ast.unparse(item)}'")
+        _scan_constraint(item, out)
+
+
+def _scan_constraint(item: ast.Call, out: _TableArgs) -> None:
+    kind = _call_name(item)
+    kw = _kwargs(item)
+    if kind == "Index":
+        out.indexes.append(_index_spec(item))
+    elif kind == "UniqueConstraint":
+        out.uniques.append([_column_ref(a) for a in item.args])
+    elif kind == "PrimaryKeyConstraint":
+        out.primary_key = [_column_ref(a) for a in item.args]
+    elif kind == "CheckConstraint":
+        out.checks.append((_literal(kw["name"]) if "name" in kw else "", str(_literal(item.args[0]))))
+    elif kind == "ForeignKeyConstraint":
+        if len(item.args) < 2:
+            raise _Unresolved(f"ForeignKeyConstraint needs columns and targets: '{ast.unparse(item)}'")
+        local = [_column_ref(a) for a in _literal_list(item.args[0])]
+        refs = [_literal(a) for a in _literal_list(item.args[1])]
+        out.fks.append(_fk_spec(item, local, refs))
+    else:
+        raise _Unresolved(f"unsupported table construct '{kind}'")
+
+
+def _literal_list(node: ast.AST) -> List[ast.AST]:
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return list(node.elts)
+    raise _Unresolved(f"expected a literal list: '{ast.unparse(node)}'")
+
+
+def _resolve_relative(module: str, is_package: bool, level: int, target: Optional[str]) -> str:
+    parts = module.split(".")
+    if not is_package:
+        parts = parts[:-1]
+    if level > 1:
+        parts = parts[: len(parts) - (level - 1)]
+    base = ".".join(parts)
+    if target:
+        return f"{base}.{target}" if base else target
+    return base
+
+
+def _scan_module(module: str, path: str, source: bytes) -> _ModuleScan:
+    scan = _ModuleScan(module=module, path=path)
+    try:
+        tree = ast.parse(source, filename=path)
+    except SyntaxError as e:
+        scan.unresolved.append(f"{path}:{e.lineno}: syntax error: {e.msg}")
+        return scan
+
+    is_package = os.path.basename(path) == "__init__.py"
+
+    def note(node: ast.AST, msg: str) -> None:
+        scan.unresolved.append(f"{path}:{getattr(node, 'lineno', 0)}: {msg}")
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            scan.imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                base = _resolve_relative(module, is_package, node.level, node.module)
+            scan.imports.append(base)
+            scan.imports.extend(f"{base}.{alias.name}" for alias in node.names if alias.name != "*")
+        elif isinstance(node, ast.Call) and _call_name(node) in ("import_module", "__import__"):
+            note(node, "dynamic import; imported modules are not scanned")
+        elif isinstance(node, ast.Call) and _call_name(node) == "MetaData" and any(k.arg == "naming_convention" for k in node.keywords):
+            note(node, "MetaData naming_convention is not applied statically; unnamed constraints keep default names")
+
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            scan.classes.append(_scan_class(node, module, note))
+        elif isinstance(node, (ast.Assign, ast.Expr)):
+            value = node.value
+            if isinstance(value, ast.Call) and _call_name(value) == "Table":
+                try:
+                    scan.core_tables.append(_scan_core_table(value))
+                except _Unresolved as e:
+                    note(node, f"Table(): {e}")
+            elif isinstance(value, ast.Call) and _call_name(value) == "Index":
+                try:
+                    spec = _index_spec(value)
+                    owners = {a.value.id for a in value.args[1:] if isinstance(a, ast.Attribute) and isinstance(a.value, ast.Name)}
+                    if len(owners) != 1:
+                        raise _Unresolved("module-level Index must reference attributes of a single mapped class")
+                    scan.late_indexes.append((owners.pop(), spec))
+                except _Unresolved as e:
+                    note(node, f"Index(): {e}")
+    return scan
+
+
+def _scan_class(node: ast.ClassDef, module: str, note) -> _ClassScan:
+    cls = _ClassScan(
+        name=node.name,
+        module=module,
+        lineno=node.lineno,
+        bases=[_call_name(b) or ast.unparse(b) for b in node.bases],
+    )
+    for stmt in node.body:
+        target: Optional[str] = None
+        annotation: Optional[ast.AST] = None
+        value: Optional[ast.AST] = None
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+            target, value = stmt.targets[0].id, stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name):
+            target, annotation, value = stmt.target.id, stmt.annotation, stmt.value
+        elif isinstance(stmt, ast.FunctionDef) and any(_call_name(d) == "declared_attr" for d in stmt.decorator_list):
+            note(stmt, f"{node.name}.{stmt.name}: declared_attr is not evaluated statically")
+            continue
+        if target is None:
+            continue
+
+        try:
+            if target == "__tablename__":
+                cls.tablename = _literal(value)
+            elif target == "__abstract__":
+                cls.abstract = bool(_literal(value))
+            elif target == "__table_args__":
+                cls.table_args = _TableArgs()
+                _scan_table_args(value, cls.table_args)
+            elif isinstance(value, ast.Call) and _call_name(value) in ("Column", "mapped_column"):
+                cls.columns.append(_scan_column(target, value, annotation))
+            elif value is None and annotation is not None:
+                py_type, _ = _annotation_type(annotation)
+                if py_type is not None:
+                    cls.columns.append(_scan_column(target, ast.Call(func=ast.Name(id="mapped_column"), args=[], keywords=[]), annotation))
+        except _Unresolved as e:
+            note(stmt, f"{node.name}.{target}: {e}")
+    return cls
+
+
+def _scan_core_table(call: ast.Call) -> Tuple[str, List[_ColumnScan], _TableArgs]:
+    if not call.args:
+        raise _Unresolved("Table without a name")
+    name = _literal(call.args[0])
+    args = _TableArgs()
+    kw = _kwargs(call)
+    if "schema" in kw:
+        args.schema = _literal(kw["schema"])
+    if "comment" in kw:
+        args.comment = _literal(kw["comment"])
+    columns: List[_ColumnScan] = []
+    for arg in call.args[2:]:
+        if isinstance(arg, ast.Call) and _call_name(arg) == "Column":
+            if not arg.args or not (isinstance(arg.args[0], ast.Constant) and isinstance(arg.args[0].value, str)):
+                raise _Unresolved("Column() inside Table() needs a literal name")
+            columns.append(_scan_column(arg.args[0].value, arg, None))
+        elif isinstance(arg, ast.Call):
+            _scan_constraint(arg, args)
+        else:
+            raise _Unresolved(f"unsupported Table() argument '{ast.unparse(arg)}'")
+    return name, columns, args
+
+
+def _scan_file(job: Tuple[str, str, bytes]) -> _ModuleScan:
+    return _scan_module(*job)
+
+
+class StaticSQLAlchemyAdapter(SchemaAdapter):
+    """Build IR by parsing declarative model sources with ``ast``; no user code is executed."""
+
+    def __init__(self, cache: Optional[IRCache] = None, jobs: Optional[int] = None) -> None:
+        self.cache = cache
+        self.jobs = jobs
+        self.unresolved: List[str] = []
+
+    supports_git_ref = True
+
+    def emit_ir(self, repo_path: str, module_hint: str | None = None, git_ref: Optional[str] = None) -> IR:
+        if not module_hint:
+            raise RuntimeError("module_hint is required for the static SQLAlchemy adapter")
+        tree = GitTree(repo_path, git_ref) if git_ref else None
+        try:
+            key = None
+            if self.cache is not None:
+                sources = tree_package_sources(tree, module_hint) if tree else scan_package_sources(repo_path, module_hint)
+                if sources is not None:
+                    key = sources_fingerprint(
+                        sources,
+                        extra=("sqlalchemy-static", STATIC_ADAPTER_VERSION, sqlalchemy.__version__, module_hint),
+                    )
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        return cached
+
+            scans = self._scan_tree(repo_path, module_hint, tree)
+            ir = self._assemble(scans)
+            if _log.isEnabledFor(logging.DEBUG):
+                _log.debug("compile cache after %s: %s", module_hint, _COMPILER.format_stats())
+            if key is not None:
+                self.cache.put(key, ir)
+            return ir
+        finally:
+            if tree is not None:
+                tree.close()
+
+    # -- discovery -------------------------------------------------------
+
+    def _scan_tree(self, repo_path: str, module_hint: str, tree: Optional[GitTree] = None) -> List[_ModuleScan]:
+        root_pkg = module_hint.split(".")[0]
+        if tree is not None:
+            files = tree.files()
+
+            def module_path(mod: str) -> Optional[str]:
+                rel = mod.replace(".", "/")
+                for candidate in (f"{rel}/__init__.py", f"{rel}.py"):
+                    if candidate in files:
+                        return candidate
+                return None
+
+            read = tree.read
+        else:
+            location = locate_root_package(repo_path, module_hint)
+            if not location:
+                raise RuntimeError(f"Cannot locate package '{root_pkg}' under {repo_path}")
+
+            def module_path(mod: str) -> Optional[str]:
+                if os.path.isfile(location):
+                    return location if mod == root_pkg else None
+                rel = mod.split(".")[1:]
+                pkg_init = os.path.join(location, *rel, "__init__.py")
+                if os.path.isfile(pkg_init):
+                    return pkg_init
+                mod_file = os.path.join(location, *rel) + ".py"
+                if rel and os.path.isfile(mod_file):
+                    return mod_file
+                return None
+
+            def read(path: str) -> bytes:
+                with open(path, "rb") as fh:
+                    return fh.read()
+
+        def with_parents(mod: str) -> List[str]:
+            parts = mod.split(".")
+            return [".".join(parts[: i + 1]) for i in range(len(parts))]
+
+        scans: Dict[str, _ModuleScan] = {}
+        seen: set[str] = set()
+        frontier = with_parents(module_hint)
+        pool: Optional[ProcessPoolExecutor] = None
+        try:
+            while frontier:
+                jobs: List[Tuple[str, str, bytes]] = []
+                for mod in frontier:
+                    if mod in seen or not (mod == root_pkg or mod.startswith(root_pkg + ".")):
+                        continue
+                    seen.add(mod)
+                    path = module_path(mod)
+                    if path is None:
+                        continue
+                    jobs.append((mod, path, read(path)))
+                if not jobs:
+                    break
+                workers = self.jobs if self.jobs is not None else available_cpus()
+                if workers > 1 and len(jobs) >= _POOL_MIN_FILES:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=workers)
+                    results = list(pool.map(_scan_file, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+                else:
+                    results = [_scan_file(job) for job in jobs]
+                frontier = []
+                for res in results:
+                    scans[res.module] = res
+                    for imp in res.imports:
+                        frontier.extend(with_parents(imp))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return [scans[m] for m in sorted(scans)]
+
+    # -- assembly --------------------------------------------------------
+
+    def _assemble(self, scans: List[_ModuleScan]) -> IR:
+        unresolved: List[str] = []
+        classes: Dict[str, List[_ClassScan]] = {}
+        for scan in scans:
+            unresolved.extend(scan.unresolved)
+            for cls in scan.classes:
+                classes.setdefault(cls.name, []).append(cls)
+
+        def lookup(name: str, module: str) -> Optional[_ClassScan]:
+            candidates = classes.get(name) or []
+            for c in candidates:
+                if c.module == module:
+                    return c
+            return candidates[0] if len(candidates) == 1 else None
+
+        def mro(cls: _ClassScan) -> List[_ClassScan]:
+            out: List[_ClassScan] = []
+            for b in cls.bases:
+                base = lookup(b, cls.module)
+                if base is not None and base not in out:
+                    out.append(base)
+                    out.extend(x for x in mro(base) if x not in out)
+            return out
+
+        # (metadata key, table name, columns, table args)
+        specs: List[Tuple[str, str, List[_ColumnScan], _TableArgs]] = []
+        by_class: Dict[str, int] = {}
+        sti: List[Tuple[_ClassScan, _ClassScan]] = []
+        for scan in scans:
+            for cls in scan.classes:
+                ancestors = mro(cls)
+                if cls.tablename is None:
+                    parent = next((a for a in ancestors if a.tablename), None)
+                    if parent is not None and not cls.abstract and cls.columns:
+                        sti.append((cls, parent))
+                    continue
+                if cls.abstract:
+                    continue
+                columns = list(cls.columns)
+                known = {c.attr for c in columns}
+                table_args = cls.table_args
+                for anc in ancestors:
+                    if anc.tablename:
+                        continue  # joined inheritance: parent table keeps its own columns
+                    for c in anc.columns:
+                        if c.attr not in known:
+                            columns.append(c)
+                            known.add(c.attr)
+                    if table_args is None and anc.table_args is not None:
+                        table_args = anc.table_args
+                args = table_args or _TableArgs()
+                key = f"{args.schema}.{cls.tablename}" if args.schema else cls.tablename
+                by_class[cls.name] = len(specs)
+                specs.append((key, cls.tablename, columns, args))
+            for name, columns, args in scan.core_tables:
+                key = f"{args.schema}.{name}" if args.schema else name
+                specs.append((key, name, columns, args))
+
+        for cls, parent in sti:
+            idx = by_class.get(parent.name)
+            if idx is None:
+                continue
+            # single-table inheritance: subclass columns land on the parent table
+            specs[idx][2].extend(c for c in cls.columns if c.attr not in {x.attr for x in specs[idx][2]})
+
+        late: Dict[int, List[Dict[str, Any]]] = {}
+        for scan in scans:
+            for owner, spec in scan.late_indexes:
+                if owner in by_class:
+                    late.setdefault(by_class[owner], []).append(spec)
+                else:
+                    unresolved.append(f"{scan.path}: Index '{spec['name']}' references unknown class '{owner}'")
+
+        col_types: Dict[Tuple[str, str], Optional[str]] = {}
+        for key, name, columns, _ in specs:
+            for c in columns:
+                col_types[(key, c.name)] = c.data_type
+                col_types[(name, c.name)] = c.data_type
+
+        tables: Dict[str, Table] = {}
+        for i, (key, name, columns, args) in enumerate(specs):
+            tables[key] = self._build_table(name, columns, args, late.get(i, []), col_types, unresolved)
+
+        self.unresolved.extend(unresolved)
+        return IR(dialect="postgresql", version=None, tables=tables)
+
+    def _build_table(
+        self,
+        name: str,
+        columns: List[_ColumnScan],
+        args: _TableArgs,
+        late_indexes: List[Dict[str, Any]],
+        col_types: Dict[Tuple[str, str], Optional[str]],
+        unresolved: List[str],
+    ) -> Table:
+        ir_cols: Dict[str, Column] = {}
+        primary_key: List[str] = []
+        uniques: List[List[str]] = []
+        checks: Dict[str, str] = {}
+        indexes: Dict[str, Index] = {}
+        fks: Dict[str, ForeignKey] = {}
+        fk_specs: List[Dict[str, Any]] = []
+
+        pk_cols = set(args.primary_key)
+        for c in columns:
+            data_type = c.data_type
+            if data_type is None and c.fks:
+                fk = c.fks[0]
+                data_type = col_types.get((fk["ref_full"], fk["ref_columns"][0])) or col_types.get(
+                    (fk["ref_table"], fk["ref_columns"][0])
+                )
+            if data_type is None:
+                unresolved.append(f"{name}.{c.name}: could not determine column type")
+                data_type = "NULL"
+            is_pk = c.primary_key or c.name in pk_cols
+            ir_cols[c.name] = Column(
+                name=c.name,
+                data_type=data_type,
+                nullable=False if is_pk else bool(c.nullable),
+                default=c.default,
+                generated=c.generated,
+                collation=None,
+                comment=c.comment,
+            )
+            if is_pk:
+                primary_key.append(c.name)
+            if c.index:
+                idx_name = f"ix_{name}_{c.name}"
+                indexes[idx_name] = Index(name=idx_name, columns=[c.name], unique=c.unique)
+            elif c.unique:
+                uniques.append([c.name])
+            fk_specs.extend(c.fks)
+            for cname, expr in c.checks:
+                checks[cname] = expr
+
+        uniques.extend(args.uniques)
+        for cname, expr in args.checks:
+            checks[cname] = expr
+        fk_specs.extend(args.fks)
+        for fk in fk_specs:
+            fk_name = fk["name"] or f"fk_{name}_{'_'.join(fk['columns'])}"
+            fks[fk_name] = ForeignKey(
+                name=fk_name,
+                columns=fk["columns"],
+                ref_table=fk["ref_table"],
+                ref_columns=fk["ref_columns"],
+                on_delete=fk["on_delete"],
+                on_update=fk["on_update"],
+                deferrable=fk["deferrable"],
+                initially_deferred=fk["initially_deferred"],
+            )
+        # Index/constraint column strings refer to attribute keys, which may differ from column names
+        by_attr = {c.attr: c.name for c in columns}
+        for spec in list(args.indexes) + list(late_indexes):
+            indexes[spec["name"]] = Index(**{**spec, "columns": [by_attr.get(c, c) for c in spec["columns"]]})
+
+        return Table(
+            name=name,
+            columns=ir_cols,
+            primary_key=primary_key,
+            uniques=uniques,
+            checks=checks,
+            indexes=indexes,
+            fks=fks,
+            partitioning=None,
+            comment=args.comment,
+        )
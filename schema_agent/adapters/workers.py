@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from schema_agent.core.ir import IR
+from schema_agent.core.snapshot import SnapshotReader, dump_snapshot
+
+# (repo_path, module_hint, git_ref) for one tree; git_ref=None reads the working directory
+TreeSpec = Tuple[str, Optional[str], Optional[str]]
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def emit_tree_ir(adapter, repo_path: str, module_hint: Optional[str], git_ref: Optional[str] = None) -> IR:
+    if git_ref:
+        if not getattr(adapter, "supports_git_ref", False):
+            raise ValueError(f"{type(adapter).__name__} cannot read trees from git refs")
+        return adapter.emit_ir(repo_path=repo_path, module_hint=module_hint, git_ref=git_ref)
+    return adapter.emit_ir(repo_path=repo_path, module_hint=module_hint)
+
+
+def _emit_ir_worker(adapter, repo_path: str, module_hint: Optional[str], git_ref: Optional[str]) -> Tuple[bytes, List[str]]:
+    ir = emit_tree_ir(adapter, repo_path, module_hint, git_ref)
+    # binary snapshot: every string stored once, decoded without a JSON/pydantic pass
+    return dump_snapshot(ir), list(getattr(adapter, "unresolved", None) or [])
+
+
+def _picklable(obj) -> bool:
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+def emit_irs(adapter, trees: Sequence[TreeSpec], parallel: bool = True) -> List[IR]:
+    """Emit one IR per tree, each in a fresh spawned interpreter when parallel is possible.
+
+    Falls back to sequential in-process extraction on single-core hosts or when the adapter
+    cannot be shipped to a worker.
+    """
+    if not parallel or len(trees) < 2 or available_cpus() < 2 or not _picklable(adapter):
+        return [emit_tree_ir(adapter, *tree) for tree in trees]
+
+    # spawn (not fork) so workers never inherit model modules already imported by the parent
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(trees), mp_context=ctx) as pool:
+        futures = [pool.submit(_emit_ir_worker, adapter, *tree) for tree in trees]
+        irs: List[IR] = []
+        for f in futures:
+            raw, unresolved = f.result()
+            irs.append(SnapshotReader.from_bytes(raw).load())
+            # Surface adapter diagnostics collected in the worker on the parent's instance
+            if unresolved and hasattr(adapter, "unresolved"):
+                adapter.unresolved.extend(unresolved)
+        return irs
+
+
+def split_shards(items: Sequence, n: int) -> List[list]:
+    """Contiguous, near-equal shards of items, at most n of them."""
+    n = max(1, min(n, len(items)))
+    size = -(-len(items) // n)
+    return [list(items[i : i + size]) for i in range(0, len(items), size)]
+
+
+def map_shards(func: Callable[..., list], shards: Sequence, workers: int, *args) -> list:
+    """func(shard, *args) for every shard in a spawned pool of workers; the per-shard result
+    lists are concatenated in shard order."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        out: list = []
+        for result in pool.map(func, shards, *([arg] * len(shards) for arg in args)):
+            out.extend(result)
+        return out
@@ -3,21 +3,26 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 import typer
-from rich.console import Console
-from rich.table import Table
 
-from schema_agent.core.diff import diff_ir
-from schema_agent.core.ir import IR
-from schema_agent.core.sched import schedule_steps
-from schema_agent.policy.hints import load_schema_hints
-from schema_agent.core.registry import AdapterRegistry, DialectRegistry
-from schema_agent.policy.config import load_cli_config
+from schema_agent.core.registry import ADAPTER_ENTRY_POINTS, AdapterRegistry, DialectRegistry
+
+# The IR, adapters, planner and SQL generator (pydantic, SQLAlchemy, yaml) and rich's console
+# are imported inside the commands that use them, so --help and argument errors stay fast.
 
 app = typer.Typer(add_completion=False, help="Schema Agent CLI")
-console = Console()
+_console = None
+
+
+def console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+
+        _console = Console()
+    return _console
 
 
 @app.callback(invoke_without_command=True)
@@ -27,21 +32,33 @@ def main(
     base_module: Optional[str] = typer.Option(None, help="Dotted module for base models"),
     head_dir: Optional[str] = typer.Option(None, help="Head repo directory"),
     head_module: Optional[str] = typer.Option(None, help="Dotted module for head models"),
+    base_ref: Optional[str] = typer.Option(None, help="Read the base tree from this git ref instead of a checkout (base_dir is the path inside the repo, default '.')"),
+    head_ref: Optional[str] = typer.Option(None, help="Read the head tree from this git ref instead of a checkout"),
     dialect: str = typer.Option("postgresql", help="Target DB dialect"),
-    adapter: str = typer.Option("sqlalchemy", help=f"Schema adapter to use. Available: {', '.join(AdapterRegistry.names())}"),
+    adapter: str = typer.Option("sqlalchemy", help=f"Schema adapter to use. Built in: {', '.join(AdapterRegistry.names(discover=False))}; plugins register via the '{ADAPTER_ENTRY_POINTS}' entry point group"),
     out_dir: str = typer.Option("./artifacts", help="Output directory"),
     schema_hints: Optional[str] = typer.Option(None, help="Path to schema_hints.yml"),
     fail_on_unsafe: bool = typer.Option(False, help="Fail on destructive ops not allowlisted"),
     summary_only: bool = typer.Option(False, help="Print plan only, skip writing SQL files"),
     summary_json: Optional[str] = typer.Option(None, help="If set, write plan summary JSON to this file"),
+    ir_cache_dir: Optional[str] = typer.Option(None, help="Directory for the on-disk IR cache (disabled if unset)"),
+    ir_cache_max_mb: int = typer.Option(512, help="Size bound for the IR cache in MiB (LRU eviction)"),
+    parallel_ir: bool = typer.Option(False, help="Extract base and head IR in separate worker processes"),
+    parallel_diff: bool = typer.Option(False, help="Diff changed tables in a process pool when there is enough rename work to pay for it"),
+    stream: bool = typer.Option(False, help="Diff, plan and write SQL one table at a time, keeping memory bounded by the largest table"),
+    ir_format: str = typer.Option("json", help="Format of the ir_base/ir_head debug dumps: json or binary (mmap-able snapshot)"),
+    table_stats: Optional[str] = typer.Option(None, help="Per-table statistics (JSON or CSV) for size-aware strategy selection"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Log debug details, such as compile cache hits, to stderr"),
 ):
     """Backward-compatible root options: if provided without a subcommand, run the diff command."""
-    if ctx.invoked_subcommand is None and base_dir and head_dir:
+    if ctx.invoked_subcommand is None and (base_dir or base_ref) and (head_dir or head_ref):
         return diff(
             base_dir=base_dir,
             base_module=base_module,
             head_dir=head_dir,
             head_module=head_module,
+            base_ref=base_ref,
+            head_ref=head_ref,
             dialect=dialect,
             adapter=adapter,
             out_dir=out_dir,
@@ -49,6 +66,14 @@ def main(
             fail_on_unsafe=fail_on_unsafe,
             summary_only=summary_only,
             summary_json=summary_json,
+            ir_cache_dir=ir_cache_dir,
+            ir_cache_max_mb=ir_cache_max_mb,
+            parallel_ir=parallel_ir,
+            parallel_diff=parallel_diff,
+            stream=stream,
+            ir_format=ir_format,
+            table_stats=table_stats,
+            verbose=verbose,
         )
     # If a subcommand is invoked, do nothing here
     return None
@@ -61,6 +86,8 @@ def run(
     summary_json: Optional[str] = typer.Option(None, help="If set, write plan summary JSON to this file"),
 ):
     """Run using a YAML config file. Looks for ./schema-agent.yml if not provided."""
+    from schema_agent.policy.config import load_cli_config
+
     cfg_path = config or os.path.join(os.getcwd(), "schema-agent.yml")
     cfg = load_cli_config(cfg_path)
     if not cfg:
@@ -79,6 +106,8 @@ def run(
         base_module=base_module,
         head_dir=head_dir,
         head_module=head_module,
+        base_ref=cfg.get("base_ref"),
+        head_ref=cfg.get("head_ref"),
         dialect=dialect,
         adapter=adapter,
         out_dir=out_dir,
@@ -86,23 +115,56 @@ def run(
         fail_on_unsafe=bool(cfg.get("fail_on_unsafe", False)),
         summary_only=bool(cfg.get("summary_only", False)),
         summary_json=summary_json or cfg.get("summary_json"),
+        ir_cache_dir=cfg.get("ir_cache_dir"),
+        ir_cache_max_mb=int(cfg.get("ir_cache_max_mb", 512)),
+        parallel_ir=bool(cfg.get("parallel_ir", False)),
+        parallel_diff=bool(cfg.get("parallel_diff", False)),
+        stream=bool(cfg.get("stream", False)),
+        ir_format=cfg.get("ir_format", "json"),
+        table_stats=cfg.get("table_stats"),
+        verbose=bool(cfg.get("verbose", False)),
     )
 
 
 @app.command("diff")
 def diff(
-    base_dir: str = typer.Option(..., help="Base repo directory"),
+    base_dir: Optional[str] = typer.Option(None, help="Base repo directory (required unless --base-ref is given)"),
     base_module: Optional[str] = typer.Option(None, help="Dotted module for base models"),
-    head_dir: str = typer.Option(..., help="Head repo directory"),
+    head_dir: Optional[str] = typer.Option(None, help="Head repo directory (required unless --head-ref is given)"),
     head_module: Optional[str] = typer.Option(None, help="Dotted module for head models"),
+    base_ref: Optional[str] = typer.Option(None, help="Read the base tree from this git ref instead of a checkout (base_dir is the path inside the repo, default '.')"),
+    head_ref: Optional[str] = typer.Option(None, help="Read the head tree from this git ref instead of a checkout"),
     dialect: str = typer.Option("postgresql", help="Target DB dialect"),
-    adapter: str = typer.Option("sqlalchemy", help=f"Schema adapter to use. Available: {', '.join(AdapterRegistry.names())}"),
+    adapter: str = typer.Option("sqlalchemy", help=f"Schema adapter to use. Built in: {', '.join(AdapterRegistry.names(discover=False))}; plugins register via the '{ADAPTER_ENTRY_POINTS}' entry point group"),
     out_dir: str = typer.Option("./artifacts", help="Output directory"),
     schema_hints: Optional[str] = typer.Option(None, help="Path to schema_hints.yml. If not provided, will look for './schema_hints.yml' or '{out_dir}/schema_hints.yml'"),
     fail_on_unsafe: bool = typer.Option(False, help="Fail on destructive ops not allowlisted"),
     summary_only: bool = typer.Option(False, help="Print plan only, skip writing SQL files"),
     summary_json: Optional[str] = typer.Option(None, help="If set, write plan summary JSON to this file"),
+    ir_cache_dir: Optional[str] = typer.Option(None, help="Directory for the on-disk IR cache (disabled if unset)"),
+    ir_cache_max_mb: int = typer.Option(512, help="Size bound for the IR cache in MiB (LRU eviction)"),
+    parallel_ir: bool = typer.Option(False, help="Extract base and head IR in separate worker processes"),
+    parallel_diff: bool = typer.Option(False, help="Diff changed tables in a process pool when there is enough rename work to pay for it"),
+    stream: bool = typer.Option(False, help="Diff, plan and write SQL one table at a time, keeping memory bounded by the largest table"),
+    ir_format: str = typer.Option("json", help="Format of the ir_base/ir_head debug dumps: json or binary (mmap-able snapshot)"),
+    table_stats: Optional[str] = typer.Option(None, help="Per-table statistics (JSON or CSV: row count, heap/index bytes, write rate) for size-aware strategy selection; overrides the hints' table_stats"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Log debug details, such as compile cache hits, to stderr"),
 ):
+    if not base_dir and not base_ref:
+        raise typer.BadParameter("Provide --base-dir or --base-ref")
+    if not head_dir and not head_ref:
+        raise typer.BadParameter("Provide --head-dir or --head-ref")
+    if ir_format not in _IR_FORMATS:
+        raise typer.BadParameter(f"--ir-format must be one of: {', '.join(_IR_FORMATS)}")
+    if verbose:
+        _enable_debug_log()
+
+    from schema_agent.adapters.workers import available_cpus, emit_irs
+    from schema_agent.core.cache import IRCache
+    from schema_agent.core.diff import diff_ir, iter_diff_ir
+    from schema_agent.core.sched import plan_stream, schedule_steps
+    from schema_agent.policy.hints import HintsError, load_schema_hints
+
     # Validate adapter
     adapter_factory = AdapterRegistry.get(adapter)
     if not adapter_factory:
@@ -115,6 +177,9 @@ def diff(
         raise typer.BadParameter(
             f"Unsupported dialect '{dialect}'. Supported: {', '.join(DialectRegistry.supported_dialects())}"
         )
+    writer = DialectRegistry.get_writer(dialect) if stream else None
+    if stream and not writer:
+        raise typer.BadParameter(f"Dialect '{dialect}' does not support --stream")
 
     # resolve hints path with defaults
     hints_path = schema_hints
@@ -123,38 +188,78 @@ def diff(
             if os.path.exists(candidate):
                 hints_path = candidate
                 break
-    hints = load_schema_hints(hints_path)
+    try:
+        hints = load_schema_hints(hints_path)
+    except HintsError as e:
+        raise typer.BadParameter(f"schema hints {hints_path}: {e}")
+    if table_stats:
+        from schema_agent.policy.stats import load_table_stats
 
-    adapter_impl = adapter_factory()
-    base_ir: IR = adapter_impl.emit_ir(repo_path=base_dir, module_hint=base_module)
-    head_ir: IR = adapter_impl.emit_ir(repo_path=head_dir, module_hint=head_module)
+        try:
+            hints = hints.with_table_stats(load_table_stats(table_stats))
+        except (OSError, ValueError) as e:
+            raise typer.BadParameter(f"--table-stats: {e}")
+
+    adapter_options: Dict = {}
+    if ir_cache_dir:
+        adapter_options["cache"] = IRCache(ir_cache_dir, max_bytes=ir_cache_max_mb * 1024 * 1024)
+    try:
+        adapter_impl = adapter_factory(**adapter_options)
+    except TypeError:
+        if not adapter_options:
+            raise
+        raise typer.BadParameter(f"Adapter '{adapter}' does not support --ir-cache-dir")
+    if (base_ref or head_ref) and not getattr(adapter_impl, "supports_git_ref", False):
+        raise typer.BadParameter(f"Adapter '{adapter}' cannot read trees from git refs")
+    trees = [(base_dir or ".", base_module, base_ref), (head_dir or ".", head_module, head_ref)]
+    base_ir, head_ir = emit_irs(adapter_impl, trees, parallel=parallel_ir)
+    for msg in getattr(adapter_impl, "unresolved", None) or []:
+        console().print(f"[yellow]unresolved: {msg}[/yellow]")
 
     # Debug when no tables detected
     if not base_ir.tables or not head_ir.tables:
-        console.print("[yellow]No tables detected in one of the trees. base tables=%s head tables=%s[/yellow]" % (list(base_ir.tables.keys()), list(head_ir.tables.keys())))
+        console().print("[yellow]No tables detected in one of the trees. base tables=%s head tables=%s[/yellow]" % (list(base_ir.tables.keys()), list(head_ir.tables.keys())))
+
+    if writer:
+        # ops, steps and SQL exist for one table at a time; files are written as they are produced
+        if not summary_only:
+            Path(out_dir).mkdir(parents=True, exist_ok=True)
+        groups = plan_stream(planner, base_ir, head_ir, iter_diff_ir(base_ir, head_ir, hints), hints)
+        summary = writer(
+            groups,
+            None if summary_only else str(Path(out_dir) / "forward.sql"),
+            None if summary_only else str(Path(out_dir) / "rollback.sql"),
+            hints,
+        )
+        _print_summary(summary)
+        if summary_json:
+            Path(summary_json).write_text(json.dumps(summary, indent=2))
+    else:
+        ops = diff_ir(base_ir, head_ir, hints, workers=available_cpus() if parallel_diff else 0)
+        steps = planner(base_ir, head_ir, ops, hints)
+        ordered = schedule_steps(steps)
 
-    ops = diff_ir(base_ir, head_ir, hints)
-    steps = planner(base_ir, head_ir, ops, hints)
-    ordered = schedule_steps(steps)
+        forward_sql, rollback_sql, summary = sqlgen(ordered, hints)
+        # If nothing was generated, be explicit
+        if len(ordered) == 0:
+            forward_sql = "-- no schema changes detected\n"
+            rollback_sql = "-- no schema changes detected\n"
 
-    forward_sql, rollback_sql, summary = sqlgen(ordered, hints)
-    # If nothing was generated, be explicit
-    if len(ordered) == 0:
-        forward_sql = "-- no schema changes detected\n"
-        rollback_sql = "-- no schema changes detected\n"
+        _print_summary(summary)
+        if summary_json:
+            Path(summary_json).write_text(json.dumps(summary, indent=2))
 
-    _print_summary(summary)
-    if summary_json:
-        Path(summary_json).write_text(json.dumps(summary, indent=2))
+        if not summary_only:
+            Path(out_dir).mkdir(parents=True, exist_ok=True)
+            (Path(out_dir) / "forward.sql").write_text(forward_sql)
+            (Path(out_dir) / "rollback.sql").write_text(rollback_sql)
 
     if not summary_only:
-        Path(out_dir).mkdir(parents=True, exist_ok=True)
-        (Path(out_dir) / "forward.sql").write_text(forward_sql)
-        (Path(out_dir) / "rollback.sql").write_text(rollback_sql)
         # Debug: dump IRs for troubleshooting in CI
         try:
-            (Path(out_dir) / "ir_base.json").write_text(base_ir.model_dump_json(indent=2))
-            (Path(out_dir) / "ir_head.json").write_text(head_ir.model_dump_json(indent=2))
+            suffix = _IR_FORMATS[ir_format]
+            _write_ir(base_ir, str(Path(out_dir) / f"ir_base{suffix}"), ir_format)
+            _write_ir(head_ir, str(Path(out_dir) / f"ir_head{suffix}"), ir_format)
         except Exception:
             pass
 
@@ -163,21 +268,135 @@ def diff(
         raise typer.Exit(code=2)
 
 
+def _enable_debug_log() -> None:
+    import logging
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(name)s: %(message)s"))
+    logger = logging.getLogger("schema_agent")
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+
+
+# --ir-format -> file suffix
+_IR_FORMATS = {"json": ".json", "binary": ".irsnap"}
+
+
+def _ir_format_for(path: str, explicit: Optional[str] = None) -> str:
+    if explicit:
+        if explicit not in _IR_FORMATS:
+            raise typer.BadParameter(f"--format must be one of: {', '.join(_IR_FORMATS)}")
+        return explicit
+    return "json" if path.endswith(".json") else "binary"
+
+
+def _write_ir(ir, path: str, fmt: str) -> None:
+    if fmt == "binary":
+        from schema_agent.core.snapshot import write_snapshot
+
+        write_snapshot(ir, path)
+    else:
+        Path(path).write_text(ir.model_dump_json(indent=2))
+
+
+def _read_ir(path: str):
+    from schema_agent.core.ir import IR
+    from schema_agent.core.snapshot import is_snapshot, read_snapshot
+
+    if is_snapshot(path):
+        return read_snapshot(path)
+    return IR.model_validate_json(Path(path).read_bytes())
+
+
+ir_app = typer.Typer(help="Emit, inspect and convert IR files (JSON or binary snapshots)")
+app.add_typer(ir_app, name="ir")
+
+
+@ir_app.command("dump")
+def ir_dump(
+    out: str = typer.Argument(..., help="Output file; *.json is written as JSON, anything else as a binary snapshot"),
+    dir: str = typer.Option(".", "--dir", help="Repo directory (or path inside the repo with --ref)"),
+    module: Optional[str] = typer.Option(None, help="Dotted module for the models"),
+    ref: Optional[str] = typer.Option(None, help="Read the tree from this git ref instead of the checkout"),
+    adapter: str = typer.Option("sqlalchemy", help="Schema adapter to use"),
+    format: Optional[str] = typer.Option(None, "--format", help="json or binary (default: from the file name)"),
+):
+    """Emit the IR of one tree and write it to a file."""
+    from schema_agent.adapters.workers import emit_tree_ir
+
+    adapter_factory = AdapterRegistry.get(adapter)
+    if not adapter_factory:
+        raise typer.BadParameter(f"Unknown adapter '{adapter}'. Available: {', '.join(AdapterRegistry.names())}")
+    adapter_impl = adapter_factory()
+    if ref and not getattr(adapter_impl, "supports_git_ref", False):
+        raise typer.BadParameter(f"Adapter '{adapter}' cannot read trees from git refs")
+    ir = emit_tree_ir(adapter_impl, dir, module, ref)
+    _write_ir(ir, out, _ir_format_for(out, format))
+    console().print(f"Wrote {len(ir.tables)} tables to {out}")
+
+
+@ir_app.command("load")
+def ir_load(
+    path: str = typer.Argument(..., help="IR file (JSON or binary snapshot)"),
+    table: Optional[str] = typer.Option(None, help="Print only this table; snapshots decode nothing else"),
+    list_tables: bool = typer.Option(False, "--list", help="Print table names only"),
+):
+    """Print an IR file as JSON."""
+    from schema_agent.core.snapshot import SnapshotReader, is_snapshot
+
+    if is_snapshot(path) and (table or list_tables):
+        with SnapshotReader(path) as reader:
+            if list_tables:
+                typer.echo("\n".join(reader.table_names()))
+                return
+            found = reader.table(table)
+    else:
+        ir = _read_ir(path)
+        if list_tables:
+            typer.echo("\n".join(sorted(ir.tables)))
+            return
+        found = ir.tables.get(table) if table else ir
+    if found is None:
+        raise typer.BadParameter(f"No table '{table}' in {path}")
+    typer.echo(found.model_dump_json(indent=2))
+
+
+@ir_app.command("convert")
+def ir_convert(
+    src: str = typer.Argument(..., help="IR file (JSON or binary snapshot)"),
+    dst: str = typer.Argument(..., help="Output file; *.json is written as JSON, anything else as a binary snapshot"),
+    format: Optional[str] = typer.Option(None, "--format", help="json or binary (default: from the file name)"),
+):
+    """Convert between JSON IR and binary snapshots."""
+    _write_ir(_read_ir(src), dst, _ir_format_for(dst, format))
+
+
 def _print_summary(summary: dict) -> None:
+    from rich.table import Table
+
     table = Table(title="Schema Agent Plan Summary")
     table.add_column("Table")
     table.add_column("Ops")
     table.add_column("Risk Flags")
     table.add_column("Steps (prep/backfill/tighten/indexes/finalize)")
 
-    for tname, info in summary.get("tables", {}).items():
-        table.add_row(
+    tables = summary.get("tables", {})
+    with_strategy = any("strategy" in info for info in tables.values())
+    if with_strategy:
+        table.add_column("Strategy")
+
+    for tname, info in tables.items():
+        row = [
             tname,
             ", ".join(info.get("ops", [])),
             ", ".join(info.get("risks", [])),
             "/".join(str(x) for x in info.get("phase_counts", [0, 0, 0, 0, 0])),
-        )
-    console.print(table)
+        ]
+        if with_strategy:
+            strategy = info.get("strategy")
+            row.append(f"{strategy['name']} ({strategy['reason']})" if strategy else "")
+        table.add_row(*row)
+    console().print(table)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, Field
+
+from schema_agent.core.ir import IR
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+_SUFFIX = ".ir.json"
+_SNAPSHOT_SUFFIX = ".snap.json"
+
+_M = TypeVar("_M", bound=BaseModel)
+
+
+class IRSnapshot(BaseModel):
+    """Last IR emitted for one tree, with enough provenance to reuse unchanged tables."""
+
+    ir: IR
+    # module -> content digest / direct in-package imports / hash over its import closure
+    module_digests: Dict[str, str] = Field(default_factory=dict)
+    module_imports: Dict[str, List[str]] = Field(default_factory=dict)
+    module_hashes: Dict[str, str] = Field(default_factory=dict)
+    # table key -> modules its emitted IR depends on
+    table_modules: Dict[str, List[str]] = Field(default_factory=dict)
+
+
+class IRCache:
+    """On-disk IR store keyed by a source fingerprint, bounded to max_bytes with LRU eviction."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str, suffix: str = _SUFFIX) -> Path:
+        return Path(self.cache_dir) / f"{key}{suffix}"
+
+    def get(self, key: str) -> Optional[IR]:
+        return self._read(self._path(key), IR)
+
+    def put(self, key: str, ir: IR) -> None:
+        self._write(self._path(key), ir)
+
+    def get_snapshot(self, key: str) -> Optional[IRSnapshot]:
+        return self._read(self._path(key, _SNAPSHOT_SUFFIX), IRSnapshot)
+
+    def put_snapshot(self, key: str, snapshot: IRSnapshot) -> None:
+        self._write(self._path(key, _SNAPSHOT_SUFFIX), snapshot)
+
+    def _read(self, path: Path, model: Type[_M]) -> Optional[_M]:
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            obj = model.model_validate_json(raw)
+        except Exception:
+            # Corrupt or stale-format entry: drop it and treat as a miss
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        _touch(path)
+        return obj
+
+    def _write(self, path: Path, obj: BaseModel) -> None:
+        root = Path(self.cache_dir)
+        root.mkdir(parents=True, exist_ok=True)
+        data = obj.model_dump_json().encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        # Write atomically so concurrent CI jobs never observe a partial entry
+        fd, tmp = tempfile.mkstemp(dir=root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+            _touch(path)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        self._evict()
+
+    def _entries(self) -> List[Tuple[int, int, Path]]:
+        entries: List[Tuple[int, int, Path]] = []
+        try:
+            it = os.scandir(self.cache_dir)
+        except OSError:
+            return entries
+        with it:
+            for de in it:
+                if not de.name.endswith((_SUFFIX, _SNAPSHOT_SUFFIX)):
+                    continue
+                try:
+                    st = de.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, Path(de.path)))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries, key=lambda e: (e[0], e[2].name)):
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def _touch(path: Path) -> None:
+    # Explicit ns timestamps: filesystem clocks can be too coarse to order back-to-back accesses
+    now = time.time_ns()
+    try:
+        os.utime(path, ns=(now, now))
+    except OSError:
+        pass
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field, replace
 from enum import Enum
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from pydantic import BaseModel
-
-from schema_agent.core.ir import IR, Table
+from schema_agent.core.ir import IR, ForeignKey, Table, _Model
+from schema_agent.core.renames import match_column_renames, match_table_renames
+from schema_agent.policy.hints import compile_policy
 
 
 class OpKind(str, Enum):
@@ -21,39 +22,205 @@ class OpKind(str, Enum):
     ALTER_DEFAULT = "alter_default"
     ADD_INDEX = "add_index"
     DROP_INDEX = "drop_index"
+    RENAME_INDEX = "rename_index"
+    REBUILD_INDEX = "rebuild_index"
     ADD_FK = "add_fk"
     DROP_FK = "drop_fk"
+    REBUILD_FK = "rebuild_fk"
+    RENAME_CONSTRAINT = "rename_constraint"
     ADD_UNIQUE = "add_unique"
     DROP_UNIQUE = "drop_unique"
     ADD_CHECK = "add_check"
     DROP_CHECK = "drop_check"
+    REBUILD_CHECK = "rebuild_check"
+
 
+@dataclass(slots=True)
+class Op(_Model):
+    """One schema change. Payload values that describe a whole object (`table`, `column`, `index`,
+    `fk`) are the head IR's own Table/Column/Index/ForeignKey instances, not copies: treat them
+    as read-only. model_dump()/model_dump_json() export plain dicts, e.g. for JSON output."""
 
-class Op(BaseModel):
     kind: OpKind
     table: str
-    payload: dict
+    payload: Dict[str, Any] = field(default_factory=dict)
 
+    def __post_init__(self) -> None:
+        if type(self.kind) is not OpKind:
+            self.kind = OpKind(self.kind)
 
-def diff_ir(base: IR, head: IR, hints: Dict) -> List[Op]:
-    ops: List[Op] = []
 
-    base_tables = set(base.tables.keys())
-    head_tables = set(head.tables.keys())
+# Shipping tables to workers and rebuilding their ops in the parent costs about as much as
+# diffing a table whose columns are merely altered, so the pool only pays off when rename
+# matching dominates. Work is counted as (dropped x added) column pairs scored; below this,
+# spawning the pool costs more than it saves (see scripts/bench_diff_parallel.py).
+PARALLEL_DIFF_MIN_WORK = 500_000
 
-    for t in sorted(head_tables - base_tables):
-        ops.append(Op(kind=OpKind.CREATE_TABLE, table=t, payload={"table": head.tables[t].model_dump()}))
-    for t in sorted(base_tables - head_tables):
-        ops.append(Op(kind=OpKind.DROP_TABLE, table=t, payload={}))
+# (base table, head table, key to file the ops under or None for the base table's name)
+_TablePair = Tuple[Table, Table, Optional[str]]
+# Where an FK's parent went, keyed by the base ref_table: (head table name, base -> head column renames)
+_ParentRenames = Dict[str, Tuple[str, Dict[str, str]]]
 
-    for t in sorted(base_tables & head_tables):
-        ops.extend(_diff_table(base.tables[t], head.tables[t], hints))
+# One table's worth of ops: (leading op kind or None, table key, old key of a rename, pair to diff or None)
+_Job = Tuple[Optional[OpKind], str, Optional[str], Optional[_TablePair]]
 
+
+def diff_ir(base: IR, head: IR, hints: Dict, workers: int = 0) -> List[Op]:
+    """Diff two IRs. With workers > 1, changed tables are diffed in up to that many processes
+    when there is enough work (PARALLEL_DIFF_MIN_WORK); the ops are the same either way."""
+    hints = compile_policy(hints)
+    jobs, moved = _table_jobs(base, head, hints)
+    pairs = [job[3] for job in jobs if job[3] is not None]
+    parents = _parent_renames(base, head, moved, [b for b, _, _ in pairs], hints)
+    results = iter(_diff_tables(pairs, hints, workers, head.dialect, parents))
+    ops: List[Op] = []
+    for kind, key, old, pair in jobs:
+        ops.extend(_lead_ops(kind, key, old, head))
+        if pair is not None:
+            ops.extend(next(results))
     return ops
 
 
-def _diff_table(base: Table, head: Table, hints: Dict) -> List[Op]:
+def iter_diff_ir(base: IR, head: IR, hints: Dict) -> Iterator[List[Op]]:
+    """The ops of diff_ir, in the same order, yielded one table at a time and computed lazily."""
+    hints = compile_policy(hints)
+    jobs, moved = _table_jobs(base, head, hints)
+    parents: _ParentRenames = {}
+    for kind, key, old, pair in jobs:
+        ops = _lead_ops(kind, key, old, head)
+        if pair is not None:
+            _parent_renames(base, head, moved, [pair[0]], hints, parents)
+            ops.extend(_diff_table(pair[0], pair[1], hints, table=pair[2], parents=parents))
+        if ops:
+            yield ops
+
+
+def _table_jobs(base: IR, head: IR, hints: Dict) -> Tuple[List[_Job], Dict[str, str]]:
+    """The per-table jobs, and the renamed tables as {base key: head key}."""
+    base_tables = set(base.tables.keys())
+    head_tables = set(head.tables.keys())
+    created = head_tables - base_tables
+    dropped = base_tables - head_tables
+
+    table_renames = match_table_renames(base, head, dropped, created, compile_policy(hints).table_renames)
+    created -= {new for _, new in table_renames}
+    dropped -= {old for old, _ in table_renames}
+
+    def _changed(btable: Table, htable: Table, table: Optional[str]) -> Optional[_TablePair]:
+        if btable.content_hash is not None and btable.content_hash == htable.content_hash:
+            return None  # structurally identical
+        return btable, htable, table
+
+    jobs: List[_Job] = [(OpKind.CREATE_TABLE, t, None, None) for t in sorted(created)]
+    jobs.extend((OpKind.DROP_TABLE, t, None, None) for t in sorted(dropped))
+    for old, new in sorted(table_renames, key=lambda r: r[1]):
+        jobs.append((OpKind.RENAME_TABLE, new, old, _changed(base.tables[old], head.tables[new], new)))
+    for t in sorted(base_tables & head_tables):
+        pair = _changed(base.tables[t], head.tables[t], None)
+        if pair is not None:
+            jobs.append((None, t, None, pair))
+    return jobs, dict(table_renames)
+
+
+def _parent_renames(
+    base: IR, head: IR, moved: Dict[str, str], tables: Iterable[Table], hints: Dict, cache: Optional[_ParentRenames] = None
+) -> _ParentRenames:
+    """Where the parents referenced by the FKs of `tables` went: their head name and the column
+    renames the parent's own diff infers, so an FK is compared in head names like its columns."""
+    out: _ParentRenames = {} if cache is None else cache
+    keys: Optional[Dict[str, Optional[str]]] = None
+    for table in tables:
+        for fk in table.fks.values():
+            if fk.ref_table in out:
+                continue
+            if keys is None:
+                # ref_table is an unqualified name; names used by several schemas stay unresolved
+                keys = {}
+                for key, t in base.tables.items():
+                    keys[t.name] = None if t.name in keys else key
+            key = keys.get(fk.ref_table)
+            bparent = base.tables.get(key) if key is not None else None
+            hparent = head.tables.get(moved.get(key, key)) if key is not None else None
+            if bparent is None or hparent is None:
+                out[fk.ref_table] = (fk.ref_table, {})
+                continue
+            cols: Dict[str, str] = {}
+            if bparent.content_hash != hparent.content_hash:
+                removed = list(bparent.columns.keys() - hparent.columns.keys())
+                added = list(hparent.columns.keys() - bparent.columns.keys())
+                if removed and added:
+                    hint_map = compile_policy(hints).column_renames_for(bparent.name, hparent.name)
+                    cols = dict(match_column_renames(bparent, hparent, removed, added, hint_map))
+            out[fk.ref_table] = (hparent.name, cols)
+    return out
+
+
+def _lead_ops(kind: Optional[OpKind], key: str, old: Optional[str], head: IR) -> List[Op]:
+    if kind == OpKind.CREATE_TABLE:
+        return [Op(kind=kind, table=key, payload={"table": head.tables[key]})]
+    if kind == OpKind.DROP_TABLE:
+        return [Op(kind=kind, table=key, payload={})]
+    if kind == OpKind.RENAME_TABLE:
+        return [Op(kind=kind, table=key, payload={"from": old, "to": key})]
+    return []
+
+
+def _diff_pairs(pairs: List[_TablePair], hints: Dict, parents: Optional[_ParentRenames] = None) -> List[List[Op]]:
+    return [_diff_table(b, h, hints, table=t, parents=parents) for b, h, t in pairs]
+
+
+def _rename_work(pairs: List[_TablePair]) -> int:
+    work = 0
+    for b, h, _ in pairs:
+        bcols, hcols = b.columns.keys(), h.columns.keys()
+        work += len(bcols - hcols) * len(hcols - bcols)
+    return work
+
+
+def _encode_shard(pairs: List[_TablePair], dialect: str) -> Tuple[bytes, bytes, List[Optional[str]]]:
+    # Binary snapshots are far smaller and cheaper to ship than pickled IR objects
+    from schema_agent.core.snapshot import dump_snapshot
+
+    base = IR(dialect=dialect, tables={str(i): b for i, (b, _, _) in enumerate(pairs)})
+    head = IR(dialect=dialect, tables={str(i): h for i, (_, h, _) in enumerate(pairs)})
+    return dump_snapshot(base), dump_snapshot(head), [t for _, _, t in pairs]
+
+
+def _diff_encoded_shard(
+    shard: Tuple[bytes, bytes, List[Optional[str]]], hints: Dict, parents: Optional[_ParentRenames] = None
+) -> List[List[tuple]]:
+    from schema_agent.core.snapshot import SnapshotReader
+
+    base_blob, head_blob, names = shard
+    bases = SnapshotReader.from_bytes(base_blob).tables()
+    heads = SnapshotReader.from_bytes(head_blob).tables()
+    pairs = [(b, h, t) for (_, b), (_, h), t in zip(bases, heads, names)]
+    return [[(op.kind.value, op.table, op.payload) for op in ops] for ops in _diff_pairs(pairs, hints, parents)]
+
+
+def _diff_tables(
+    pairs: List[_TablePair], hints: Dict, workers: int, dialect: str = "postgresql", parents: Optional[_ParentRenames] = None
+) -> List[List[Op]]:
+    if workers > 1 and _rename_work(pairs) >= PARALLEL_DIFF_MIN_WORK:
+        # imported here: the pool helpers live with the IR workers and pull in multiprocessing
+        from schema_agent.adapters.workers import available_cpus, map_shards, split_shards
+
+        workers = min(workers, available_cpus())
+        if workers > 1:
+            # a few shards per worker even out uneven tables
+            shards = [_encode_shard(chunk, dialect) for chunk in split_shards(pairs, workers * 4)]
+            results = map_shards(_diff_encoded_shard, shards, workers, hints, parents)
+            return [[Op(kind=k, table=t, payload=p) for k, t, p in ops] for ops in results]
+    return _diff_pairs(pairs, hints, parents)
+
+
+def _diff_table(
+    base: Table, head: Table, hints: Dict, table: Optional[str] = None, parents: Optional[_ParentRenames] = None
+) -> List[Op]:
+    """Ops turning base into head; they are filed under `table`, by default the base table's name.
+    `parents` maps FK parents to their head names and column renames (see _parent_renames)."""
     ops: List[Op] = []
+    name = table or base.name
 
     # Columns: detect add/drop/rename/type/nullable/default
     base_cols = set(base.columns.keys())
@@ -62,50 +229,22 @@ def _diff_table(base: Table, head: Table, hints: Dict) -> List[Op]:
     removed = list(base_cols - head_cols)
     added = list(head_cols - base_cols)
 
-    # rename hints
-    hint_map: Dict[str, str] = {}
-    for k, v in (hints.get("renames", {}) or {}).items():
-        # format: table.col_old: table.col_new
-        if ":" in k or ":" in v:
-            continue
-        try:
-            left_t, left_c = k.split(".")
-            right_t, right_c = v.split(".")
-        except ValueError:
-            continue
-        if left_t == base.name and right_t == head.name:
-            hint_map[left_c] = right_c
-
-    # Try rename inference (simple heuristic + hints)
-    renames: List[Tuple[str, str]] = []
-    used_added: set[str] = set()
-    for rc in removed:
-        target = hint_map.get(rc)
-        if target and target in added:
-            renames.append((rc, target))
-            used_added.add(target)
-            continue
-        # heuristic: match by compatible type and default
-        bcol = base.columns[rc]
-        for ac in added:
-            if ac in used_added:
-                continue
-            hcol = head.columns[ac]
-            if _is_type_compatible(bcol.data_type, hcol.data_type):
-                renames.append((rc, ac))
-                used_added.add(ac)
-                break
+    hint_map = compile_policy(hints).column_renames_for(base.name, head.name)
+
+    # Rename inference: hints first, then an optimal type-bucketed assignment
+    renames = match_column_renames(base, head, removed, added, hint_map)
+    used_added = {new for _, new in renames}
 
     for old_c, new_c in renames:
-        ops.append(Op(kind=OpKind.RENAME_COLUMN, table=base.name, payload={"from": old_c, "to": new_c}))
+        ops.append(Op(kind=OpKind.RENAME_COLUMN, table=name, payload={"from": old_c, "to": new_c}))
 
     removed = [c for c in removed if c not in {r for r, _ in renames}]
     added = [c for c in added if c not in used_added]
 
     for c in sorted(added):
-        ops.append(Op(kind=OpKind.ADD_COLUMN, table=base.name, payload={"column": head.columns[c].model_dump()}))
+        ops.append(Op(kind=OpKind.ADD_COLUMN, table=name, payload={"column": head.columns[c]}))
     for c in sorted(removed):
-        ops.append(Op(kind=OpKind.DROP_COLUMN, table=base.name, payload={"name": c}))
+        ops.append(Op(kind=OpKind.DROP_COLUMN, table=name, payload={"name": c}))
 
     # Common columns: type/default/nullable diffs
     pairs = [(c, c) for c in sorted(base_cols & head_cols)] + renames
@@ -118,68 +257,138 @@ def _diff_table(base: Table, head: Table, hints: Dict) -> List[Op]:
             ops.append(
                 Op(
                     kind=OpKind.ALTER_COLUMN_TYPE,
-                    table=base.name,
-                    payload={"name": dst_name, "from": bcol.data_type, "to": hcol.data_type},
+                    table=name,
+                    payload={
+                        "name": dst_name,
+                        "from": bcol.data_type,
+                        "to": hcol.data_type,
+                        # the base column as the type change finds it, for shadow-column copies
+                        "nullable": bcol.nullable,
+                        "default": bcol.default,
+                    },
                 )
             )
         if bool(bcol.nullable) != bool(hcol.nullable):
             ops.append(
-                Op(kind=OpKind.ALTER_NULLABLE, table=base.name, payload={"name": dst_name, "nullable": hcol.nullable})
+                Op(kind=OpKind.ALTER_NULLABLE, table=name, payload={"name": dst_name, "nullable": hcol.nullable})
             )
         if (bcol.default or None) != (hcol.default or None):
             ops.append(
-                Op(kind=OpKind.ALTER_DEFAULT, table=base.name, payload={"name": dst_name, "default": hcol.default})
+                Op(kind=OpKind.ALTER_DEFAULT, table=name, payload={"name": dst_name, "default": hcol.default})
             )
 
-    # Indexes
-    base_idx = set(base.indexes.keys())
-    head_idx = set(head.indexes.keys())
-    for i in sorted(head_idx - base_idx):
-        ops.append(Op(kind=OpKind.ADD_INDEX, table=base.name, payload={"index": head.indexes[i].model_dump()}))
-    for i in sorted(base_idx - head_idx):
-        ops.append(Op(kind=OpKind.DROP_INDEX, table=base.name, payload={"name": i}))
-
-    # FKs
-    base_fk = set(base.fks.keys())
-    head_fk = set(head.fks.keys())
-    for k in sorted(head_fk - base_fk):
-        ops.append(Op(kind=OpKind.ADD_FK, table=base.name, payload={"fk": head.fks[k].model_dump()}))
-    for k in sorted(base_fk - head_fk):
-        ops.append(Op(kind=OpKind.DROP_FK, table=base.name, payload={"name": k}))
-
-    # Uniques
-    base_uniques = {tuple(sorted(u)) for u in base.uniques}
+    # Indexes and FKs are matched by definition, so a rename is not a drop + rebuild and a
+    # changed definition under the same name is not missed. Definitions are compared in head
+    # column names: Postgres carries renamed columns (and renamed parent tables and columns) into
+    # existing indexes and constraints.
+    col_map = dict(renames)
+    parents = dict(parents or {})
+    # a self-referencing FK follows this table's own renames
+    parents[base.name] = (head.name, col_map)
+    idx_renamed, idx_changed, idx_added, idx_dropped = _match_by_definition(
+        base.indexes, head.indexes, lambda idx: _renamed_columns(idx, col_map).definition_hash()
+    )
+    for old, new in idx_renamed:
+        ops.append(Op(kind=OpKind.RENAME_INDEX, table=name, payload={"from": old, "to": new}))
+    for i in idx_changed:
+        ops.append(Op(kind=OpKind.REBUILD_INDEX, table=name, payload={"index": head.indexes[i]}))
+    for i in idx_added:
+        ops.append(Op(kind=OpKind.ADD_INDEX, table=name, payload={"index": head.indexes[i]}))
+    for i in idx_dropped:
+        ops.append(Op(kind=OpKind.DROP_INDEX, table=name, payload={"name": i}))
+
+    fk_renamed, fk_changed, fk_added, fk_dropped = _match_by_definition(
+        base.fks, head.fks, lambda fk: _renamed_fk(fk, col_map, parents).definition_hash()
+    )
+    for old, new in fk_renamed:
+        ops.append(Op(kind=OpKind.RENAME_CONSTRAINT, table=name, payload={"from": old, "to": new}))
+    for k in fk_changed:
+        ops.append(Op(kind=OpKind.REBUILD_FK, table=name, payload={"fk": head.fks[k]}))
+    for k in fk_added:
+        ops.append(Op(kind=OpKind.ADD_FK, table=name, payload={"fk": head.fks[k]}))
+    for k in fk_dropped:
+        ops.append(Op(kind=OpKind.DROP_FK, table=name, payload={"name": k}))
+
+    # Uniques, with base columns in head names
+    base_uniques = {tuple(sorted(col_map.get(c, c) for c in u)) for u in base.uniques}
     head_uniques = {tuple(sorted(u)) for u in head.uniques}
     for u in sorted(head_uniques - base_uniques):
-        ops.append(Op(kind=OpKind.ADD_UNIQUE, table=base.name, payload={"columns": list(u)}))
+        ops.append(Op(kind=OpKind.ADD_UNIQUE, table=name, payload={"columns": list(u)}))
     for u in sorted(base_uniques - head_uniques):
-        ops.append(Op(kind=OpKind.DROP_UNIQUE, table=base.name, payload={"columns": list(u)}))
-
-    # Checks
-    base_checks = set(base.checks.keys())
-    head_checks = set(head.checks.keys())
-    for k in sorted(head_checks - base_checks):
-        ops.append(Op(kind=OpKind.ADD_CHECK, table=base.name, payload={"name": k, "expr": head.checks[k]}))
-    for k in sorted(base_checks - head_checks):
-        ops.append(Op(kind=OpKind.DROP_CHECK, table=base.name, payload={"name": k}))
+        ops.append(Op(kind=OpKind.DROP_UNIQUE, table=name, payload={"columns": list(u)}))
+
+    # Checks, matched by their whitespace-normalized expression
+    ck_renamed, ck_changed, ck_added, ck_dropped = _match_by_definition(
+        base.checks, head.checks, lambda expr: " ".join(_renamed_expr(expr, col_map).split())
+    )
+    for old, new in ck_renamed:
+        ops.append(Op(kind=OpKind.RENAME_CONSTRAINT, table=name, payload={"from": old, "to": new}))
+    for k in ck_changed:
+        ops.append(Op(kind=OpKind.REBUILD_CHECK, table=name, payload={"name": k, "expr": head.checks[k]}))
+    for k in ck_added:
+        ops.append(Op(kind=OpKind.ADD_CHECK, table=name, payload={"name": k, "expr": head.checks[k]}))
+    for k in ck_dropped:
+        ops.append(Op(kind=OpKind.DROP_CHECK, table=name, payload={"name": k}))
 
     return ops
 
 
-def _is_type_compatible(t1: str, t2: str) -> bool:
-    if t1 == t2:
-        return True
-    # Simple widen/convert set for MVP
-    def norm(x: str) -> str:
-        return x.split("(")[0].strip().lower()
-
-    n1, n2 = norm(t1), norm(t2)
-    if {n1, n2} <= {"int", "integer", "bigint", "smallint"}:
-        return True
-    if n1 == n2:
-        return True
-    if n1 == "numeric" and n2 == "numeric":
-        return True
-    return False
-
-
+def _renamed_columns(obj, col_map: Dict[str, str]):
+    """obj (an Index or ForeignKey) with its columns translated through col_map, if any change."""
+    if not col_map or not any(c in col_map for c in obj.columns):
+        return obj
+    return replace(obj, columns=[col_map.get(c, c) for c in obj.columns])
+
+
+def _renamed_fk(fk: ForeignKey, col_map: Dict[str, str], parents: _ParentRenames) -> ForeignKey:
+    """fk in head names: its columns through col_map, its parent and parent columns through parents."""
+    fk = _renamed_columns(fk, col_map)
+    ref_table, ref_map = parents.get(fk.ref_table, (fk.ref_table, {}))
+    if ref_table == fk.ref_table and not any(c in ref_map for c in fk.ref_columns):
+        return fk
+    return replace(fk, ref_table=ref_table, ref_columns=[ref_map.get(c, c) for c in fk.ref_columns])
+
+
+# string literals are skipped; bare and double-quoted identifiers are candidates for renaming
+_EXPR_TOKEN = re.compile(r"""'(?:[^']|'')*'|"((?:[^"]|"")*)"|\b([A-Za-z_][A-Za-z0-9_$]*)\b""")
+
+
+def _renamed_expr(expr: str, col_map: Dict[str, str]) -> str:
+    """A check expression with the columns it mentions translated through col_map."""
+    if not col_map:
+        return expr
+
+    def _sub(m: "re.Match[str]") -> str:
+        quoted, bare = m.group(1), m.group(2)
+        if quoted is not None and quoted in col_map:
+            return f'"{col_map[quoted]}"'
+        if bare is not None and bare in col_map:
+            return col_map[bare]
+        return m.group(0)
+
+    return _EXPR_TOKEN.sub(_sub, expr)
+
+
+def _match_by_definition(
+    base: Dict[str, Any], head: Dict[str, Any], fingerprint: Callable[[Any], str]
+) -> Tuple[List[Tuple[str, str]], List[str], List[str], List[str]]:
+    """Split named objects into (renamed pairs, changed under the same name, added, dropped).
+
+    A dropped and an added object with the same fingerprint are a rename; duplicate fingerprints
+    pair up in name order.
+    """
+    changed = [n for n in sorted(base.keys() & head.keys()) if fingerprint(base[n]) != fingerprint(head[n])]
+    by_fp: Dict[str, List[str]] = {}
+    for n in sorted(base.keys() - head.keys()):
+        by_fp.setdefault(fingerprint(base[n]), []).append(n)
+    renamed: List[Tuple[str, str]] = []
+    added: List[str] = []
+    for n in sorted(head.keys() - base.keys()):
+        olds = by_fp.get(fingerprint(head[n]))
+        if olds:
+            renamed.append((olds.pop(0), n))
+        else:
+            added.append(n)
+    renamed_from = {old for old, _ in renamed}
+    dropped = [n for n in sorted(base.keys() - head.keys()) if n not in renamed_from]
+    return renamed, changed, added, dropped
@@ -1,13 +1,74 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Literal
-from pydantic import BaseModel, Field
-from pydantic import BaseModel
+import hashlib
+import sys
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Literal
 
 Dialect = Literal["postgresql"]
 
 
-class Column(BaseModel):
+# IR objects are frozen; fields are only assigned while an object is being built
+_set = object.__setattr__
+
+
+def _intern(value: str) -> str:
+    # adapters hand over str subclasses (e.g. SQLAlchemy's quoted_name); store plain interned str
+    return sys.intern(value if type(value) is str else str(value))
+
+
+@lru_cache(maxsize=None)
+def _adapter(cls: type):
+    # pydantic only runs at the JSON/dict boundary, and is imported the first time it is needed
+    from pydantic import TypeAdapter
+
+    return TypeAdapter(cls)
+
+
+class _Model:
+    """pydantic-style (de)serialization for the slotted IR dataclasses."""
+
+    __slots__ = ()
+
+    def model_dump(self, **kwargs: Any) -> Dict[str, Any]:
+        return _adapter(type(self)).dump_python(self, **kwargs)
+
+    def model_dump_json(self, **kwargs: Any) -> str:
+        return _adapter(type(self)).dump_json(self, **kwargs).decode("utf-8")
+
+    def model_copy(self, update: Optional[Dict[str, Any]] = None):
+        # replace() runs __post_init__, which drops the copied (now stale) content hash
+        return replace(self, **(update or {}))
+
+    @classmethod
+    def model_validate(cls, obj: Any):
+        return _adapter(cls).validate_python(obj)
+
+    @classmethod
+    def model_validate_json(cls, data: str | bytes):
+        return _adapter(cls).validate_json(data)
+
+
+def _digest(*parts: Optional[str]) -> str:
+    data = "\x1f".join("\x00" if part is None else part for part in parts)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _join(values: List[str]) -> str:
+    return "\x1e".join(values)
+
+
+# pydantic reads dataclass field metadata as Field() arguments: derived fields stay out of dumps
+_DERIVED = {"exclude": True}
+
+
+# Names and types repeat across thousands of tables, so they are interned: equal strings share
+# one object, and dict lookups/comparisons on them short-circuit on identity.
+
+
+@dataclass(slots=True, frozen=True)
+class Column(_Model):
     name: str
     data_type: str
     nullable: bool
@@ -15,17 +76,47 @@ class Column(BaseModel):
     generated: Optional[str] = None
     collation: Optional[str] = None
     comment: Optional[str] = None
+    # Structural hash of every other field; filled when the IR is built, see IR.__post_init__.
+    # Derived, so never serialized; a hash passed in (e.g. to a copy) is dropped.
+    content_hash: Optional[str] = field(default=None, compare=False, repr=False, metadata=_DERIVED)
 
+    def __post_init__(self) -> None:
+        _set(self, "name", _intern(self.name))
+        _set(self, "data_type", _intern(self.data_type))
+        _set(self, "content_hash", None)
 
-class Index(BaseModel):
+    def compute_hash(self) -> str:
+        return _digest(
+            self.name, self.data_type, "1" if self.nullable else "0", self.default, self.generated, self.collation, self.comment
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class Index(_Model):
     name: str
     columns: List[str]
     unique: bool = False
     method: str = "btree"
-    include: List[str] = Field(default_factory=list)
+    include: List[str] = field(default_factory=list)
+    # predicate of a partial index, as SQL
+    where: Optional[str] = None
+    content_hash: Optional[str] = field(default=None, compare=False, repr=False, metadata=_DERIVED)
+
+    def __post_init__(self) -> None:
+        _set(self, "name", _intern(self.name))
+        _set(self, "columns", [_intern(c) for c in self.columns])
+        _set(self, "content_hash", None)
+
+    def compute_hash(self) -> str:
+        return _digest(self.name, self.definition_hash())
 
+    def definition_hash(self) -> str:
+        """Hash of everything but the name: equal for the same index under another name."""
+        return _digest(_join(self.columns), "1" if self.unique else "0", self.method, _join(self.include), self.where)
 
-class ForeignKey(BaseModel):
+
+@dataclass(slots=True, frozen=True)
+class ForeignKey(_Model):
     name: str
     columns: List[str]
     ref_table: str
@@ -34,25 +125,84 @@ class ForeignKey(BaseModel):
     on_update: Optional[str] = None
     deferrable: bool = False
     initially_deferred: bool = False
+    content_hash: Optional[str] = field(default=None, compare=False, repr=False, metadata=_DERIVED)
+
+    def __post_init__(self) -> None:
+        _set(self, "name", _intern(self.name))
+        _set(self, "columns", [_intern(c) for c in self.columns])
+        _set(self, "ref_table", _intern(self.ref_table))
+        _set(self, "ref_columns", [_intern(c) for c in self.ref_columns])
+        _set(self, "content_hash", None)
+
+    def compute_hash(self) -> str:
+        return _digest(self.name, self.definition_hash())
 
+    def definition_hash(self) -> str:
+        """Hash of everything but the name: equal for the same constraint under another name."""
+        return _digest(
+            _join(self.columns),
+            self.ref_table,
+            _join(self.ref_columns),
+            self.on_delete,
+            self.on_update,
+            "1" if self.deferrable else "0",
+            "1" if self.initially_deferred else "0",
+        )
 
-class Table(BaseModel):
+
+@dataclass(slots=True, frozen=True)
+class Table(_Model):
     name: str
     columns: Dict[str, Column]
-    primary_key: List[str] = Field(default_factory=list)
-    uniques: List[List[str]] = Field(default_factory=list)
-    checks: Dict[str, str] = Field(default_factory=dict)
-    indexes: Dict[str, Index] = Field(default_factory=dict)
-    fks: Dict[str, ForeignKey] = Field(default_factory=dict)
+    primary_key: List[str] = field(default_factory=list)
+    uniques: List[List[str]] = field(default_factory=list)
+    checks: Dict[str, str] = field(default_factory=dict)
+    indexes: Dict[str, Index] = field(default_factory=dict)
+    fks: Dict[str, ForeignKey] = field(default_factory=dict)
     partitioning: Optional[str] = None
     comment: Optional[str] = None
+    # Merkle hash over the hashes of its columns, indexes and FKs plus its own constraints
+    content_hash: Optional[str] = field(default=None, compare=False, repr=False, metadata=_DERIVED)
+
+    def __post_init__(self) -> None:
+        _set(self, "name", _intern(self.name))
+        _set(self, "content_hash", None)
 
+    def compute_hash(self) -> str:
+        """Hash the table, (re)computing its child hashes on the way."""
 
-class IR(BaseModel):
+        def _children(items: Dict[str, Any]) -> str:
+            out = []
+            for key in sorted(items):
+                child = items[key]
+                _set(child, "content_hash", child.compute_hash())
+                out.append(f"{key}={child.content_hash}")
+            return _join(out)
+
+        return _digest(
+            self.name,
+            _children(self.columns),
+            _join(self.primary_key),
+            _join(sorted(_join(sorted(u)) for u in self.uniques)),
+            _join([f"{k}={self.checks[k]}" for k in sorted(self.checks)]),
+            _children(self.indexes),
+            _children(self.fks),
+            self.partitioning,
+            self.comment,
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class IR(_Model):
     dialect: Dialect
     version: Optional[str] = None
-    tables: Dict[str, Table]
-    enums: Dict[str, List[str]] = Field(default_factory=dict)
-    extensions: List[str] = Field(default_factory=list)
-
+    tables: Dict[str, Table] = field(default_factory=dict)
+    enums: Dict[str, List[str]] = field(default_factory=dict)
+    extensions: List[str] = field(default_factory=list)
 
+    def __post_init__(self) -> None:
+        # Adapters construct the IR last, once every table is complete, so hashing here sees the
+        # final content. Hashes are always recomputed: a table edited in place by a builder, or
+        # shared with an IR built earlier, must not keep the hash of its old content.
+        for table in self.tables.values():
+            _set(table, "content_hash", table.compute_hash())
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import re
+from enum import Enum
+from typing import Optional, Tuple
+
+
+class TypeChange(str, Enum):
+    METADATA_ONLY = "metadata_only"  # binary-coercible: catalog update, no rewrite or scan
+    REWRITE = "rewrite"  # every row is rewritten (and indexes on the column rebuilt)
+
+
+_ALIASES = {
+    "character varying": "varchar",
+    "char varying": "varchar",
+    "character": "bpchar",
+    "char": "bpchar",
+    "int": "integer",
+    "int4": "integer",
+    "int2": "smallint",
+    "int8": "bigint",
+    "decimal": "numeric",
+    "bit varying": "varbit",
+    "timestamp without time zone": "timestamp",
+    "timestamp with time zone": "timestamptz",
+    "time without time zone": "time",
+    "time with time zone": "timetz",
+    "float8": "double precision",
+    "float4": "real",
+    "bool": "boolean",
+}
+
+# Types whose length/precision modifier can grow (or be removed) without a rewrite
+_WIDENABLE = {"varchar", "varbit", "numeric", "timestamp", "timestamptz", "time", "timetz", "interval"}
+
+# (from, to) base types that Postgres casts WITHOUT FUNCTION
+_BINARY_COERCIBLE = {
+    ("varchar", "text"),
+    ("text", "varchar"),
+    ("cidr", "inet"),
+    ("xml", "text"),
+    ("xml", "varchar"),
+}
+
+_MODS = re.compile(r"\(([^)]*)\)")
+
+
+def parse_pg_type(data_type: str) -> Tuple[str, Optional[Tuple[int, ...]], bool]:
+    """Split a type name into (canonical base name, modifiers or None, is array)."""
+    t = " ".join(data_type.lower().split())
+    array = t.endswith("[]")
+    if array:
+        t = t[:-2].rstrip()
+    mods = None
+    m = _MODS.search(t)
+    if m:
+        try:
+            mods = tuple(int(x) for x in m.group(1).split(","))
+        except ValueError:
+            mods = None
+        t = " ".join(_MODS.sub("", t).split())
+    return _ALIASES.get(t, t), mods, array
+
+
+def classify_type_change(from_type: str, to_type: str) -> TypeChange:
+    """Whether ALTER COLUMN ... TYPE from one type to the other rewrites the table.
+
+    Conservative: anything not known to be binary-coercible is a rewrite.
+    """
+    fb, fm, fa = parse_pg_type(from_type)
+    tb, tm, ta = parse_pg_type(to_type)
+    if fa != ta:
+        return TypeChange.REWRITE
+    if (fb, fm) == (tb, tm):
+        return TypeChange.METADATA_ONLY
+    if fa:
+        # array casts go through the element cast; keep it simple
+        return TypeChange.REWRITE
+    if fb == tb and fb in _WIDENABLE:
+        return TypeChange.METADATA_ONLY if _widens(fb, fm, tm) else TypeChange.REWRITE
+    if (fb, tb) in _BINARY_COERCIBLE and (tm is None or tb == "text"):
+        # casting to a bounded varchar checks lengths, which is a rewrite
+        return TypeChange.METADATA_ONLY
+    return TypeChange.REWRITE
+
+
+def _widens(base: str, old: Optional[Tuple[int, ...]], new: Optional[Tuple[int, ...]]) -> bool:
+    if new is None:
+        return True  # dropping the modifier
+    if old is None:
+        return False  # adding one means checking every value
+    if base == "numeric":
+        old_scale = old[1] if len(old) > 1 else 0
+        new_scale = new[1] if len(new) > 1 else 0
+        # more digits before the point, same scale
+        return new_scale == old_scale and new[0] >= old[0]
+    return new[0] >= old[0]
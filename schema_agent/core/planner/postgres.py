@@ -1,54 +1,64 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Literal, Tuple
-from pydantic import BaseModel, Field
+import re
+from typing import Callable, Dict, List, Optional, Tuple
 
 from schema_agent.core.diff import Op, OpKind
-
-
-class Step(BaseModel):
-    id: str
-    table: Optional[str]
-    sql: str
-    phase: Literal["prep", "backfill", "tighten", "indexes", "finalize"]
-    reversible: bool = True
-    depends_on: List[str] = Field(default_factory=list)
-    destructive: bool = False
-    reverse_sql: Optional[str] = None
-
-
-def plan_postgres(base_ir, head_ir, ops: List[Op], hints: Dict) -> List[Step]:
-    steps: List[Step] = []
-
-    planner_hints = hints.get("planner", {}) or {}
-    backfill_batch = int(planner_hints.get("default_backfill_batch_rows", 5000))
-    use_fast_not_null: bool = bool(planner_hints.get("use_fast_not_null", False))
-    use_batched_backfill: bool = bool(planner_hints.get("use_batched_backfill", False) or planner_hints.get("large_table_mode", False))
-    emit_data_validation_hints: bool = bool(planner_hints.get("emit_data_validation_hints", True))
-
-    sid = 0
-
-    # Track per-table rename, per-column default/backfill/not-null, and validate steps
-    table_rename_step: Dict[str, str] = {}
-    default_step_by_col: Dict[Tuple[str, str], str] = {}
-    backfill_step_by_col: Dict[Tuple[str, str], str] = {}
-    notnull_step_by_col: Dict[Tuple[str, str], str] = {}
-    validate_steps: List[Step] = []
-    add_constraint_steps: List[Step] = []
-    unsafe_allow = set(hints.get("unsafe_allow", []) or [])
-
-    def _is_allowed(kind: str, table: Optional[str] = None, name: Optional[str] = None) -> bool:
-        keys = []
-        if table and name:
-            keys.append(f"{kind}: {table}.{name}")
-        if table and not name:
-            keys.append(f"{kind}: {table}")
-        if name and not table:
-            keys.append(f"{kind}: {name}")
-        keys.append(kind)
-        return any(k in unsafe_allow for k in keys)
+from schema_agent.core.ir import Column, ForeignKey, Index, Table
+from schema_agent.core.planner.pg_types import TypeChange, classify_type_change, parse_pg_type
+from schema_agent.core.registry import DialectRegistry
+from schema_agent.core.steps import PlannedSteps, Step, StepGraph
+from schema_agent.policy.hints import CompiledPolicy, PlannerSettings, TableStrategy, compile_policy
+
+
+class PlanContext:
+    """State of one plan_postgres run, shared by the op handlers and table hooks.
+
+    Handlers add steps through add_step and record the steps later ops or the final wiring
+    pass need: rename steps per table, default/backfill steps per (table, column), shadow-column
+    swaps per (table, column), and the NOT VALID constraint and VALIDATE steps.
+    """
+
+    def __init__(self, base_ir, head_ir, policy: CompiledPolicy):
+        self.base_ir = base_ir
+        self.head_ir = head_ir
+        self.policy = policy
+        self.graph = StepGraph()
+        self.table_rename_step: Dict[str, str] = {}
+        self.default_step_by_col: Dict[Tuple[str, str], str] = {}
+        self.backfill_step_by_col: Dict[Tuple[str, str], str] = {}
+        self.type_swap_step_by_col: Dict[Tuple[str, str], str] = {}
+        # table -> (step id, column, expression) of each backfill, for merging
+        self.backfills: Dict[str, List[Tuple[str, str, str]]] = {}
+        self.validate_steps: List[Step] = []
+        self.add_constraint_steps: List[Step] = []
+        # (referenced table, referenced column) -> "table.fk" of each head FK; built on first use
+        self._inbound_fks: Optional[Dict[Tuple[str, str], List[str]]] = None
+        self._sid = 0
+
+    @property
+    def settings(self) -> PlannerSettings:
+        return self.policy.planner
+
+    def strategy(self, table: str) -> TableStrategy:
+        """Backfill / NOT NULL strategy for the table, from table statistics when provided."""
+        return self.policy.strategy(table)
+
+    def allows(self, kind: str, table: Optional[str] = None, name: Optional[str] = None) -> bool:
+        return self.policy.allows(kind, table, name)
+
+    def inbound_fks(self, table: str, column: str) -> List[str]:
+        """Head foreign keys ("table.fk") that reference table.column."""
+        if self._inbound_fks is None:
+            self._inbound_fks = {}
+            for other in self.head_ir.tables.values():
+                for fk in other.fks.values():
+                    for ref_col in dict.fromkeys(fk.ref_columns):
+                        self._inbound_fks.setdefault((fk.ref_table, ref_col), []).append(f"{other.name}.{fk.name}")
+        return self._inbound_fks.get((table, column), [])
 
     def add_step(
+        self,
         table: Optional[str],
         sql: str,
         phase: str,
@@ -56,15 +66,15 @@ def plan_postgres(base_ir, head_ir, ops: List[Op], hints: Dict) -> List[Step]:
         depends_on: Optional[List[str]] = None,
         destructive: bool = False,
         reverse_sql: Optional[str] = None,
-    ):
-        nonlocal sid
-        sid += 1
+    ) -> str:
+        self._sid += 1
         dep_list = list(depends_on or [])
         # All steps in a table should depend on rename if present
-        if table and table in table_rename_step and (not dep_list or table_rename_step[table] not in dep_list):
-            dep_list.append(table_rename_step[table])
+        rename = self.table_rename_step.get(table) if table else None
+        if rename and rename not in dep_list:
+            dep_list.append(rename)
         step = Step(
-            id=f"s{sid}",
+            id=f"s{self._sid}",
             table=table,
             sql=sql,
             phase=phase,
@@ -73,366 +83,935 @@ def plan_postgres(base_ir, head_ir, ops: List[Op], hints: Dict) -> List[Step]:
             destructive=destructive,
             reverse_sql=reverse_sql,
         )
-        steps.append(step)
+        self.graph.add(step)
         return step.id
 
-    for op in ops:
-        t = op.table
-        k = op.kind
-        p = op.payload
 
-        if k == OpKind.RENAME_COLUMN:
-            rid = add_step(t, f"ALTER TABLE {t} RENAME COLUMN {p['from']} TO {p['to']};", phase="prep")
-            table_rename_step[t] = rid
-            continue
+# handler(ctx, op) plans one op; hook(ctx, table, ops) sees all of a table's ops first and
+# returns the ones left for the handlers
+OpHandler = Callable[[PlanContext, Op], None]
+TableHook = Callable[[PlanContext, str, List[Op]], List[Op]]
 
-        if k == OpKind.ADD_COLUMN:
-            col = p["column"]
-            null_sql = "" if col["nullable"] else " NULL"  # explicit NULL tolerated by PG
-            col_sql = f"ALTER TABLE {t} ADD COLUMN IF NOT EXISTS {col['name']} {col['data_type']}{null_sql};"
-            add_step(t, col_sql, phase="prep", reverse_sql=f"ALTER TABLE {t} DROP COLUMN IF EXISTS {col['name']};")
-            # If default exists, set default BEFORE backfill to protect concurrent inserts
-            if col.get("default") is not None:
-                did = add_step(t, f"ALTER TABLE {t} ALTER COLUMN {col['name']} SET DEFAULT {col['default']};", phase="tighten")
-                default_step_by_col[(t, col["name"])] = did
-            # Backfill existing rows if column must be NOT NULL
-            if not col["nullable"]:
-                if use_batched_backfill:
-                    bf_sql = (
-                        f"-- Batched backfill\n"
-                        f"DO $$\n"
-                        f"DECLARE _batch INT := {backfill_batch};\n"
-                        f"BEGIN\n"
-                        f"  LOOP\n"
-                        f"    UPDATE {t} SET {col['name']} = {col.get('default', 'NULL')}\n"
-                        f"    WHERE {col['name']} IS NULL AND ctid IN (\n"
-                        f"      SELECT ctid FROM {t} WHERE {col['name']} IS NULL LIMIT _batch\n"
-                        f"    );\n"
-                        f"    EXIT WHEN NOT FOUND;\n"
-                        f"  END LOOP;\n"
-                        f"END $$;"
-                    )
-                else:
-                    bf_sql = f"UPDATE {t} SET {col['name']} = {col.get('default', 'NULL')} WHERE {col['name']} IS NULL;"
-                bf_dep = []
-                if (t, col["name"]) in default_step_by_col:
-                    bf_dep.append(default_step_by_col[(t, col["name"])])
-                bf_id = add_step(t, bf_sql, phase="backfill", reversible=False, depends_on=bf_dep)
-                # Tighten
-                add_step(t, f"ALTER TABLE {t} ALTER COLUMN {col['name']} SET NOT NULL;", phase="tighten", depends_on=[bf_id])
-            continue
 
-        if k == OpKind.ALTER_DEFAULT:
-            default = p["default"]
-            sql = f"ALTER TABLE {t} ALTER COLUMN {p['name']} " + (
-                f"SET DEFAULT {default};" if default is not None else "DROP DEFAULT;"
-            )
-            reverse = None
-            if p["default"] is not None:
-                reverse = f"ALTER TABLE {t} ALTER COLUMN {p['name']} DROP DEFAULT;"
-            did = add_step(t, sql, phase="tighten", reverse_sql=reverse)
-            default_step_by_col[(t, p["name"])] = did
-            # Ensure backfill waits for default if it exists
-            bf = backfill_step_by_col.get((t, p["name"]))
-            if bf:
-                # mutate the existing step to depend on default
-                for s in steps:
-                    if s.id == bf and did not in s.depends_on:
-                        s.depends_on.append(did)
-                        break
-            continue
+def plan_postgres(base_ir, head_ir, ops: List[Op], hints: Dict) -> PlannedSteps:
+    ctx = PlanContext(base_ir, head_ir, compile_policy(hints))
+    handlers: Dict[OpKind, OpHandler] = dict(POSTGRES_OP_HANDLERS)
+    handlers.update((OpKind(k), h) for k, h in DialectRegistry.get_op_handlers("postgresql").items())
+    hooks = DialectRegistry.get_table_hooks("postgresql")
 
-        if k == OpKind.ALTER_NULLABLE:
-            if p["nullable"]:
-                add_step(t, f"ALTER TABLE {t} ALTER COLUMN {p['name']} DROP NOT NULL;", phase="finalize")
-            else:
-                # Backfill before tightening NOT NULL
-                bf_dep: List[str] = []
-                # If we already created default step for this column, backfill should depend on it
-                did = default_step_by_col.get((t, p["name"]))
-                if did:
-                    bf_dep.append(did)
-                # Determine backfill expression: prefer head IR default
-                head_table = head_ir.tables.get(t)
-                bf_expr = "<DEFAULT_OR_EXPR>"
-                if head_table and p["name"] in head_table.columns:
-                    d = head_table.columns[p["name"]].default
-                    if d is not None:
-                        bf_expr = d
-                if use_batched_backfill:
-                    bf_sql = (
-                        f"-- Batched backfill\n"
-                        f"DO $$\n"
-                        f"DECLARE _batch INT := {backfill_batch};\n"
-                        f"BEGIN\n"
-                        f"  LOOP\n"
-                        f"    UPDATE {t} SET {p['name']} = {bf_expr}\n"
-                        f"    WHERE {p['name']} IS NULL AND ctid IN (\n"
-                        f"      SELECT ctid FROM {t} WHERE {p['name']} IS NULL LIMIT _batch\n"
-                        f"    );\n"
-                        f"    EXIT WHEN NOT FOUND;\n"
-                        f"  END LOOP;\n"
-                        f"END $$;"
-                    )
-                else:
-                    bf_sql = f"UPDATE {t} SET {p['name']} = {bf_expr} WHERE {p['name']} IS NULL;"
-                bf_id = add_step(t, bf_sql, phase="backfill", reversible=False, depends_on=bf_dep)
-                backfill_step_by_col[(t, p["name"])] = bf_id
-
-                if use_fast_not_null:
-                    # Add validated CHECK to enable fast NOT NULL
-                    nn_chk_name = f"chk_{t}_{p['name']}_nn"
-                    add_id = add_step(
-                        t,
-                        f"ALTER TABLE {t} ADD CONSTRAINT {nn_chk_name} CHECK ({p['name']} IS NOT NULL) NOT VALID;",
-                        phase="prep",
-                        depends_on=[bf_id],
-                    )
-                    v_id = add_step(
-                        t,
-                        f"ALTER TABLE {t} VALIDATE CONSTRAINT {nn_chk_name};",
-                        phase="tighten",
-                        depends_on=[add_id],
-                    )
-                    nn_id = add_step(
-                        t,
-                        f"ALTER TABLE {t} ALTER COLUMN {p['name']} SET NOT NULL;",
-                        phase="tighten",
-                        reverse_sql=f"ALTER TABLE {t} ALTER COLUMN {p['name']} DROP NOT NULL;",
-                        depends_on=[v_id],
-                    )
-                    # Drop the helper check
-                    add_step(
-                        t,
-                        f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {nn_chk_name};",
-                        phase="finalize",
-                        depends_on=[nn_id],
-                    )
-                else:
-                    nn_id = add_step(
-                        t,
-                        f"ALTER TABLE {t} ALTER COLUMN {p['name']} SET NOT NULL;",
-                        phase="tighten",
-                        reverse_sql=f"ALTER TABLE {t} ALTER COLUMN {p['name']} DROP NOT NULL;",
-                        depends_on=[bf_id],
-                    )
-                notnull_step_by_col[(t, p["name"])] = nn_id
-            continue
+    by_table: Dict[str, List[Op]] = {}
+    for op in ops:
+        by_table.setdefault(op.table, []).append(op)
+    for table, table_ops in by_table.items():
+        for hook in hooks:
+            table_ops = hook(ctx, table, table_ops)
+        for op in table_ops:
+            handler = handlers.get(op.kind)
+            if handler is not None:
+                handler(ctx, op)
+
+    graph = ctx.graph
+    # Ensure validate depends on NOT NULL tighten steps for the same table when present
+    for vs in ctx.validate_steps:
+        for nn_id in graph.not_nulls(vs.table):
+            graph.add_dependency(vs.id, nn_id)
 
-        if k == OpKind.ALTER_COLUMN_TYPE:
-            # Best-effort: use USING cast which may rewrite
-            add_step(
+    # Ensure adding constraints (NOT VALID) happens after backfill for the table
+    for cs in ctx.add_constraint_steps:
+        for bf_id in graph.backfills(cs.table):
+            graph.add_dependency(cs.id, bf_id)
+    if ctx.settings.merge_backfills:
+        graph = _merge_backfills(ctx, graph)
+    steps = _coalesce_alter_table(graph) if ctx.settings.coalesce_alter_table else graph.steps()
+    return PlannedSteps(steps, allocated_ids=ctx._sid)
+
+
+def _plan_rename_table(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    src, dst = p["from"], p["to"]
+    src_schema, _, src_name = src.rpartition(".")
+    dst_schema, _, dst_name = dst.rpartition(".")
+    sql, reverse = [], []
+    moved = src
+    if src_schema != dst_schema:
+        # RENAME TO cannot change the schema; move the table first
+        sql.append(f"ALTER TABLE {src} SET SCHEMA {dst_schema or 'public'};")
+        moved = f"{dst_schema}.{src_name}" if dst_schema else src_name
+        reverse.insert(0, f"ALTER TABLE {moved} SET SCHEMA {src_schema or 'public'};")
+    if src_name != dst_name:
+        sql.append(f"ALTER TABLE {moved} RENAME TO {dst_name};")
+        reverse.insert(0, f"ALTER TABLE {dst} RENAME TO {src_name};")
+    rid = ctx.add_step(t, "\n".join(sql), phase="prep", reverse_sql="\n".join(reverse))
+    ctx.table_rename_step[t] = rid
+
+
+def _plan_rename_column(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    rid = ctx.add_step(t, f"ALTER TABLE {t} RENAME COLUMN {p['from']} TO {p['to']};", phase="prep")
+    ctx.table_rename_step[t] = rid
+
+
+def _plan_add_column(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    col: Column = p["column"]
+    null_sql = "" if col.nullable else " NULL"  # explicit NULL tolerated by PG
+    col_sql = f"ALTER TABLE {t} ADD COLUMN IF NOT EXISTS {col.name} {col.data_type}{null_sql};"
+    ctx.add_step(t, col_sql, phase="prep", reverse_sql=f"ALTER TABLE {t} DROP COLUMN IF EXISTS {col.name};")
+    # If default exists, set default BEFORE backfill to protect concurrent inserts
+    if col.default is not None:
+        did = ctx.add_step(t, f"ALTER TABLE {t} ALTER COLUMN {col.name} SET DEFAULT {col.default};", phase="tighten")
+        ctx.default_step_by_col[(t, col.name)] = did
+    # Backfill existing rows if column must be NOT NULL
+    if not col.nullable:
+        bf_dep = []
+        if (t, col.name) in ctx.default_step_by_col:
+            bf_dep.append(ctx.default_step_by_col[(t, col.name)])
+        bf_id = _add_backfill(ctx, t, col.name, str(col.default), bf_dep)
+        # Tighten
+        ctx.add_step(t, f"ALTER TABLE {t} ALTER COLUMN {col.name} SET NOT NULL;", phase="tighten", depends_on=[bf_id])
+
+
+def _plan_alter_default(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    default = p["default"]
+    sql = f"ALTER TABLE {t} ALTER COLUMN {p['name']} " + (
+        f"SET DEFAULT {default};" if default is not None else "DROP DEFAULT;"
+    )
+    reverse = None
+    if p["default"] is not None:
+        reverse = f"ALTER TABLE {t} ALTER COLUMN {p['name']} DROP DEFAULT;"
+    swap = ctx.type_swap_step_by_col.get((t, p["name"]))
+    did = ctx.add_step(t, sql, phase="tighten", reverse_sql=reverse, depends_on=[swap] if swap else None)
+    ctx.default_step_by_col[(t, p["name"])] = did
+    # Ensure backfill waits for default if it exists
+    bf = ctx.backfill_step_by_col.get((t, p["name"]))
+    if bf:
+        ctx.graph.add_dependency(bf, did)
+
+
+def _plan_alter_nullable(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    # after a shadow-column type change, act on the new column
+    swap = ctx.type_swap_step_by_col.get((t, p["name"]))
+    if p["nullable"]:
+        ctx.add_step(
+            t, f"ALTER TABLE {t} ALTER COLUMN {p['name']} DROP NOT NULL;", phase="finalize", depends_on=[swap] if swap else None
+        )
+    else:
+        # Backfill before tightening NOT NULL
+        bf_dep: List[str] = [swap] if swap else []
+        # If we already created default step for this column, backfill should depend on it
+        did = ctx.default_step_by_col.get((t, p["name"]))
+        if did:
+            bf_dep.append(did)
+        # Determine backfill expression: prefer head IR default
+        head_table = ctx.head_ir.tables.get(t)
+        bf_expr = "<DEFAULT_OR_EXPR>"
+        if head_table and p["name"] in head_table.columns:
+            d = head_table.columns[p["name"]].default
+            if d is not None:
+                bf_expr = d
+        bf_id = _add_backfill(ctx, t, p["name"], bf_expr, bf_dep)
+        ctx.backfill_step_by_col[(t, p["name"])] = bf_id
+        ctx.graph.mark_backfill(t, bf_id)
+
+        if ctx.strategy(t).fast_not_null:
+            # Add validated CHECK to enable fast NOT NULL
+            nn_chk_name = f"chk_{t}_{p['name']}_nn"
+            add_id = ctx.add_step(
                 t,
-                f"ALTER TABLE {t} ALTER COLUMN {p['name']} TYPE {p['to']} USING {p['name']}::{p['to']};",
-                phase="finalize",
+                f"ALTER TABLE {t} ADD CONSTRAINT {nn_chk_name} CHECK ({p['name']} IS NOT NULL) NOT VALID;",
+                phase="prep",
+                depends_on=[bf_id],
             )
-            continue
-
-        if k == OpKind.ADD_INDEX:
-            idx = p["index"]
-            cols = ", ".join(idx["columns"]) if idx.get("columns") else ""
-            method = idx.get("method", "btree")
-            unique = "UNIQUE " if idx.get("unique") else ""
-            add_step(
+            v_id = ctx.add_step(
                 t,
-                f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {idx['name']} ON {t} USING {method} ({cols});",
-                phase="indexes",
+                f"ALTER TABLE {t} VALIDATE CONSTRAINT {nn_chk_name};",
+                phase="tighten",
+                depends_on=[add_id],
             )
-            continue
-
-        if k == OpKind.DROP_INDEX:
-            destr = not _is_allowed("drop_index", None, p["name"])  # global index name
-            add_step(t, f"DROP INDEX CONCURRENTLY IF EXISTS {p['name']};", phase="indexes", destructive=destr)
-            continue
-
-        if k == OpKind.ADD_FK:
-            fk = p["fk"]
-            cols = ", ".join(fk["columns"])
-            rcols = ", ".join(fk["ref_columns"])
-            clauses = []
-            if fk.get("on_delete"):
-                clauses.append(f"ON DELETE {fk['on_delete']}")
-            if fk.get("on_update"):
-                clauses.append(f"ON UPDATE {fk['on_update']}")
-            add_id = add_step(
+            nn_id = ctx.add_step(
                 t,
-                f"ALTER TABLE {t} ADD CONSTRAINT {fk['name']} FOREIGN KEY ({cols}) REFERENCES {fk['ref_table']} ({rcols}) {' '.join(clauses)} NOT VALID;",
-                phase="prep",
+                f"ALTER TABLE {t} ALTER COLUMN {p['name']} SET NOT NULL;",
+                phase="tighten",
+                reverse_sql=f"ALTER TABLE {t} ALTER COLUMN {p['name']} DROP NOT NULL;",
+                depends_on=[v_id],
             )
-            add_constraint_steps.append(next(s for s in steps if s.id == add_id))
-            # Optional data hygiene hint for orphans before validate
-            if emit_data_validation_hints:
-                add_step(
-                    t,
-                    (
-                        f"-- OPTIONAL: handle orphans before FK VALIDATE\n"
-                        f"-- DELETE FROM {t} child WHERE NOT EXISTS (SELECT 1 FROM {fk['ref_table']} parent WHERE parent.{fk['ref_columns'][0]} = child.{fk['columns'][0]});\n"
-                        f"-- or UPDATE to a fallback user_id per your rules"
-                    ),
-                    phase="backfill",
-                    reversible=False,
-                    depends_on=[add_id],
-                )
-            v_id = add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {fk['name']};", phase="tighten", depends_on=[add_id])
-            validate_steps.append(next(s for s in steps if s.id == v_id))
-            continue
-
-        if k == OpKind.DROP_FK:
-            add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {p['name']};", phase="finalize", destructive=True)
-            continue
-
-        if k == OpKind.ADD_CHECK:
-            add_id = add_step(t, f"ALTER TABLE {t} ADD CONSTRAINT {p['name']} CHECK ({p['expr']}) NOT VALID;", phase="prep")
-            add_constraint_steps.append(next(s for s in steps if s.id == add_id))
-            # Optional data hygiene hint before validate
-            if emit_data_validation_hints:
-                add_step(
-                    t,
-                    (
-                        f"-- OPTIONAL: ensure existing rows satisfy check before validation\n"
-                        f"-- For example, if expression is {p['expr']}, you may need to clean up violating rows."
-                    ),
-                    phase="backfill",
-                    reversible=False,
-                    depends_on=[add_id],
-                )
-            v_id = add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {p['name']};", phase="tighten", depends_on=[add_id])
-            validate_steps.append(next(s for s in steps if s.id == v_id))
-            continue
-
-        if k == OpKind.DROP_CHECK:
-            destr = not _is_allowed("drop_check", t, p["name"]) 
-            add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {p['name']};", phase="finalize", destructive=destr)
-            continue
-
-        if k == OpKind.ADD_UNIQUE:
-            cols_list = p["columns"]
-            # Optional: Postgres 15+ single-column NULLS NOT DISTINCT
-            cols = ", ".join(cols_list) or ""
-            if planner_hints.get("unique_nulls_not_distinct", False) and len(cols_list) == 1:
-                cols = f"{cols} NULLS NOT DISTINCT"
-            idx_name = f"uq_{t}_{'_'.join(cols_list)}_idx"
-            c_name = f"uq_{t}_{'_'.join(cols_list)}"
-            add_step(
+            # Drop the helper check
+            ctx.add_step(
                 t,
-                f"-- OPTIONAL: check duplicates before unique enforcement\n-- SELECT {cols}, COUNT(*) FROM {t} GROUP BY {cols} HAVING COUNT(*) > 1;",
-                phase="prep",
-                reversible=False,
+                f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {nn_chk_name};",
+                phase="finalize",
+                depends_on=[nn_id],
             )
-            add_step(
+        else:
+            nn_id = ctx.add_step(
                 t,
-                f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {idx_name} ON {t} ({cols});",
+                f"ALTER TABLE {t} ALTER COLUMN {p['name']} SET NOT NULL;",
+                phase="tighten",
+                reverse_sql=f"ALTER TABLE {t} ALTER COLUMN {p['name']} DROP NOT NULL;",
+                depends_on=[bf_id],
+            )
+        ctx.graph.mark_not_null(t, nn_id)
+
+
+def _plan_alter_column_type(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    name, old, new = p["name"], p["from"], p["to"]
+    reverse = f"ALTER TABLE {t} ALTER COLUMN {name} TYPE {old} USING {name}::{old};"
+    if classify_type_change(old, new) == TypeChange.METADATA_ONLY:
+        # Binary-coercible: only the catalog changes. Without USING, Postgres skips the rewrite
+        ctx.add_step(t, f"ALTER TABLE {t} ALTER COLUMN {name} TYPE {new};", phase="finalize", reverse_sql=reverse)
+        return
+    sql = f"ALTER TABLE {t} ALTER COLUMN {name} TYPE {new} USING {name}::{new};"
+    if ctx.strategy(t).shadow_type_change:
+        blocker = _shadow_blocker(ctx, t, name)
+        if blocker is None:
+            _plan_shadow_type_change(ctx, t, name, old, new, p.get("nullable", True), p.get("default"))
+            return
+        sql = f"-- no shadow column: {blocker}\n{sql}"
+    # Rewrites the table under an ACCESS EXCLUSIVE lock
+    ctx.add_step(t, sql, phase="finalize", reverse_sql=reverse)
+
+
+def _shadow_blocker(ctx: PlanContext, table: str, name: str) -> Optional[str]:
+    """Why the column cannot be swapped for a shadow copy, or None if it can."""
+    tbl = ctx.head_ir.tables.get(table)
+    col = tbl.columns.get(name) if tbl else None
+    if col is None:
+        return "column not in head schema"
+    if col.generated:
+        return "generated column"
+    uses = re.compile(rf"\b{re.escape(name)}\b")
+    for cname, expr in tbl.checks.items():
+        if uses.search(expr):
+            return f"check {cname} uses the column"
+    for fk in tbl.fks.values():
+        if name in fk.columns:
+            return f"foreign key {fk.name} uses the column"
+    inbound = ctx.inbound_fks(table, name)
+    if inbound:
+        return f"referenced by foreign key {inbound[0]}"
+    return None
+
+
+def _plan_shadow_type_change(
+    ctx: PlanContext, t: str, name: str, old: str, new: str, nullable: bool, default: Optional[str]
+) -> None:
+    # Add a column of the new type next to the old one, keep it in sync with a trigger, copy the
+    # existing rows in batches, then swap the two by renaming in one short transaction. The old
+    # column is kept in sync the other way as <name>__old, for rollback, until it is dropped.
+    tbl: Table = ctx.head_ir.tables[t]
+    schema, _, short = t.rpartition(".")
+    shadow, prev = _swap_name(name), _swap_name(name, "__old")
+    fwd, back = _swap_name(f"{short}_{name}", "__sync"), _swap_name(f"{short}_{name}", "__back")
+    fwd_fn, back_fn = (f"{schema}.{fwd}", f"{schema}.{back}") if schema else (fwd, back)
+    uses = re.compile(rf"\b{re.escape(name)}\b")
+
+    def on(cols: List[str], col: str) -> List[str]:
+        return [col if c == name else c for c in cols]
+
+    add_id = ctx.add_step(
+        t, f"ALTER TABLE {t} ADD COLUMN {shadow} {new};", phase="prep", reverse_sql=f"ALTER TABLE {t} DROP COLUMN IF EXISTS {shadow};"
+    )
+    sync_id = ctx.add_step(
+        t,
+        "\n".join(
+            [
+                _sync_function_sql(fwd_fn, shadow, name, new),
+                _sync_function_sql(back_fn, prev, name, old),
+                _sync_trigger_sql(t, fwd, fwd_fn),
+            ]
+        ),
+        phase="prep",
+        depends_on=[add_id],
+        reverse_sql=f"DROP TRIGGER IF EXISTS {fwd} ON {t};\nDROP FUNCTION IF EXISTS {fwd_fn}();\nDROP FUNCTION IF EXISTS {back_fn}();",
+    )
+    copy_id = ctx.add_step(
+        t,
+        _batched_update_sql(ctx, t, f"{shadow} = {name}::{new}", f"{shadow} IS NULL AND {name} IS NOT NULL"),
+        phase="backfill",
+        reversible=False,
+        depends_on=[sync_id],
+    )
+    swap_deps = [copy_id]
+    if not nullable:
+        chk = _swap_name(f"chk_{short}_{name}", "__nn")
+        chk_id = ctx.add_step(
+            t,
+            f"ALTER TABLE {t} ADD CONSTRAINT {chk} CHECK ({shadow} IS NOT NULL) NOT VALID;",
+            phase="prep",
+            depends_on=[sync_id],
+            reverse_sql=f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {chk};",
+        )
+        v_id = ctx.add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {chk};", phase="tighten", depends_on=[chk_id, copy_id])
+        nn_id = ctx.add_step(
+            t,
+            f"ALTER TABLE {t} ALTER COLUMN {shadow} SET NOT NULL;",
+            phase="tighten",
+            depends_on=[v_id],
+            reverse_sql=f"ALTER TABLE {t} ALTER COLUMN {shadow} DROP NOT NULL;",
+        )
+        ctx.add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {chk};", phase="finalize", depends_on=[nn_id])
+        swap_deps.append(nn_id)
+
+    # Indexes and key constraints on the column: build their twins on the shadow column first.
+    # The swap re-points the constraints at the twins (USING INDEX) and trades index names. The
+    # IR does not record key constraint names, so the swap looks them up in pg_constraint.
+    swap_sql, undo_sql, undo_pre = [f"DROP TRIGGER IF EXISTS {fwd} ON {t};"], [f"DROP TRIGGER IF EXISTS {back} ON {t};"], []
+    keys = [(f"{short}_pkey", "PRIMARY KEY", tbl.primary_key)] if name in tbl.primary_key else []
+    keys += [(f"uq_{short}_{'_'.join(cols)}", "UNIQUE", cols) for cols in tbl.uniques if name in cols]
+    declare = []
+    for i, (base_name, kind, cols) in enumerate(keys):
+        tmp, was, var = _swap_name(base_name), _swap_name(base_name, "__old"), f"_key{i}"
+        build = f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {tmp} ON {t} ({', '.join(on(cols, shadow))});"
+        swap_deps.append(
+            ctx.add_step(
+                t, build, phase="indexes", depends_on=[copy_id], reverse_sql=f"DROP INDEX CONCURRENTLY IF EXISTS {tmp};"
+            )
+        )
+        declare.append(f"{var} name;")
+        swap_sql += _swap_key_sql(t, kind, cols, var, tmp)
+        undo_pre.append(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {was} ON {t} ({', '.join(on(cols, prev))});")
+        undo_sql += _swap_key_sql(t, kind, cols, var, was)
+    for idx in tbl.indexes.values():
+        if name not in idx.columns and name not in idx.include and not (idx.where and uses.search(idx.where)):
+            continue
+        tmp, was = _swap_name(idx.name), _swap_name(idx.name, "__old")
+        twin = idx.model_copy(
+            update={
+                "columns": on(idx.columns, shadow),
+                "include": on(idx.include, shadow),
+                "where": uses.sub(shadow, idx.where) if idx.where else None,
+            }
+        )
+        swap_deps.append(
+            ctx.add_step(
+                t,
+                _create_index_sql(twin, tmp, t),
                 phase="indexes",
+                depends_on=[copy_id],
+                reverse_sql=f"DROP INDEX CONCURRENTLY IF EXISTS {tmp};",
             )
-            # Idempotent-ish guard for attaching constraint using existing index
-            guard_sql = (
-                f"DO $$\nBEGIN\n"
-                f"  IF NOT EXISTS (\n"
-                f"    SELECT 1 FROM pg_constraint\n"
-                f"    WHERE conname = '{c_name}' AND conrelid = '{t}'::regclass\n"
-                f"  ) THEN\n"
-                f"    ALTER TABLE {t} ADD CONSTRAINT {c_name} UNIQUE USING INDEX {idx_name} NOT DEFERRABLE;\n"
-                f"  END IF;\n"
-                f"END $$;"
+        )
+        swap_sql += [f"ALTER INDEX {idx.name} RENAME TO {was};", f"ALTER INDEX {tmp} RENAME TO {idx.name};"]
+        undo_sql += [f"ALTER INDEX {idx.name} RENAME TO {tmp};", f"ALTER INDEX {was} RENAME TO {idx.name};"]
+
+    # The old column gives up its default and NOT NULL (new rows only set the new one) and the
+    # new column takes them over, along with the sequence of a serial column
+    seq = re.match(r"nextval\('([^']+)'", default or "")
+    if default is not None:
+        swap_sql.append(f"ALTER TABLE {t} ALTER COLUMN {name} DROP DEFAULT;")
+    if not nullable:
+        swap_sql.append(f"ALTER TABLE {t} ALTER COLUMN {name} DROP NOT NULL;")
+    swap_sql += [f"ALTER TABLE {t} RENAME COLUMN {name} TO {prev};", f"ALTER TABLE {t} RENAME COLUMN {shadow} TO {name};"]
+    undo_cols = []
+    if default is not None:
+        swap_sql.append(f"ALTER TABLE {t} ALTER COLUMN {name} SET DEFAULT {default};")
+        undo_cols.append(f"ALTER TABLE {t} ALTER COLUMN {name} DROP DEFAULT;")
+    undo_cols += [f"ALTER TABLE {t} RENAME COLUMN {name} TO {shadow};", f"ALTER TABLE {t} RENAME COLUMN {prev} TO {name};"]
+    if default is not None:
+        undo_cols.append(f"ALTER TABLE {t} ALTER COLUMN {name} SET DEFAULT {default};")
+    if seq:
+        swap_sql.append(f"ALTER SEQUENCE {seq.group(1)}{_sequence_as(new)} OWNED BY {t}.{name};")
+        undo_cols.append(f"ALTER SEQUENCE {seq.group(1)}{_sequence_as(old)} OWNED BY {t}.{name};")
+    if not nullable:
+        undo_cols.append(f"ALTER TABLE {t} ALTER COLUMN {name} SET NOT NULL;")
+    swap_sql.append(_sync_trigger_sql(t, back, back_fn))
+    swap_id = ctx.add_step(
+        t,
+        _do_block(swap_sql, declare),
+        phase="finalize",
+        depends_on=swap_deps,
+        reverse_sql="\n".join(undo_pre + [_do_block(undo_sql + undo_cols, declare)]),
+    )
+    ctx.type_swap_step_by_col[(t, name)] = swap_id
+
+    cleanup_id = ctx.add_step(
+        t,
+        f"DROP TRIGGER IF EXISTS {back} ON {t};\nDROP FUNCTION IF EXISTS {fwd_fn}();\nDROP FUNCTION IF EXISTS {back_fn}();",
+        phase="finalize",
+        reversible=False,
+        depends_on=[swap_id],
+    )
+    ctx.add_step(
+        t,
+        f"ALTER TABLE {t} DROP COLUMN IF EXISTS {prev};",
+        phase="finalize",
+        reversible=False,
+        depends_on=[cleanup_id],
+        destructive=not ctx.allows("drop_column", t, prev),
+    )
+
+
+def _sync_function_sql(func: str, target: str, source: str, data_type: str) -> str:
+    return (
+        f"CREATE OR REPLACE FUNCTION {func}() RETURNS trigger LANGUAGE plpgsql AS $fn$\n"
+        f"BEGIN\n"
+        f"  NEW.{target} := NEW.{source}::{data_type};\n"
+        f"  RETURN NEW;\n"
+        f"END\n"
+        f"$fn$;"
+    )
+
+
+def _sync_trigger_sql(table: str, trigger: str, func: str) -> str:
+    return f"CREATE TRIGGER {trigger} BEFORE INSERT OR UPDATE ON {table} FOR EACH ROW EXECUTE FUNCTION {func}();"
+
+
+def _sequence_as(data_type: str) -> str:
+    # a serial's sequence is typed too; int -> bigint needs the sequence widened as well
+    base = parse_pg_type(data_type)[0]
+    return f" AS {base}" if base in ("smallint", "integer", "bigint") else ""
+
+
+def _do_block(statements: List[str], declare: Optional[List[str]] = None) -> str:
+    body = "".join(f"  {line}\n" for stmt in statements for line in stmt.split("\n"))
+    variables = "DECLARE\n" + "".join(f"  {d}\n" for d in declare) if declare else ""
+    return f"DO $$\n{variables}BEGIN\n{body}END $$;"
+
+
+def _swap_key_sql(table: str, kind: str, cols: List[str], var: str, index: str) -> List[str]:
+    """PL/pgSQL moving table's PRIMARY KEY or UNIQUE constraint on cols onto index, under the
+    constraint's current name, which is looked up into var."""
+    if kind == "PRIMARY KEY":
+        lookup = f"SELECT conname FROM pg_constraint WHERE conrelid = '{table}'::regclass AND contype = 'p'"
+    else:
+        names = ", ".join(f"'{c}'" for c in sorted(cols))
+        lookup = (
+            f"SELECT c.conname FROM pg_constraint c WHERE c.conrelid = '{table}'::regclass AND c.contype = 'u'\n"
+            f"  AND ARRAY(SELECT a.attname::text FROM pg_attribute a WHERE a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey)"
+            f' ORDER BY 1 COLLATE "C") = ARRAY[{names}]::text[]'
+        )
+    return [
+        f"{var} := ({lookup});",
+        f"IF {var} IS NULL THEN\n  RAISE EXCEPTION 'no {kind} constraint on {table} ({', '.join(cols)})';\nEND IF;",
+        f"EXECUTE format('ALTER TABLE {table} DROP CONSTRAINT %1$I, ADD CONSTRAINT %1$I {kind} USING INDEX {index}', {var});",
+    ]
+
+
+def _plan_add_index(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    ctx.add_step(t, _create_index_sql(p["index"], p["index"].name, t), phase="indexes")
+
+
+def _plan_rename_index(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    ctx.add_step(
+        t,
+        f"ALTER INDEX {p['from']} RENAME TO {p['to']};",
+        phase="prep",
+        reverse_sql=f"ALTER INDEX {p['to']} RENAME TO {p['from']};",
+    )
+
+
+def _plan_rebuild_index(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    # Build the new definition next to the old index, then swap: queries keep an index
+    # to use throughout, and only the final rename takes a brief lock
+    idx: Index = p["index"]
+    tmp = _swap_name(idx.name)
+    build_id = ctx.add_step(t, _create_index_sql(idx, tmp, t), phase="indexes")
+    base_table = ctx.base_ir.tables.get(t)
+    old_idx = base_table.indexes.get(idx.name) if base_table is not None else None
+    if old_idx is not None and _backed_constraint(base_table, old_idx):
+        # Postgres refuses DROP INDEX on a PRIMARY KEY / UNIQUE constraint's index: swap the
+        # constraint over to the new index in one statement (which also renames it), or drop
+        # the constraint if the new index can no longer back it
+        kind = _backed_constraint(ctx.head_ir.tables.get(t), idx)
+        if kind:
+            ctx.add_step(
+                t,
+                f"ALTER TABLE {t} DROP CONSTRAINT {idx.name}, ADD CONSTRAINT {idx.name} {kind} USING INDEX {tmp};",
+                phase="indexes",
+                depends_on=[build_id],
             )
-            add_step(t, guard_sql, phase="finalize")
+            return
+        drop_id = ctx.add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT {idx.name};", phase="indexes", depends_on=[build_id])
+    else:
+        drop_id = ctx.add_step(t, f"DROP INDEX CONCURRENTLY IF EXISTS {idx.name};", phase="indexes", depends_on=[build_id])
+    ctx.add_step(t, f"ALTER INDEX {tmp} RENAME TO {idx.name};", phase="indexes", depends_on=[drop_id])
+
+
+def _backed_constraint(table: Optional[Table], idx: Index) -> Optional[str]:
+    """"PRIMARY KEY" or "UNIQUE" when idx is (or can be) the index of that constraint of table."""
+    if table is None or not idx.unique or idx.where or idx.method != "btree":
+        return None
+    if table.primary_key and idx.columns == table.primary_key:
+        return "PRIMARY KEY"
+    if sorted(idx.columns) in [sorted(u) for u in table.uniques]:
+        return "UNIQUE"
+    return None
+
+
+def _plan_drop_index(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    destr = not ctx.allows("drop_index", None, p["name"])  # global index name
+    ctx.add_step(t, f"DROP INDEX CONCURRENTLY IF EXISTS {p['name']};", phase="indexes", destructive=destr)
+
+
+def _plan_add_fk(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    fk: ForeignKey = p["fk"]
+    add_id = ctx.add_step(
+        t,
+        f"ALTER TABLE {t} ADD CONSTRAINT {fk.name} {_fk_definition(fk)} NOT VALID;",
+        phase="prep",
+    )
+    ctx.add_constraint_steps.append(ctx.graph[add_id])
+    # Optional data hygiene hint for orphans before validate
+    if ctx.settings.emit_data_validation_hints:
+        ctx.add_step(
+            t,
+            (
+                f"-- OPTIONAL: handle orphans before FK VALIDATE\n"
+                f"-- DELETE FROM {t} child WHERE NOT EXISTS (SELECT 1 FROM {fk.ref_table} parent WHERE parent.{fk.ref_columns[0]} = child.{fk.columns[0]});\n"
+                f"-- or UPDATE to a fallback user_id per your rules"
+            ),
+            phase="backfill",
+            reversible=False,
+            depends_on=[add_id],
+        )
+    v_id = ctx.add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {fk.name};", phase="tighten", depends_on=[add_id])
+    ctx.validate_steps.append(ctx.graph[v_id])
+
+
+def _plan_rename_constraint(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    ctx.add_step(
+        t,
+        f"ALTER TABLE {t} RENAME CONSTRAINT {p['from']} TO {p['to']};",
+        phase="prep",
+        reverse_sql=f"ALTER TABLE {t} RENAME CONSTRAINT {p['to']} TO {p['from']};",
+    )
+
+
+def _plan_rebuild_constraint(ctx: PlanContext, op: Op) -> None:
+    t, k, p = op.table, op.kind, op.payload
+    # Add the new definition under a temporary name NOT VALID, validate it, then drop the
+    # old constraint and take over its name
+    if k == OpKind.REBUILD_FK:
+        fk: ForeignKey = p["fk"]
+        cname, definition = fk.name, _fk_definition(fk)
+    else:
+        cname, definition = p["name"], f"CHECK ({p['expr']})"
+    tmp = _swap_name(cname)
+    add_id = ctx.add_step(t, f"ALTER TABLE {t} ADD CONSTRAINT {tmp} {definition} NOT VALID;", phase="prep")
+    ctx.add_constraint_steps.append(ctx.graph[add_id])
+    v_id = ctx.add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {tmp};", phase="tighten", depends_on=[add_id])
+    ctx.validate_steps.append(ctx.graph[v_id])
+    drop_id = ctx.add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {cname};", phase="finalize", depends_on=[v_id])
+    ctx.add_step(t, f"ALTER TABLE {t} RENAME CONSTRAINT {tmp} TO {cname};", phase="finalize", depends_on=[drop_id])
+
+
+def _plan_drop_fk(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    ctx.add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {p['name']};", phase="finalize", destructive=True)
+
+
+def _plan_add_check(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    add_id = ctx.add_step(t, f"ALTER TABLE {t} ADD CONSTRAINT {p['name']} CHECK ({p['expr']}) NOT VALID;", phase="prep")
+    ctx.add_constraint_steps.append(ctx.graph[add_id])
+    # Optional data hygiene hint before validate
+    if ctx.settings.emit_data_validation_hints:
+        ctx.add_step(
+            t,
+            (
+                f"-- OPTIONAL: ensure existing rows satisfy check before validation\n"
+                f"-- For example, if expression is {p['expr']}, you may need to clean up violating rows."
+            ),
+            phase="backfill",
+            reversible=False,
+            depends_on=[add_id],
+        )
+    v_id = ctx.add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {p['name']};", phase="tighten", depends_on=[add_id])
+    ctx.validate_steps.append(ctx.graph[v_id])
+
+
+def _plan_drop_check(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    destr = not ctx.allows("drop_check", t, p["name"]) 
+    ctx.add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS {p['name']};", phase="finalize", destructive=destr)
+
+
+def _plan_add_unique(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    cols_list = p["columns"]
+    # Optional: Postgres 15+ single-column NULLS NOT DISTINCT
+    cols = ", ".join(cols_list) or ""
+    if ctx.settings.unique_nulls_not_distinct and len(cols_list) == 1:
+        cols = f"{cols} NULLS NOT DISTINCT"
+    idx_name = f"uq_{t}_{'_'.join(cols_list)}_idx"
+    c_name = f"uq_{t}_{'_'.join(cols_list)}"
+    ctx.add_step(
+        t,
+        f"-- OPTIONAL: check duplicates before unique enforcement\n-- SELECT {cols}, COUNT(*) FROM {t} GROUP BY {cols} HAVING COUNT(*) > 1;",
+        phase="prep",
+        reversible=False,
+    )
+    ctx.add_step(
+        t,
+        f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {idx_name} ON {t} ({cols});",
+        phase="indexes",
+    )
+    # Idempotent-ish guard for attaching constraint using existing index
+    guard_sql = (
+        f"DO $$\nBEGIN\n"
+        f"  IF NOT EXISTS (\n"
+        f"    SELECT 1 FROM pg_constraint\n"
+        f"    WHERE conname = '{c_name}' AND conrelid = '{t}'::regclass\n"
+        f"  ) THEN\n"
+        f"    ALTER TABLE {t} ADD CONSTRAINT {c_name} UNIQUE USING INDEX {idx_name} NOT DEFERRABLE;\n"
+        f"  END IF;\n"
+        f"END $$;"
+    )
+    ctx.add_step(t, guard_sql, phase="finalize")
+
+
+def _plan_drop_unique(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    destr = not ctx.allows("drop_unique", t, "_".join(p["columns"]))
+    ctx.add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS uq_{t}_{'_'.join(p['columns'])};", phase="finalize", destructive=destr)
+
+
+def _plan_create_table(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    # Build CREATE TABLE with columns and primary key
+    tbl: Table = p["table"]
+    pk = tbl.primary_key
+
+    col_defs = []
+    for cname, c in tbl.columns.items():
+        pieces = [cname, c.data_type]
+        # Inline primary key if single column
+        if len(pk) == 1 and pk[0] == cname:
+            pieces.append("PRIMARY KEY")
+        if not c.nullable:
+            pieces.append("NOT NULL")
+        if c.default is not None:
+            pieces.append(f"DEFAULT {c.default}")
+        col_defs.append(" ".join(pieces))
+
+    table_constraints = []
+    if len(pk) > 1:
+        table_constraints.append(f"PRIMARY KEY ({', '.join(pk)})")
+
+    defs = ",\n  ".join(col_defs + table_constraints)
+    create_sql = f"CREATE TABLE IF NOT EXISTS {t} (\n  {defs}\n);"
+    ctx.add_step(t, create_sql, phase="prep", reversible=False, reverse_sql=f"DROP TABLE IF EXISTS {t};")
+
+    # After creation, add checks/uniques/fks found in table payload safely
+    for cname, expr in tbl.checks.items():
+        add_id = ctx.add_step(t, f"ALTER TABLE {t} ADD CONSTRAINT {cname} CHECK ({expr}) NOT VALID;", phase="prep")
+        ctx.add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {cname};", phase="tighten", depends_on=[add_id])
+
+    for uq_cols in tbl.uniques:
+        cols_list = uq_cols
+        cols_join = ", ".join(cols_list)
+        idx_name = f"uq_{t}_{'_'.join(cols_list)}_idx"
+        c_name = f"uq_{t}_{'_'.join(cols_list)}"
+        ctx.add_step(t, f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {idx_name} ON {t} ({cols_join});", phase="indexes")
+        guard_sql = (
+            f"DO $$\nBEGIN\n"
+            f"  IF NOT EXISTS (\n"
+            f"    SELECT 1 FROM pg_constraint WHERE conname = '{c_name}' AND conrelid = '{t}'::regclass\n"
+            f"  ) THEN\n"
+            f"    ALTER TABLE {t} ADD CONSTRAINT {c_name} UNIQUE USING INDEX {idx_name} NOT DEFERRABLE;\n"
+            f"  END IF;\n"
+            f"END $$;"
+        )
+        ctx.add_step(t, guard_sql, phase="finalize")
+
+    for fk_name, tfk in tbl.fks.items():
+        cols_join = ", ".join(tfk.columns)
+        rcols_join = ", ".join(tfk.ref_columns)
+        clauses = []
+        if tfk.on_delete:
+            clauses.append(f"ON DELETE {tfk.on_delete}")
+        if tfk.on_update:
+            clauses.append(f"ON UPDATE {tfk.on_update}")
+        add_id = ctx.add_step(
+            t,
+            f"ALTER TABLE {t} ADD CONSTRAINT {tfk.name or fk_name} FOREIGN KEY ({cols_join}) REFERENCES {tfk.ref_table} ({rcols_join}) {' '.join(clauses)} NOT VALID;",
+            phase="prep",
+        )
+        ctx.add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {tfk.name or fk_name};", phase="tighten", depends_on=[add_id])
+
+
+def _plan_drop_table(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    destr = not ctx.allows("drop_table", t)
+    ctx.add_step(t, f"DROP TABLE IF EXISTS {t};", phase="finalize", reversible=False, destructive=destr)
+
+
+def _plan_drop_column(ctx: PlanContext, op: Op) -> None:
+    t, p = op.table, op.payload
+    destr = not ctx.allows("drop_column", t, p["name"]) 
+    ctx.add_step(t, f"ALTER TABLE {t} DROP COLUMN IF EXISTS {p['name']};", phase="finalize", destructive=destr)
+
+
+POSTGRES_OP_HANDLERS: Dict[OpKind, OpHandler] = {
+    OpKind.RENAME_TABLE: _plan_rename_table,
+    OpKind.RENAME_COLUMN: _plan_rename_column,
+    OpKind.ADD_COLUMN: _plan_add_column,
+    OpKind.ALTER_DEFAULT: _plan_alter_default,
+    OpKind.ALTER_NULLABLE: _plan_alter_nullable,
+    OpKind.ALTER_COLUMN_TYPE: _plan_alter_column_type,
+    OpKind.ADD_INDEX: _plan_add_index,
+    OpKind.RENAME_INDEX: _plan_rename_index,
+    OpKind.REBUILD_INDEX: _plan_rebuild_index,
+    OpKind.DROP_INDEX: _plan_drop_index,
+    OpKind.ADD_FK: _plan_add_fk,
+    OpKind.RENAME_CONSTRAINT: _plan_rename_constraint,
+    OpKind.REBUILD_FK: _plan_rebuild_constraint,
+    OpKind.REBUILD_CHECK: _plan_rebuild_constraint,
+    OpKind.DROP_FK: _plan_drop_fk,
+    OpKind.ADD_CHECK: _plan_add_check,
+    OpKind.DROP_CHECK: _plan_drop_check,
+    OpKind.ADD_UNIQUE: _plan_add_unique,
+    OpKind.DROP_UNIQUE: _plan_drop_unique,
+    OpKind.CREATE_TABLE: _plan_create_table,
+    OpKind.DROP_TABLE: _plan_drop_table,
+    OpKind.DROP_COLUMN: _plan_drop_column,
+}
+
+
+def _backfill_sql(ctx: PlanContext, table: str, columns: List[Tuple[str, str]]) -> str:
+    """One UPDATE filling the NULLs of all (column, expression) pairs in a single pass."""
+    if len(columns) == 1:
+        (name, expr), = columns
+        assignments, predicate = f"{name} = {expr}", f"{name} IS NULL"
+    else:
+        # rows may be NULL in only some of the columns; COALESCE keeps the values already there
+        assignments = ", ".join(f"{name} = COALESCE({name}, {expr})" for name, expr in columns)
+        predicate = " OR ".join(f"{name} IS NULL" for name, _ in columns)
+    if not ctx.strategy(table).batched_backfill:
+        return f"UPDATE {table} SET {assignments} WHERE {predicate};"
+    if len(columns) > 1:
+        predicate = f"({predicate})"
+    return _batched_update_sql(ctx, table, assignments, predicate)
+
+
+def _batched_update_sql(ctx: PlanContext, table: str, assignments: str, predicate: str) -> str:
+    head_table = ctx.head_ir.tables.get(table)
+    pk = list(head_table.primary_key) if head_table else []
+    if pk and all(c in head_table.columns for c in pk):
+        return _keyset_backfill_sql(ctx, table, [(c, head_table.columns[c].data_type) for c in pk], assignments, predicate)
+    return _ctid_backfill_sql(ctx, table, assignments, predicate)
+
+
+# serial pseudo-types cannot declare a variable
+_SERIAL_TYPES = {"smallserial": "smallint", "serial": "integer", "bigserial": "bigint"}
+
+
+def _keyset_backfill_sql(ctx: PlanContext, table: str, pk: List[Tuple[str, str]], assignments: str, predicate: str) -> str:
+    # Walk the primary key in ranges of _batch rows: each batch reads its slice of the key index
+    # instead of rescanning for remaining NULLs, and is committed on its own
+    cols = ", ".join(c for c, _ in pk)
+    key = cols if len(pk) == 1 else f"({cols})"
+    lo = ", ".join(f"_lo{i}" for i in range(len(pk)))
+    hi = ", ".join(f"_hi{i}" for i in range(len(pk)))
+    lo_key, hi_key = (lo, hi) if len(pk) == 1 else (f"({lo})", f"({hi})")
+    types = [_SERIAL_TYPES.get(t.lower(), t) for _, t in pk]
+    declare = "".join(f"  _lo{i} {t};\n  _hi{i} {t};\n" for i, t in enumerate(types))
+    update = f"UPDATE {table} SET {assignments}\n      WHERE {key} >= {lo_key}"
+    advance = "".join(f"    _lo{i} := _hi{i};\n" for i in range(len(pk)))
+    return (
+        f"-- Batched backfill: keyset over {table} ({cols}), committed per batch; run outside a transaction block\n"
+        f"DO $$\n"
+        f"DECLARE\n"
+        f"  _batch INT := {ctx.settings.default_backfill_batch_rows};\n"
+        f"  _sleep FLOAT := {ctx.settings.backfill_sleep_ms / 1000};\n"
+        f"  _done BIGINT := 0;\n"
+        f"  _rows BIGINT;\n"
+        f"  _more BOOLEAN;\n"
+        f"{declare}"
+        f"BEGIN\n"
+        f"  SELECT {cols} INTO {lo} FROM {table} ORDER BY {cols} LIMIT 1;\n"
+        f"  IF NOT FOUND THEN\n"
+        f"    RETURN;\n"
+        f"  END IF;\n"
+        f"  LOOP\n"
+        f"    SELECT {cols} INTO {hi} FROM {table} WHERE {key} >= {lo_key} ORDER BY {cols} OFFSET _batch LIMIT 1;\n"
+        f"    _more := FOUND;\n"
+        f"    IF _more THEN\n"
+        f"      {update} AND {key} < {hi_key} AND {predicate};\n"
+        f"    ELSE\n"
+        f"      {update} AND {predicate};\n"
+        f"    END IF;\n"
+        f"    GET DIAGNOSTICS _rows = ROW_COUNT;\n"
+        f"    _done := _done + _rows;\n"
+        f"    COMMIT;\n"
+        f"    RAISE NOTICE 'backfill {table}: % rows updated, next key %', _done, CASE WHEN _more THEN {hi_key}::text END;\n"
+        f"    EXIT WHEN NOT _more;\n"
+        f"{advance}"
+        f"    PERFORM pg_sleep(_sleep);\n"
+        f"  END LOOP;\n"
+        f"END $$;"
+    )
+
+
+# TID range scans, which let each ctid batch read only its own pages
+_TID_RANGE_SCAN_MAJOR = 14
+
+
+def _ctid_backfill_sql(ctx: PlanContext, table: str, assignments: str, predicate: str) -> str:
+    # No primary key to walk: step through the heap in ranges of physical pages (TID range scans)
+    if ctx.policy.pg_major is None or ctx.policy.pg_major < _TID_RANGE_SCAN_MAJOR:
+        # without them every batch scans the whole table; one pass is cheaper
+        target = "not set" if ctx.policy.pg_major is None else str(ctx.policy.pg_major)
+        return (
+            f"-- Backfill of {table} in one UPDATE: it has no primary key to batch by, and ctid range batches need "
+            f"PostgreSQL {_TID_RANGE_SCAN_MAJOR}+ (dialect.postgres.target_version: {target})\n"
+            f"UPDATE {table} SET {assignments} WHERE {predicate};"
+        )
+    return (
+        f"-- Batched backfill: ctid ranges over {table} (no primary key), committed per batch; run outside a transaction block\n"
+        f"DO $$\n"
+        f"DECLARE\n"
+        f"  _pages BIGINT := {ctx.settings.backfill_batch_pages};\n"
+        f"  _sleep FLOAT := {ctx.settings.backfill_sleep_ms / 1000};\n"
+        f"  _done BIGINT := 0;\n"
+        f"  _rows BIGINT;\n"
+        f"  _page BIGINT := 0;\n"
+        f"  _last BIGINT := pg_relation_size('{table}') / current_setting('block_size')::int;\n"
+        f"BEGIN\n"
+        f"  WHILE _page <= _last LOOP\n"
+        f"    UPDATE {table} SET {assignments}\n"
+        f"    WHERE ctid >= format('(%s,0)', _page)::tid AND ctid < format('(%s,0)', _page + _pages)::tid AND {predicate};\n"
+        f"    GET DIAGNOSTICS _rows = ROW_COUNT;\n"
+        f"    _done := _done + _rows;\n"
+        f"    COMMIT;\n"
+        f"    RAISE NOTICE 'backfill {table}: % rows updated, page % of %', _done, LEAST(_page + _pages, _last), _last;\n"
+        f"    _page := _page + _pages;\n"
+        f"    PERFORM pg_sleep(_sleep);\n"
+        f"  END LOOP;\n"
+        f"END $$;"
+    )
+
+
+def _add_backfill(ctx: PlanContext, table: str, column: str, expr: str, depends_on: List[str]) -> str:
+    bf_id = ctx.add_step(table, _backfill_sql(ctx, table, [(column, expr)]), phase="backfill", reversible=False, depends_on=depends_on)
+    ctx.backfills.setdefault(table, []).append((bf_id, column, expr))
+    return bf_id
+
+
+def _merge_backfills(ctx: PlanContext, graph: StepGraph) -> StepGraph:
+    """Fold each table's backfills into its first one, so the table is scanned and rewritten once.
+
+    The merged step takes the union of their dependencies and the NOT NULL tightening (and
+    anything else) that waited on any of them waits on it instead. A backfill that waits on a
+    shadow column swap stays separate: merged, every other backfill would wait on the swap too.
+    """
+    swaps = set(ctx.type_swap_step_by_col.values())
+    merged_into: Dict[str, str] = {}
+    for table, entries in ctx.backfills.items():
+        entries = [e for e in entries if not swaps.intersection(graph[e[0]].depends_on)]
+        if len(entries) < 2:
             continue
-
-        if k == OpKind.DROP_UNIQUE:
-            destr = not _is_allowed("drop_unique", t, "_".join(p["columns"]))
-            add_step(t, f"ALTER TABLE {t} DROP CONSTRAINT IF EXISTS uq_{t}_{'_'.join(p['columns'])};", phase="finalize", destructive=destr)
+        head = graph[entries[0][0]]
+        head.sql = _backfill_sql(ctx, table, [(column, expr) for _, column, expr in entries])
+        head.depends_on = list(dict.fromkeys(d for bf_id, _, _ in entries for d in graph[bf_id].depends_on))
+        for bf_id, _, _ in entries[1:]:
+            merged_into[bf_id] = head.id
+    if not merged_into:
+        return graph
+    steps = [s for s in graph if s.id not in merged_into]
+    for s in steps:
+        if any(d in merged_into for d in s.depends_on):
+            s.depends_on = list(dict.fromkeys(merged_into.get(d, d) for d in s.depends_on if merged_into.get(d, d) != s.id))
+    return StepGraph(steps)
+
+
+# ALTER TABLE subcommands that Postgres accepts together in one statement. RENAME COLUMN is a
+# separate form of ALTER TABLE and cannot be combined with anything.
+_COALESCABLE = re.compile(
+    r"(ADD COLUMN|DROP COLUMN|ALTER COLUMN \S+ (SET DEFAULT|DROP DEFAULT|SET NOT NULL|DROP NOT NULL|TYPE)) "
+)
+
+
+def _alter_action(table: Optional[str], sql: Optional[str]) -> Optional[str]:
+    prefix = f"ALTER TABLE {table} "
+    if not sql or not sql.startswith(prefix) or not sql.endswith(";") or "\n" in sql:
+        return None
+    action = sql[len(prefix) : -1]
+    if ";" in action or not _COALESCABLE.match(action + " "):
+        return None
+    return action
+
+
+def _alter_sql(table: str, actions: List[str]) -> str:
+    return f"ALTER TABLE {table}\n  " + ",\n  ".join(actions) + ";"
+
+
+def _coalesce_alter_table(graph: StepGraph) -> List[Step]:
+    """Merge single-action ALTER TABLE steps of a table that share a phase and dependency level.
+
+    Steps on the same level never depend on each other, so the merged step takes the union of
+    their dependencies and the steps depending on any of them depend on it instead. Postgres
+    takes the table lock once for the statement and rewrites the table at most once.
+    """
+    levels = graph.levels()
+    if levels is None:
+        return graph.steps()
+    groups: Dict[tuple, List[Step]] = {}
+    for s in graph:
+        if s.destructive or _alter_action(s.table, s.sql) is None:
             continue
+        groups.setdefault((s.table, s.phase, levels[s.id], s.reversible), []).append(s)
 
-        if k == OpKind.CREATE_TABLE:
-            # Build CREATE TABLE with columns and primary key
-            tbl = p.get("table", {})
-            cols = tbl.get("columns", {})
-            pk = tbl.get("primary_key", []) or []
-
-            col_defs = []
-            for cname, c in cols.items():
-                dtype = c.get("data_type")
-                nullable = c.get("nullable", True)
-                default = c.get("default")
-                pieces = [cname, dtype]
-                # Inline primary key if single column
-                if len(pk) == 1 and pk[0] == cname:
-                    pieces.append("PRIMARY KEY")
-                if not nullable:
-                    pieces.append("NOT NULL")
-                if default is not None:
-                    pieces.append(f"DEFAULT {default}")
-                col_defs.append(" ".join(pieces))
-
-            table_constraints = []
-            if len(pk) > 1:
-                table_constraints.append(f"PRIMARY KEY ({', '.join(pk)})")
-
-            defs = ",\n  ".join(col_defs + table_constraints)
-            create_sql = f"CREATE TABLE IF NOT EXISTS {t} (\n  {defs}\n);"
-            add_step(t, create_sql, phase="prep", reversible=False, reverse_sql=f"DROP TABLE IF EXISTS {t};")
-
-            # After creation, add checks/uniques/fks found in table payload safely
-            for cname, expr in (tbl.get("checks", {}) or {}).items():
-                add_id = add_step(t, f"ALTER TABLE {t} ADD CONSTRAINT {cname} CHECK ({expr}) NOT VALID;", phase="prep")
-                add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {cname};", phase="tighten", depends_on=[add_id])
-
-            for uq_cols in (tbl.get("uniques", []) or []):
-                cols_list = uq_cols
-                cols_join = ", ".join(cols_list)
-                idx_name = f"uq_{t}_{'_'.join(cols_list)}_idx"
-                c_name = f"uq_{t}_{'_'.join(cols_list)}"
-                add_step(t, f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {idx_name} ON {t} ({cols_join});", phase="indexes")
-                guard_sql = (
-                    f"DO $$\nBEGIN\n"
-                    f"  IF NOT EXISTS (\n"
-                    f"    SELECT 1 FROM pg_constraint WHERE conname = '{c_name}' AND conrelid = '{t}'::regclass\n"
-                    f"  ) THEN\n"
-                    f"    ALTER TABLE {t} ADD CONSTRAINT {c_name} UNIQUE USING INDEX {idx_name} NOT DEFERRABLE;\n"
-                    f"  END IF;\n"
-                    f"END $$;"
-                )
-                add_step(t, guard_sql, phase="finalize")
-
-            for fk_name, fk in (tbl.get("fks", {}) or {}).items():
-                cols_join = ", ".join(fk.get("columns", []))
-                rcols_join = ", ".join(fk.get("ref_columns", []))
-                clauses = []
-                if fk.get("on_delete"):
-                    clauses.append(f"ON DELETE {fk['on_delete']}")
-                if fk.get("on_update"):
-                    clauses.append(f"ON UPDATE {fk['on_update']}")
-                add_id = add_step(
-                    t,
-                    f"ALTER TABLE {t} ADD CONSTRAINT {fk.get('name', fk_name)} FOREIGN KEY ({cols_join}) REFERENCES {fk['ref_table']} ({rcols_join}) {' '.join(clauses)} NOT VALID;",
-                    phase="prep",
-                )
-                add_step(t, f"ALTER TABLE {t} VALIDATE CONSTRAINT {fk.get('name', fk_name)};", phase="tighten", depends_on=[add_id])
-            continue
-        if k == OpKind.DROP_TABLE:
-            destr = not _is_allowed("drop_table", t)
-            add_step(t, f"DROP TABLE IF EXISTS {t};", phase="finalize", reversible=False, destructive=destr)
+    merged_into: Dict[str, str] = {}
+    for members in groups.values():
+        if len(members) < 2:
             continue
+        head = members[0]
+        # read every member before head.sql and head.reverse_sql are overwritten
+        parts = [(_alter_action(m.table, m.sql), m.reverse_sql) for m in members]
+        head.sql = _alter_sql(head.table, [action for action, _ in parts])
+        if any(reverse is not None for _, reverse in parts):
+            head.reverse_sql = _merged_reverse_sql(head.table, parts)
+        head.depends_on = list(dict.fromkeys(d for m in members for d in m.depends_on))
+        for m in members[1:]:
+            merged_into[m.id] = head.id
+
+    steps = [s for s in graph if s.id not in merged_into]
+    for s in steps:
+        if any(d in merged_into for d in s.depends_on):
+            s.depends_on = list(dict.fromkeys(merged_into.get(d, d) for d in s.depends_on))
+    return steps
 
-        if k == OpKind.DROP_COLUMN:
-            destr = not _is_allowed("drop_column", t, p["name"]) 
-            add_step(t, f"ALTER TABLE {t} DROP COLUMN IF EXISTS {p['name']};", phase="finalize", destructive=destr)
-            continue
 
-    # Ensure validate depends on NOT NULL tighten steps for the same table when present
-    for vs in validate_steps:
-        # Find any not-null step for this table and add as dependency
-        for (tt, col), nn_id in notnull_step_by_col.items():
-            if vs.table == tt and nn_id not in vs.depends_on:
-                vs.depends_on.append(nn_id)
+def _merged_reverse_sql(table: str, parts: List[Tuple[str, Optional[str]]]) -> str:
+    """Rollback of merged steps, given each member's (action, rollback SQL): the rollback SQL in
+    reverse order, combined into one ALTER TABLE where it can be, after a note for each member
+    that has none."""
+    notes = [f"-- no rollback SQL (may be lossy): {action}" for action, reverse in reversed(parts) if reverse is None]
+    reverse = [r for _, r in reversed(parts) if r is not None]
+    actions = [_alter_action(table, r) for r in reverse]
+    undo = "\n".join(reverse) if None in actions or len(actions) < 2 else _alter_sql(table, actions)
+    return "\n".join(notes + [undo])
 
-    # Ensure adding constraints (NOT VALID) happens after backfill for the table
-    for cs in add_constraint_steps:
-        # depend on all backfills for the same table
-        for (tt, col), bf_id in backfill_step_by_col.items():
-            if cs.table == tt and bf_id not in cs.depends_on:
-                cs.depends_on.append(bf_id)
 
-    return steps
+def _create_index_sql(idx: Index, name: str, table: str) -> str:
+    unique = "UNIQUE " if idx.unique else ""
+    sql = f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING {idx.method} ({', '.join(idx.columns)})"
+    if idx.include:
+        sql += f" INCLUDE ({', '.join(idx.include)})"
+    if idx.where:
+        sql += f" WHERE {idx.where}"
+    return sql + ";"
+
+
+def _fk_definition(fk: ForeignKey) -> str:
+    clauses = []
+    if fk.on_delete:
+        clauses.append(f"ON DELETE {fk.on_delete}")
+    if fk.on_update:
+        clauses.append(f"ON UPDATE {fk.on_update}")
+    return f"FOREIGN KEY ({', '.join(fk.columns)}) REFERENCES {fk.ref_table} ({', '.join(fk.ref_columns)}) {' '.join(clauses)}"
 
 
+def _swap_name(name: str, suffix: str = "__new") -> str:
+    # temporary name for rebuild-and-swap, kept within Postgres' 63-byte identifier limit
+    return f"{name[:63 - len(suffix)]}{suffix}"
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from typing import Callable, Dict, Optional, Tuple
+import importlib
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple, Union
+
+if TYPE_CHECKING:
+    from importlib.metadata import EntryPoint
 
 # Adapters emit IR from a repo path + module hint
 AdapterFactory = Callable[[], object]
@@ -10,63 +14,149 @@ AdapterFactory = Callable[[], object]
 # sqlgen: (steps, hints) -> Tuple[str, str, dict]
 PlannerFunc = Callable[..., object]
 SqlGenFunc = Callable[..., Tuple[str, str, dict]]
+# writer (optional, for --stream): (step_groups, forward_path, rollback_path, hints) -> summary dict
+WriterFunc = Callable[..., dict]
+# planner extension points, consulted by the built-in planner of the dialect:
+# op handler: (ctx, op) -> None, replaces the built-in strategy for one op kind
+# table hook: (ctx, table, ops) -> ops left for the op handlers, sees a table's ops together
+OpHandlerFunc = Callable[..., None]
+TableHookFunc = Callable[..., list]
+
+# Anything registered may be the object itself or a lazy "package.module:attr" reference,
+# imported only when the name is looked up
+Ref = Union[Callable[..., object], str, "EntryPoint"]
+
+# Third-party packages plug in through these entry point groups, keyed by adapter/dialect name
+ADAPTER_ENTRY_POINTS = "schema_agent.adapters"
+PLANNER_ENTRY_POINTS = "schema_agent.planners"
+SQLGEN_ENTRY_POINTS = "schema_agent.sqlgens"
+WRITER_ENTRY_POINTS = "schema_agent.writers"
+
+_discovered: Set[str] = set()
+
+
+def _discover(group: str, table: Dict[str, Ref]) -> None:
+    """Add the group's entry points to table once per process; explicit registrations win."""
+    if group in _discovered:
+        return
+    _discovered.add(group)
+    # importlib.metadata scans installed distributions; only pay for it when discovery is needed
+    from importlib.metadata import entry_points
+
+    for ep in entry_points(group=group):
+        table.setdefault(ep.name, ep)
+
+
+def _resolve(table: Dict[str, Ref], name: str) -> Optional[Callable[..., object]]:
+    ref = table.get(name)
+    if isinstance(ref, str):
+        module, _, attr = ref.partition(":")
+        ref = importlib.import_module(module)
+        for part in attr.split(".") if attr else ():
+            ref = getattr(ref, part)
+    elif ref is not None and not callable(ref):
+        ref = ref.load()  # an entry point
+    if ref is not None:
+        table[name] = ref
+    return ref
 
 
 class AdapterRegistry:
-    _registry: Dict[str, AdapterFactory] = {}
+    _registry: Dict[str, Ref] = {}
 
     @classmethod
-    def register(cls, name: str, factory: AdapterFactory) -> None:
+    def register(cls, name: str, factory: Union[AdapterFactory, str]) -> None:
         cls._registry[name] = factory
 
     @classmethod
     def get(cls, name: str) -> Optional[AdapterFactory]:
-        return cls._registry.get(name)
+        if name not in cls._registry:
+            _discover(ADAPTER_ENTRY_POINTS, cls._registry)
+        return _resolve(cls._registry, name)
 
     @classmethod
-    def names(cls) -> Tuple[str, ...]:
+    def names(cls, discover: bool = True) -> Tuple[str, ...]:
+        if discover:
+            _discover(ADAPTER_ENTRY_POINTS, cls._registry)
         return tuple(sorted(cls._registry.keys()))
 
 
 class DialectRegistry:
-    _planners: Dict[str, PlannerFunc] = {}
-    _sqlgens: Dict[str, SqlGenFunc] = {}
+    _planners: Dict[str, Ref] = {}
+    _sqlgens: Dict[str, Ref] = {}
+    _writers: Dict[str, Ref] = {}
+    _op_handlers: Dict[str, Dict[str, Ref]] = {}
+    _table_hooks: Dict[str, List[Ref]] = {}
 
     @classmethod
-    def register_planner(cls, dialect: str, planner: PlannerFunc) -> None:
+    def register_planner(cls, dialect: str, planner: Union[PlannerFunc, str]) -> None:
         cls._planners[dialect] = planner
 
     @classmethod
-    def register_sqlgen(cls, dialect: str, sqlgen: SqlGenFunc) -> None:
+    def register_sqlgen(cls, dialect: str, sqlgen: Union[SqlGenFunc, str]) -> None:
         cls._sqlgens[dialect] = sqlgen
 
+    @classmethod
+    def register_writer(cls, dialect: str, writer: Union[WriterFunc, str]) -> None:
+        cls._writers[dialect] = writer
+
+    @classmethod
+    def register_op_handler(cls, dialect: str, kind: str, handler: Union[OpHandlerFunc, str]) -> None:
+        # kind: an OpKind or its value, e.g. "alter_nullable"
+        cls._op_handlers.setdefault(dialect, {})[getattr(kind, "value", kind)] = handler
+
+    @classmethod
+    def register_table_hook(cls, dialect: str, hook: Union[TableHookFunc, str]) -> None:
+        cls._table_hooks.setdefault(dialect, []).append(hook)
+
+    @classmethod
+    def get_op_handlers(cls, dialect: str) -> Dict[str, OpHandlerFunc]:
+        table = cls._op_handlers.get(dialect, {})
+        return {kind: _resolve(table, kind) for kind in list(table)}
+
+    @classmethod
+    def get_table_hooks(cls, dialect: str) -> List[TableHookFunc]:
+        hooks = cls._table_hooks.get(dialect, [])
+        for i, ref in enumerate(hooks):
+            hooks[i] = _resolve({"hook": ref}, "hook")
+        return list(hooks)
+
     @classmethod
     def get_planner(cls, dialect: str) -> Optional[PlannerFunc]:
-        return cls._planners.get(dialect)
+        if dialect not in cls._planners:
+            _discover(PLANNER_ENTRY_POINTS, cls._planners)
+        return _resolve(cls._planners, dialect)
 
     @classmethod
     def get_sqlgen(cls, dialect: str) -> Optional[SqlGenFunc]:
-        return cls._sqlgens.get(dialect)
+        if dialect not in cls._sqlgens:
+            _discover(SQLGEN_ENTRY_POINTS, cls._sqlgens)
+        return _resolve(cls._sqlgens, dialect)
+
+    @classmethod
+    def get_writer(cls, dialect: str) -> Optional[WriterFunc]:
+        if dialect not in cls._writers:
+            _discover(WRITER_ENTRY_POINTS, cls._writers)
+        return _resolve(cls._writers, dialect)
 
     @classmethod
-    def supported_dialects(cls) -> Tuple[str, ...]:
+    def supported_dialects(cls, discover: bool = True) -> Tuple[str, ...]:
+        if discover:
+            _discover(PLANNER_ENTRY_POINTS, cls._planners)
+            _discover(SQLGEN_ENTRY_POINTS, cls._sqlgens)
         return tuple(sorted(set(cls._planners.keys()) & set(cls._sqlgens.keys())))
 
 
-# Bootstrap built-ins so existing behavior works out-of-the-box
+# Bootstrap built-ins so existing behavior works out-of-the-box. These are lazy references:
+# nothing below is imported until selected, which keeps CLI startup (e.g. --help) cheap.
 def _bootstrap_defaults() -> None:
-    # Register SQLAlchemy adapter
-    from schema_agent.adapters.sqlalchemy.adapter import SQLAlchemyAdapter
-    AdapterRegistry.register("sqlalchemy", SQLAlchemyAdapter)
-
-    # Register Postgres planner + sqlgen
-    from schema_agent.core.planner.postgres import plan_postgres
-    from schema_agent.core.sqlgen.postgres import generate_postgres_sql
+    AdapterRegistry.register("sqlalchemy", "schema_agent.adapters.sqlalchemy.adapter:SQLAlchemyAdapter")
+    AdapterRegistry.register("sqlalchemy-static", "schema_agent.adapters.sqlalchemy.static:StaticSQLAlchemyAdapter")
+    AdapterRegistry.register("pgdump", "schema_agent.adapters.pgdump.adapter:PgDumpAdapter")
 
-    DialectRegistry.register_planner("postgresql", plan_postgres)
-    DialectRegistry.register_sqlgen("postgresql", generate_postgres_sql)
+    DialectRegistry.register_planner("postgresql", "schema_agent.core.planner.postgres:plan_postgres")
+    DialectRegistry.register_sqlgen("postgresql", "schema_agent.core.sqlgen.postgres:generate_postgres_sql")
+    DialectRegistry.register_writer("postgresql", "schema_agent.core.sqlgen.postgres:write_postgres_sql")
 
 
 _bootstrap_defaults()
-
-
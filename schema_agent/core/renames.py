@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import hashlib
+import random
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from schema_agent.core.ir import IR, Column, Table
+
+# Scores are integers so that ties, and therefore the chosen assignment, are exact and repeatable
+_NAME_WEIGHT = 600
+_NULLABLE_WEIGHT = 100
+_DEFAULT_WEIGHT = 100
+_TYPE_WEIGHT = 100
+_POSITION_WEIGHT = 100
+_MAX_SCORE = _NAME_WEIGHT + _NULLABLE_WEIGHT + _DEFAULT_WEIGHT + _TYPE_WEIGHT + _POSITION_WEIGHT
+# Below this name similarity a pair is never inferred as a rename, however well the rest matches:
+# is_deleted -> is_admin (0.3) stays a drop + add, last_name -> surname (0.44) is a rename
+COLUMN_RENAME_MIN_NAME_SIMILARITY = 0.4
+
+_INT_TYPES = {"int", "integer", "bigint", "smallint"}
+
+
+def type_family(data_type: str) -> str:
+    """Bucket key for rename candidates: two types are rename-compatible iff their families match."""
+    base = data_type.split("(")[0].strip().lower()
+    return "integer" if base in _INT_TYPES else base
+
+
+def _bigrams(name: str) -> frozenset:
+    padded = f"^{name.lower()}$"
+    return frozenset(padded[i : i + 2] for i in range(len(padded) - 1))
+
+
+def _name_similarity(a: frozenset, b: frozenset) -> float:
+    # Dice coefficient over character bigrams: cheap enough for wide tables, robust to
+    # prefix/suffix edits such as total_price -> price_total or amount -> amount_cents
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _score(
+    bcol: Column, hcol: Column, bgrams: frozenset, hgrams: frozenset, bpos: float, hpos: float
+) -> int:
+    score = int(_NAME_WEIGHT * _name_similarity(bgrams, hgrams))
+    if bool(bcol.nullable) == bool(hcol.nullable):
+        score += _NULLABLE_WEIGHT
+    if (bcol.default or None) == (hcol.default or None):
+        score += _DEFAULT_WEIGHT
+    if bcol.data_type == hcol.data_type:
+        score += _TYPE_WEIGHT
+    score += int(_POSITION_WEIGHT * (1 - abs(bpos - hpos)))
+    return score
+
+
+def assign(cost: Sequence[Sequence[int]]) -> List[Tuple[int, int]]:
+    """Minimum-cost assignment (Hungarian algorithm with potentials), O(n^2 m) for n <= m.
+
+    Returns (row, col) pairs; with more rows than columns only len(columns) rows are matched.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    if not n or not m:
+        return []
+    if n > m:
+        return sorted((r, c) for c, r in assign([list(col) for col in zip(*cost)]))
+
+    inf = float("inf")
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)  # p[j]: row matched to column j (1-based), 0 if free
+    way = [0] * (m + 1)
+    cols = range(1, m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in cols:
+                if used[j]:
+                    continue
+                cur = row[j - 1] - ui0 - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return sorted((p[j] - 1, j - 1) for j in cols if p[j])
+
+
+def match_column_renames(
+    base: Table,
+    head: Table,
+    removed: Sequence[str],
+    added: Sequence[str],
+    hint_map: Optional[Dict[str, str]] = None,
+    min_name_similarity: float = COLUMN_RENAME_MIN_NAME_SIMILARITY,
+) -> List[Tuple[str, str]]:
+    """Pair dropped base columns with added head columns.
+
+    Hinted pairs are taken as-is. The rest are bucketed by type family and, per bucket, matched
+    by an optimal assignment over pair scores (name similarity, nullability, default, exact type
+    and relative position), so the result does not depend on set iteration order. Pairs whose
+    names are less similar than min_name_similarity are never matched.
+    """
+    hint_map = hint_map or {}
+    added_set = set(added)
+    renames: List[Tuple[str, str]] = []
+    for rc in sorted(removed):
+        target = hint_map.get(rc)
+        if target and target in added_set:
+            renames.append((rc, target))
+            added_set.discard(target)
+    hinted = {rc for rc, _ in renames}
+
+    buckets: Dict[str, Tuple[List[str], List[str]]] = {}
+    for rc in sorted(removed):
+        if rc not in hinted:
+            buckets.setdefault(type_family(base.columns[rc].data_type), ([], []))[0].append(rc)
+    for ac in sorted(added_set):
+        bucket = buckets.get(type_family(head.columns[ac].data_type))
+        if bucket is not None:
+            bucket[1].append(ac)
+
+    base_pos = {name: i / max(len(base.columns) - 1, 1) for i, name in enumerate(base.columns)}
+    head_pos = {name: i / max(len(head.columns) - 1, 1) for i, name in enumerate(head.columns)}
+    for family in sorted(buckets):
+        rows, cols = buckets[family]
+        if not rows or not cols:
+            continue
+        col_grams = [_bigrams(ac) for ac in cols]
+        # costs above any real pair's, so the assignment first pairs as many acceptable columns
+        # as it can; rejected pairs it still had to make are dropped afterwards
+        rejected = _MAX_SCORE * len(rows) + 1
+        cost = []
+        for rc in rows:
+            bcol, bgrams, bpos = base.columns[rc], _bigrams(rc), base_pos[rc]
+            cost.append(
+                [
+                    _MAX_SCORE - _score(bcol, head.columns[ac], bgrams, hgrams, bpos, head_pos[ac])
+                    if _name_similarity(bgrams, hgrams) >= min_name_similarity
+                    else rejected
+                    for ac, hgrams in zip(cols, col_grams)
+                ]
+            )
+        renames.extend((rows[r], cols[c]) for r, c in assign(cost) if cost[r][c] != rejected)
+    return renames
+
+
+# Table renames: each table is reduced to a MinHash signature over its structural features, and
+# signatures are banded into an LSH index, so candidate pairs come from shared buckets rather
+# than from comparing every dropped table with every created one.
+_MINHASH_BANDS = 8
+_MINHASH_ROWS = 4  # 8 bands x 4 rows: pairs with Jaccard >= ~0.6 almost always share a bucket
+_MINHASH_MASKS = tuple(random.Random(0x5A17).getrandbits(64) for _ in range(_MINHASH_BANDS * _MINHASH_ROWS))
+TABLE_RENAME_MIN_SIMILARITY = 0.7
+
+
+def _table_features(table: Table) -> FrozenSet[str]:
+    features = {f"c:{name}:{type_family(col.data_type)}" for name, col in table.columns.items()}
+    if table.primary_key:
+        features.add("pk:" + ",".join(table.primary_key))
+    features.update("u:" + ",".join(sorted(u)) for u in table.uniques)
+    features.update(f"i:{int(idx.unique)}:" + ",".join(idx.columns) for idx in table.indexes.values())
+    features.update(f"f:{','.join(fk.columns)}>{fk.ref_table}" for fk in table.fks.values())
+    features.update(f"k:{expr}" for expr in table.checks.values())
+    return frozenset(features)
+
+
+def _feature_hash(feature: str, cache: Dict[str, int]) -> int:
+    # blake2b rather than hash(): str hashes are salted per process, and signatures must be repeatable
+    h = cache.get(feature)
+    if h is None:
+        h = cache[feature] = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return h
+
+
+def _signature_bands(features: FrozenSet[str], cache: Dict[str, int]) -> List[Tuple[int, ...]]:
+    hashes = [_feature_hash(f, cache) for f in features] or [0]
+    sig = [min(h ^ mask for h in hashes) for mask in _MINHASH_MASKS]
+    return [(band, *sig[band * _MINHASH_ROWS : (band + 1) * _MINHASH_ROWS]) for band in range(_MINHASH_BANDS)]
+
+
+def _short_name(key: str) -> str:
+    return key.rpartition(".")[2]
+
+
+def match_table_renames(
+    base: IR,
+    head: IR,
+    dropped: Sequence[str],
+    created: Sequence[str],
+    hint_map: Optional[Dict[str, str]] = None,
+    min_similarity: float = TABLE_RENAME_MIN_SIMILARITY,
+) -> List[Tuple[str, str]]:
+    """Pair dropped base tables with created head tables (keys of base.tables/head.tables).
+
+    Hinted pairs are taken as-is. Other pairs must share an LSH bucket and have a feature
+    Jaccard similarity of at least min_similarity; they are then taken best-first, with the
+    similarity of the unqualified names breaking ties.
+    """
+    hint_map = hint_map or {}
+    created_set = set(created)
+    renames: List[Tuple[str, str]] = []
+    for old in sorted(dropped):
+        new = hint_map.get(old)
+        if new and new in created_set:
+            renames.append((old, new))
+            created_set.discard(new)
+    hinted = {old for old, _ in renames}
+    dropped_left = [t for t in sorted(dropped) if t not in hinted]
+    if not dropped_left or not created_set:
+        return renames
+
+    cache: Dict[str, int] = {}
+    index: Dict[Tuple[int, ...], List[str]] = {}
+    base_features = {}
+    for old in dropped_left:
+        base_features[old] = feats = _table_features(base.tables[old])
+        for band in _signature_bands(feats, cache):
+            index.setdefault(band, []).append(old)
+
+    candidates: Dict[Tuple[str, str], Tuple[float, float]] = {}
+    for new in sorted(created_set):
+        feats = _table_features(head.tables[new])
+        seen: Set[str] = set()
+        for band in _signature_bands(feats, cache):
+            for old in index.get(band, ()):
+                if old in seen:
+                    continue
+                seen.add(old)
+                other = base_features[old]
+                similarity = len(feats & other) / (len(feats | other) or 1)
+                if similarity >= min_similarity:
+                    names = _name_similarity(_bigrams(_short_name(old)), _bigrams(_short_name(new)))
+                    candidates[(old, new)] = (similarity, names)
+
+    taken_old: Set[str] = set()
+    taken_new: Set[str] = set()
+    for (old, new), _ in sorted(candidates.items(), key=lambda kv: (-kv[1][0], -kv[1][1], kv[0])):
+        if old in taken_old or new in taken_new:
+            continue
+        taken_old.add(old)
+        taken_new.add(new)
+        renames.append((old, new))
+    return renames
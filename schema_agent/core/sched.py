@@ -1,37 +1,58 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
-from typing import Dict, List
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Union
 
-from schema_agent.core.planner.postgres import Step
+from schema_agent.core.diff import Op
+from schema_agent.core.steps import Step, StepGraph
+from schema_agent.policy.hints import compile_policy
 
+_STEP_ID = re.compile(r"s(\d+)")
 
-def schedule_steps(steps: List[Step]) -> List[Step]:
-    # simple topological sort by depends_on
-    id_to_step: Dict[str, Step] = {s.id: s for s in steps}
-    graph: Dict[str, List[str]] = defaultdict(list)
-    indeg: Dict[str, int] = {s.id: 0 for s in steps}
 
-    for s in steps:
-        for d in s.depends_on:
-            graph[d].append(s.id)
-            indeg[s.id] += 1
+def schedule_steps(steps: Union[List[Step], StepGraph]) -> List[Step]:
+    # topological sort by depends_on, O(steps + dependencies)
+    graph = steps if isinstance(steps, StepGraph) else StepGraph(steps)
+    dependents = graph.dependents()
+    indeg: Dict[str, int] = {s.id: len(s.depends_on) for s in graph}
 
     q = deque([sid for sid, deg in indeg.items() if deg == 0])
     ordered: List[Step] = []
     while q:
         sid = q.popleft()
-        ordered.append(id_to_step[sid])
-        for nxt in graph.get(sid, []):
+        ordered.append(graph[sid])
+        for nxt in dependents.get(sid, []):
             indeg[nxt] -= 1
             if indeg[nxt] == 0:
                 q.append(nxt)
 
     # if cycles, fallback to original order
-    if len(ordered) != len(steps):
-        return steps
+    if len(ordered) != len(graph):
+        return graph.steps()
 
     # Preserve topological order strictly to honor dependencies
     return ordered
 
 
+def plan_stream(planner, base_ir, head_ir, op_groups: Iterable[List[Op]], hints: Dict) -> Iterator[List[Step]]:
+    """Plan and schedule one group of ops (one table's worth, as yielded by iter_diff_ir) at a time.
+
+    Planner dependencies never cross tables, so each group is its own scheduling window. Step ids
+    keep the planner's numbering, offset by the ids the earlier groups allocated (including those
+    of steps merged away), so they match those of a single planner call over all ops.
+    """
+    hints = compile_policy(hints)
+    offset = 0
+    for ops in op_groups:
+        steps = planner(base_ir, head_ir, ops, hints)
+        ids: Dict[str, str] = {}
+        for n, s in enumerate(steps, 1):
+            m = _STEP_ID.fullmatch(s.id)
+            # ids not numbered like the built-in planner's are numbered densely
+            ids[s.id] = f"s{offset + (int(m.group(1)) if m else n)}"
+        for s in steps:
+            s.id = ids[s.id]
+            s.depends_on = [ids.get(d, d) for d in s.depends_on]
+        offset += getattr(steps, "allocated_ids", len(steps))
+        yield schedule_steps(steps)
@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from schema_agent.core.ir import IR, Column, ForeignKey, Index, Table
+
+# Binary IR snapshot, little-endian:
+#
+#   header      MAGIC, version, string/table counts and section offsets
+#   strings     (n_strings + 1) u64 offsets into the blob, then the UTF-8 blob
+#   tables      n_tables x (key id, record offset, record length), sorted by table key
+#   meta        dialect, version, enums and extensions
+#   records     one per table: fixed-layout header, columns, keys, checks, indexes and fks
+#
+# Every string is stored once and referenced by its u32 id; NONE_ID stands for None.
+
+MAGIC = b"SAIRSNAP"
+FORMAT_VERSION = 3
+NONE_ID = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<8sHHIIQQQQ")
+_TABLE_ENTRY = struct.Struct("<IQI")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_TABLE = struct.Struct("<IIIIIIIII")  # name partitioning comment + counts: columns pk uniques checks indexes fks
+_COLUMN = struct.Struct("<IIBIIII")  # name data_type nullable default generated collation comment
+_INDEX = struct.Struct("<IBIIII")  # name unique method where n_columns n_include
+_FK = struct.Struct("<IIIIBBII")  # name ref_table on_delete on_update deferrable initially n_cols n_ref_cols
+_META = struct.Struct("<IIII")  # dialect version n_enums n_extensions
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def is_snapshot(path: str) -> bool:
+    with open(path, "rb") as fh:
+        return fh.read(len(MAGIC)) == MAGIC
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def id(self, value: Optional[str]) -> int:
+        if value is None:
+            return NONE_ID
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return sid
+
+
+def dump_snapshot(ir: IR) -> bytes:
+    strings = _StringTable()
+    sid = strings.id
+    u32s = lambda values: b"".join(_U32.pack(sid(v)) for v in values)  # noqa: E731
+
+    records: List[Tuple[str, bytes]] = []
+    for key, table in ir.tables.items():
+        parts = [
+            _TABLE.pack(
+                sid(table.name),
+                sid(table.partitioning),
+                sid(table.comment),
+                len(table.columns),
+                len(table.primary_key),
+                len(table.uniques),
+                len(table.checks),
+                len(table.indexes),
+                len(table.fks),
+            )
+        ]
+        for col in table.columns.values():
+            parts.append(
+                _COLUMN.pack(
+                    sid(col.name),
+                    sid(col.data_type),
+                    1 if col.nullable else 0,
+                    sid(col.default),
+                    sid(col.generated),
+                    sid(col.collation),
+                    sid(col.comment),
+                )
+            )
+        parts.append(u32s(table.primary_key))
+        for unique in table.uniques:
+            parts.append(_U32.pack(len(unique)) + u32s(unique))
+        for name, expr in table.checks.items():
+            parts.append(_U32.pack(sid(name)) + _U32.pack(sid(expr)))
+        for key_name, idx in table.indexes.items():
+            parts.append(
+                _U32.pack(sid(key_name))
+                + _INDEX.pack(
+                    sid(idx.name), 1 if idx.unique else 0, sid(idx.method), sid(idx.where), len(idx.columns), len(idx.include)
+                )
+                + u32s(idx.columns)
+                + u32s(idx.include)
+            )
+        for key_name, fk in table.fks.items():
+            parts.append(
+                _U32.pack(sid(key_name))
+                + _FK.pack(
+                    sid(fk.name),
+                    sid(fk.ref_table),
+                    sid(fk.on_delete),
+                    sid(fk.on_update),
+                    1 if fk.deferrable else 0,
+                    1 if fk.initially_deferred else 0,
+                    len(fk.columns),
+                    len(fk.ref_columns),
+                )
+                + u32s(fk.columns)
+                + u32s(fk.ref_columns)
+            )
+        records.append((key, b"".join(parts)))
+
+    meta = [_META.pack(sid(ir.dialect), sid(ir.version), len(ir.enums), len(ir.extensions))]
+    for name, labels in ir.enums.items():
+        meta.append(_U32.pack(sid(name)) + _U32.pack(len(labels)) + u32s(labels))
+    meta.append(u32s(ir.extensions))
+    meta_bytes = b"".join(meta)
+
+    keys = [sid(key) for key, _ in records]
+
+    blob_parts: List[bytes] = []
+    offsets = [0]
+    for value in strings.values:
+        data = value.encode("utf-8")
+        blob_parts.append(data)
+        offsets.append(offsets[-1] + len(data))
+    string_section = b"".join(_U64.pack(o) for o in offsets) + b"".join(blob_parts)
+
+    strings_off = _HEADER.size
+    tables_off = strings_off + len(string_section)
+    meta_off = tables_off + _TABLE_ENTRY.size * len(records)
+    records_off = meta_off + len(meta_bytes)
+
+    # records keep the IR's table order; the index is sorted by key for binary search
+    entries: List[Tuple[str, int, int, int]] = []
+    pos = records_off
+    for key_id, (key, record) in zip(keys, records):
+        entries.append((key, key_id, pos, len(record)))
+        pos += len(record)
+    entries.sort()
+    index_parts = [_TABLE_ENTRY.pack(key_id, offset, length) for _, key_id, offset, length in entries]
+
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, len(strings.values), len(records), strings_off, tables_off, meta_off, records_off
+    )
+    return b"".join([header, string_section, *index_parts, meta_bytes, *(record for _, record in records)])
+
+
+def write_snapshot(ir: IR, path: str) -> None:
+    data = dump_snapshot(ir)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class SnapshotReader:
+    """Memory-mapped snapshot; tables are decoded individually, on demand."""
+
+    def __init__(self, path: str) -> None:
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:  # empty file
+            self._fh.close()
+            raise SnapshotError(f"{path} is not an IR snapshot") from e
+        try:
+            self._parse_header(path)
+        except SnapshotError:
+            self.close()
+            raise
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SnapshotReader":
+        """Read a snapshot held in memory, e.g. one shipped to a worker process."""
+        reader = cls.__new__(cls)
+        reader._fh = None
+        reader._mm = data
+        reader._parse_header("<bytes>")
+        return reader
+
+    def _parse_header(self, path: str) -> None:
+        if len(self._mm) < _HEADER.size:
+            raise SnapshotError(f"{path} is not an IR snapshot")
+        magic, version, _, n_strings, n_tables, strings_off, tables_off, meta_off, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not an IR snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"{path} has snapshot format {version}, expected {FORMAT_VERSION}")
+        self._n_strings = n_strings
+        self._n_tables = n_tables
+        self._strings_off = strings_off
+        self._blob_off = strings_off + _U64.size * (n_strings + 1)
+        self._tables_off = tables_off
+        self._meta_off = meta_off
+        self._strings: Dict[int, str] = {}
+        self._keys: Optional[List[str]] = None
+
+    def close(self) -> None:
+        if self._fh is None:
+            return
+        mm = getattr(self, "_mm", None)
+        if mm is not None:
+            mm.close()
+            self._mm = None
+        self._fh.close()
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _str(self, sid: int) -> Optional[str]:
+        if sid == NONE_ID:
+            return None
+        value = self._strings.get(sid)
+        if value is None:
+            start, end = struct.unpack_from("<QQ", self._mm, self._strings_off + _U64.size * sid)
+            value = self._strings[sid] = bytes(self._mm[self._blob_off + start:self._blob_off + end]).decode("utf-8")
+        return value
+
+    def _entry(self, i: int) -> Tuple[int, int, int]:
+        return _TABLE_ENTRY.unpack_from(self._mm, self._tables_off + _TABLE_ENTRY.size * i)
+
+    def table_names(self) -> List[str]:
+        if self._keys is None:
+            self._keys = [self._str(self._entry(i)[0]) for i in range(self._n_tables)]
+        return list(self._keys)
+
+    def __len__(self) -> int:
+        return self._n_tables
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def _find(self, key: str) -> Optional[int]:
+        # entries are sorted by key: binary search, decoding only the names probed
+        lo, hi = 0, self._n_tables
+        while lo < hi:
+            mid = (lo + hi) // 2
+            name = self._str(self._entry(mid)[0])
+            if name < key:
+                lo = mid + 1
+            elif name > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def table(self, key: str) -> Optional[Table]:
+        i = self._find(key)
+        if i is None:
+            return None
+        _, offset, _ = self._entry(i)
+        return self._read_table(offset)
+
+    def tables(self) -> Iterator[Tuple[str, Table]]:
+        # in file order, which is the order of the original IR
+        for key_id, offset, _ in sorted((self._entry(i) for i in range(self._n_tables)), key=lambda e: e[1]):
+            yield self._str(key_id), self._read_table(offset)
+
+    def _ids(self, pos: int, n: int) -> Tuple[List[str], int]:
+        ids = struct.unpack_from(f"<{n}I", self._mm, pos)
+        return [self._str(s) for s in ids], pos + 4 * n
+
+    def _read_table(self, pos: int) -> Table:
+        mm, s = self._mm, self._str
+        name, partitioning, comment, n_cols, n_pk, n_uniques, n_checks, n_indexes, n_fks = _TABLE.unpack_from(mm, pos)
+        pos += _TABLE.size
+        columns: Dict[str, Column] = {}
+        for _ in range(n_cols):
+            cname, dtype, nullable, default, generated, collation, ccomment = _COLUMN.unpack_from(mm, pos)
+            pos += _COLUMN.size
+            col = Column(
+                name=s(cname),
+                data_type=s(dtype),
+                nullable=bool(nullable),
+                default=s(default),
+                generated=s(generated),
+                collation=s(collation),
+                comment=s(ccomment),
+            )
+            columns[col.name] = col
+        primary_key, pos = self._ids(pos, n_pk)
+        uniques: List[List[str]] = []
+        for _ in range(n_uniques):
+            (n,) = _U32.unpack_from(mm, pos)
+            cols, pos = self._ids(pos + 4, n)
+            uniques.append(cols)
+        checks: Dict[str, str] = {}
+        for _ in range(n_checks):
+            k, v = struct.unpack_from("<II", mm, pos)
+            pos += 8
+            checks[s(k)] = s(v)
+        indexes: Dict[str, Index] = {}
+        for _ in range(n_indexes):
+            (key,) = _U32.unpack_from(mm, pos)
+            iname, unique, method, where, n_icols, n_include = _INDEX.unpack_from(mm, pos + 4)
+            pos += 4 + _INDEX.size
+            icols, pos = self._ids(pos, n_icols)
+            include, pos = self._ids(pos, n_include)
+            indexes[s(key)] = Index(
+                name=s(iname),
+                columns=icols,
+                unique=bool(unique),
+                method=s(method),
+                include=include,
+                where=s(where),
+            )
+        fks: Dict[str, ForeignKey] = {}
+        for _ in range(n_fks):
+            (key,) = _U32.unpack_from(mm, pos)
+            fname, ref_table, on_delete, on_update, deferrable, initially, n_fcols, n_rcols = _FK.unpack_from(mm, pos + 4)
+            pos += 4 + _FK.size
+            fcols, pos = self._ids(pos, n_fcols)
+            rcols, pos = self._ids(pos, n_rcols)
+            fks[s(key)] = ForeignKey(
+                name=s(fname),
+                columns=fcols,
+                ref_table=s(ref_table),
+                ref_columns=rcols,
+                on_delete=s(on_delete),
+                on_update=s(on_update),
+                deferrable=bool(deferrable),
+                initially_deferred=bool(initially),
+            )
+        return Table(
+            name=s(name),
+            columns=columns,
+            primary_key=primary_key,
+            uniques=uniques,
+            checks=checks,
+            indexes=indexes,
+            fks=fks,
+            partitioning=s(partitioning),
+            comment=s(comment),
+        )
+
+    def load(self) -> IR:
+        mm, s = self._mm, self._str
+        dialect, version, n_enums, n_ext = _META.unpack_from(mm, self._meta_off)
+        pos = self._meta_off + _META.size
+        enums: Dict[str, List[str]] = {}
+        for _ in range(n_enums):
+            name, n = struct.unpack_from("<II", mm, pos)
+            enums[s(name)], pos = self._ids(pos + 8, n)
+        extensions, _ = self._ids(pos, n_ext)
+        return IR(dialect=s(dialect), version=s(version), tables=dict(self.tables()), enums=enums, extensions=extensions)
+
+
+def read_snapshot(path: str) -> IR:
+    with SnapshotReader(path) as reader:
+        return reader.load()
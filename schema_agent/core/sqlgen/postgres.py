@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import os
+import shutil
+import tempfile
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, IO, Iterable, List, Optional, Tuple
 
-from schema_agent.core.planner.postgres import Step
+from schema_agent.core.steps import Step
+from schema_agent.policy.hints import CompiledPolicy, compile_policy
+
+_BANNER = "-- NOTE: This migration must run OUTSIDE a transaction due to {reasons}.\n\n"
+_NO_CHANGES = "-- no schema changes detected\n"
 
 
 def generate_postgres_sql(steps: List[Step], hints: Dict | None = None) -> Tuple[str, str, Dict]:
@@ -17,63 +24,167 @@ def generate_postgres_sql(steps: List[Step], hints: Dict | None = None) -> Tuple
 
     # Summary info
     summary: Dict = {"tables": {}, "unsafe": False}
+    policy = compile_policy(hints)
 
     for table, tsteps in table_to_steps.items():
-        forward_lines.append(f"-- ==== Table: {table} ====")
-        for s in tsteps:
-            if s.destructive:
-                forward_lines.append("-- DESTRUCTIVE (commented out by default):")
-                for line in s.sql.splitlines():
-                    forward_lines.append(f"-- {line}")
-            else:
-                forward_lines.append(s.sql)
-
-        # rollback: reverse order for table-specific steps
-        rollback_lines.append(f"-- ==== Table: {table} (rollback) ====")
-        for s in reversed(tsteps):
-            if s.reverse_sql:
-                rollback_lines.append(s.reverse_sql)
-            else:
-                if s.reversible:
-                    rollback_lines.append(f"-- rollback for step {s.id} may be lossy")
-                rollback_lines.append(f"-- forward: {s.sql}")
-
-        # Build summary table stats
-        phase_counts = [0, 0, 0, 0, 0]
-        idx = {"prep": 0, "backfill": 1, "tighten": 2, "indexes": 3, "finalize": 4}
-        risks: List[str] = []
-        ops_here = []
-        for s in tsteps:
-            phase_counts[idx[s.phase]] += 1
-            # risk flags heuristics
-            if "NOT VALID" in s.sql:
-                risks.append("fk_validate")
-            if "CREATE" in s.sql and "INDEX CONCURRENTLY" in s.sql:
-                risks.append("concurrent_index")
-            if "SET NOT NULL" in s.sql:
-                risks.append("not_null_tighten")
-            if "USING" in s.sql and "ALTER COLUMN" in s.sql and "TYPE" in s.sql:
-                risks.append("rewrite_likely")
-            if s.destructive:
-                risks.append("destructive_present")
-                summary["unsafe"] = True
-            ops_here.append(s.phase)
-
-        summary["tables"][table] = {
-            "ops": sorted(set(ops_here)),
-            "risks": sorted(set(risks)),
-            "phase_counts": phase_counts,
-        }
+        forward, rollback, table_summary, unsafe = _render_table(table, tsteps)
+        _add_strategy(table_summary, policy, table)
+        forward_lines.extend(forward)
+        rollback_lines.extend(rollback)
+        summary["tables"][table] = table_summary
+        summary["unsafe"] = summary["unsafe"] or unsafe
 
     forward_sql = "\n".join(forward_lines) + "\n"
     rollback_sql = "\n".join(rollback_lines) + "\n"
 
-    # Add non-transactional banner if requested and concurrent indexes are present
-    add_banner = bool((hints or {}).get("planner", {}).get("add_banner_for_non_txn", False))
-    if add_banner and "INDEX CONCURRENTLY" in forward_sql:
-        banner = "-- NOTE: This migration must run OUTSIDE a transaction due to CONCURRENTLY.\n\n"
-        forward_sql = banner + forward_sql
+    # Non-transactional banner: for concurrent indexes if requested, always for committing backfills
+    forward_sql = _banner(hints, "INDEX CONCURRENTLY" in forward_sql, any(_commits(s) for s in steps)) + forward_sql
 
     return forward_sql, rollback_sql, summary
 
 
+def write_postgres_sql(
+    step_groups: Iterable[List[Step]],
+    forward_path: Optional[str],
+    rollback_path: Optional[str],
+    hints: Dict | None = None,
+) -> Dict:
+    """Streaming counterpart of generate_postgres_sql: render each group of steps (one table's
+    worth) as it arrives and append it to the output files, which end up byte-identical to the
+    batch output. A table must not span groups. With no paths, only the summary is built."""
+    summary: Dict = {"tables": {}, "unsafe": False}
+    policy = compile_policy(hints)
+    concurrent = commits = False
+    n_steps = 0
+    with _open_sql(forward_path) as fwd, _open_sql(rollback_path) as rbk:
+        for group in step_groups:
+            table_to_steps: Dict[str, List[Step]] = defaultdict(list)
+            for s in group:
+                table_to_steps[s.table or "__global__"].append(s)
+            n_steps += len(group)
+            for table, tsteps in table_to_steps.items():
+                forward, rollback, table_summary, unsafe = _render_table(table, tsteps)
+                _add_strategy(table_summary, policy, table)
+                concurrent = concurrent or any("INDEX CONCURRENTLY" in line for line in forward)
+                commits = commits or any(_commits(s) for s in tsteps)
+                if fwd is not None:
+                    fwd.write("\n".join(forward) + "\n")
+                if rbk is not None:
+                    rbk.write("\n".join(rollback) + "\n")
+                summary["tables"][table] = table_summary
+                summary["unsafe"] = summary["unsafe"] or unsafe
+        if n_steps == 0:
+            for fh in (fwd, rbk):
+                if fh is not None:
+                    fh.seek(0)
+                    fh.truncate()
+                    fh.write(_NO_CHANGES)
+    banner = _banner(hints, concurrent, commits)
+    if forward_path and n_steps and banner:
+        _prepend(forward_path, banner)
+    return summary
+
+
+class _open_sql:
+    """Buffered text writer for an output file, or a no-op context when path is None."""
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self.fh: Optional[IO[str]] = None
+
+    def __enter__(self) -> Optional[IO[str]]:
+        if self.path:
+            self.fh = open(self.path, "w", encoding="utf-8", buffering=1 << 20)
+        return self.fh
+
+    def __exit__(self, *exc) -> None:
+        if self.fh is not None:
+            self.fh.close()
+
+
+def _prepend(path: str, text: str) -> None:
+    # The banner depends on the whole file, so it is added afterwards by copying through a temp file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out, open(path, encoding="utf-8") as src:
+            out.write(text)
+            shutil.copyfileobj(src, out, 1 << 20)
+        os.replace(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+def _banner(hints: Dict | None, concurrent: bool, commits: bool) -> str:
+    reasons = []
+    if concurrent and compile_policy(hints).planner.add_banner_for_non_txn:
+        reasons.append("CONCURRENTLY")
+    if commits:
+        # COMMIT inside a DO block fails in a transaction block, e.g. under psql --single-transaction
+        reasons.append("batched backfills that COMMIT inside DO blocks")
+    return _BANNER.format(reasons=" and ".join(reasons)) if reasons else ""
+
+
+def _commits(step: Step) -> bool:
+    return not step.destructive and "DO $$" in step.sql and "COMMIT;" in step.sql
+
+
+def _add_strategy(table_summary: Dict, policy: CompiledPolicy, table: str) -> None:
+    # only reported when table statistics drive the choice
+    if policy.table_stats is not None and table != "__global__":
+        strategy = policy.strategy(table)
+        table_summary["strategy"] = {"name": strategy.name, "reason": strategy.reason}
+
+
+def _render_table(table: str, tsteps: List[Step]) -> Tuple[List[str], List[str], Dict, bool]:
+    forward_lines: List[str] = [f"-- ==== Table: {table} ===="]
+    for s in tsteps:
+        if s.destructive:
+            forward_lines.append("-- DESTRUCTIVE (commented out by default):")
+            for line in s.sql.splitlines():
+                forward_lines.append(f"-- {line}")
+        else:
+            forward_lines.append(s.sql)
+
+    # rollback: reverse order for table-specific steps
+    rollback_lines: List[str] = [f"-- ==== Table: {table} (rollback) ===="]
+    for s in reversed(tsteps):
+        if s.reverse_sql:
+            rollback_lines.append(s.reverse_sql)
+        else:
+            if s.reversible:
+                rollback_lines.append(f"-- rollback for step {s.id} may be lossy")
+            first, *rest = s.sql.splitlines() or [""]
+            rollback_lines.append(f"-- forward: {first}")
+            rollback_lines.extend(f"-- {line}" for line in rest)
+
+    # Build summary table stats
+    phase_counts = [0, 0, 0, 0, 0]
+    idx = {"prep": 0, "backfill": 1, "tighten": 2, "indexes": 3, "finalize": 4}
+    risks: List[str] = []
+    ops_here = []
+    unsafe = False
+    for s in tsteps:
+        phase_counts[idx[s.phase]] += 1
+        # risk flags heuristics
+        if "NOT VALID" in s.sql:
+            risks.append("fk_validate")
+        if "CREATE" in s.sql and "INDEX CONCURRENTLY" in s.sql:
+            risks.append("concurrent_index")
+        if "SET NOT NULL" in s.sql:
+            risks.append("not_null_tighten")
+        if "USING" in s.sql and "ALTER COLUMN" in s.sql and "TYPE" in s.sql:
+            risks.append("rewrite_likely")
+        if "CREATE TRIGGER" in s.sql:
+            risks.append("sync_trigger")
+        if s.destructive:
+            risks.append("destructive_present")
+            unsafe = True
+        ops_here.append(s.phase)
+
+    table_summary = {
+        "ops": sorted(set(ops_here)),
+        "risks": sorted(set(risks)),
+        "phase_counts": phase_counts,
+    }
+    return forward_lines, rollback_lines, table_summary, unsafe
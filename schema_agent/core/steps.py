@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Literal, Optional, Set
+
+from pydantic import BaseModel, Field
+
+
+class Step(BaseModel):
+    id: str
+    table: Optional[str]
+    sql: str
+    phase: Literal["prep", "backfill", "tighten", "indexes", "finalize"]
+    reversible: bool = True
+    depends_on: List[str] = Field(default_factory=list)
+    destructive: bool = False
+    reverse_sql: Optional[str] = None
+
+
+class PlannedSteps(List[Step]):
+    """A planner's steps, plus how many step ids it allocated: merged steps leave gaps in the ids,
+    and plan_stream needs the count to number the next table's steps as one planner call would."""
+
+    __slots__ = ("allocated_ids",)
+
+    def __init__(self, steps: Iterable[Step] = (), allocated_ids: Optional[int] = None):
+        super().__init__(steps)
+        self.allocated_ids = len(self) if allocated_ids is None else allocated_ids
+
+
+class StepGraph:
+    """Steps in insertion order, indexed by id and by table.
+
+    Dependencies live on the steps themselves (Step.depends_on); add_dependency keeps a set per
+    step so adding an edge is O(1). The planner also records which steps backfill or set NOT
+    NULL on a table, so cross-step wiring only looks at that table's steps.
+    """
+
+    __slots__ = ("_steps", "_by_id", "_by_table", "_deps", "_backfills", "_not_nulls")
+
+    def __init__(self, steps: Iterable[Step] = ()):
+        self._steps: List[Step] = []
+        self._by_id: Dict[str, Step] = {}
+        self._by_table: Dict[Optional[str], List[Step]] = defaultdict(list)
+        self._deps: Dict[str, Set[str]] = {}
+        self._backfills: Dict[str, List[str]] = defaultdict(list)
+        self._not_nulls: Dict[str, List[str]] = defaultdict(list)
+        for step in steps:
+            self.add(step)
+
+    def add(self, step: Step) -> Step:
+        if step.id in self._by_id:
+            raise ValueError(f"duplicate step id {step.id!r}")
+        self._steps.append(step)
+        self._by_id[step.id] = step
+        self._by_table[step.table].append(step)
+        self._deps[step.id] = set(step.depends_on)
+        return step
+
+    def __getitem__(self, step_id: str) -> Step:
+        return self._by_id[step_id]
+
+    def __contains__(self, step_id: object) -> bool:
+        return step_id in self._by_id
+
+    def __iter__(self) -> Iterator[Step]:
+        return iter(self._steps)
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+    def steps(self) -> List[Step]:
+        return list(self._steps)
+
+    def table_steps(self, table: Optional[str]) -> List[Step]:
+        return list(self._by_table.get(table, ()))
+
+    def add_dependency(self, step_id: str, dep_id: str) -> None:
+        deps = self._deps[step_id]
+        if dep_id not in deps:
+            deps.add(dep_id)
+            self._by_id[step_id].depends_on.append(dep_id)
+
+    def mark_backfill(self, table: str, step_id: str) -> None:
+        self._backfills[table].append(step_id)
+
+    def mark_not_null(self, table: str, step_id: str) -> None:
+        self._not_nulls[table].append(step_id)
+
+    def backfills(self, table: Optional[str]) -> List[str]:
+        return self._backfills.get(table, []) if table else []
+
+    def not_nulls(self, table: Optional[str]) -> List[str]:
+        return self._not_nulls.get(table, []) if table else []
+
+    def dependents(self) -> Dict[str, List[str]]:
+        """step id -> ids of the steps depending on it, in step order."""
+        out: Dict[str, List[str]] = defaultdict(list)
+        for s in self._steps:
+            for d in s.depends_on:
+                out[d].append(s.id)
+        return out
+
+    def levels(self) -> Optional[Dict[str, int]]:
+        """step id -> length of the longest dependency chain leading to it; None if there is a cycle."""
+        dependents = self.dependents()
+        indeg = {s.id: len(s.depends_on) for s in self._steps}
+        level = {sid: 0 for sid, deg in indeg.items() if deg == 0}
+        queue = list(level)
+        for sid in queue:
+            for nxt in dependents.get(sid, ()):
+                level[nxt] = max(level.get(nxt, 0), level[sid] + 1)
+                indeg[nxt] -= 1
+                if indeg[nxt] == 0:
+                    queue.append(nxt)
+        return level if len(queue) == len(self._steps) else None
@@ -9,8 +9,12 @@ class CLIConfig(BaseModel):
     adapter: str = Field(default="sqlalchemy")
     dialect: str = Field(default="postgresql")
 
-    base_dir: str
-    head_dir: str
+    base_dir: Optional[str] = None
+    head_dir: Optional[str] = None
+
+    # Read a tree from a git ref (e.g. origin/main) instead of a checkout; *_dir is then the path inside the repo
+    base_ref: Optional[str] = None
+    head_ref: Optional[str] = None
 
     base_module: Optional[str] = None
     head_module: Optional[str] = None
@@ -21,6 +25,15 @@ class CLIConfig(BaseModel):
     summary_only: bool = Field(default=False)
     summary_json: Optional[str] = None
 
+    ir_cache_dir: Optional[str] = None
+    ir_cache_max_mb: int = Field(default=512)
+    parallel_ir: bool = Field(default=False)
+    parallel_diff: bool = Field(default=False)
+    stream: bool = Field(default=False)
+    ir_format: str = Field(default="json")
+    table_stats: Optional[str] = None
+    verbose: bool = Field(default=False)
+
     class Config:
         extra = "allow"
 
@@ -1,32 +1,235 @@
 from __future__ import annotations
 
+import copy
+import fnmatch
+import hashlib
+import re
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Mapping, Optional, Pattern, Set, Tuple
 
 import yaml
+from pydantic import BaseModel, Field, ValidationError
 
+from schema_agent.policy.stats import TableStats, TableStatsIndex, load_table_stats
 
-def load_schema_hints(path: Optional[str]) -> Dict:
+
+class HintsError(ValueError):
+    """Schema hints that cannot be used as given: invalid planner settings or unreadable table statistics."""
+
+
+class PlannerSettings(BaseModel):
+    default_backfill_batch_rows: int = Field(default=5000)
+    backfill_batch_pages: int = Field(default=1000)
+    backfill_sleep_ms: int = Field(default=0)
+    use_fast_not_null: bool = Field(default=False)
+    use_batched_backfill: bool = Field(default=False)
+    large_table_mode: bool = Field(default=False)
+    emit_data_validation_hints: bool = Field(default=True)
+    add_banner_for_non_txn: bool = Field(default=False)
+    unique_nulls_not_distinct: bool = Field(default=False)
+    coalesce_alter_table: bool = Field(default=False)
+    merge_backfills: bool = Field(default=False)
+    # Type changes that rewrite the table go through a synced shadow column instead
+    shadow_type_changes: bool = Field(default=False)
+    # With table statistics, a table at or above any of these is planned as large
+    large_table_rows: int = Field(default=1_000_000)
+    large_table_bytes: int = Field(default=1 << 30)
+    hot_table_writes_per_sec: float = Field(default=500.0)
+
+
+@dataclass(frozen=True)
+class TableStrategy:
+    name: str  # "flags" (no statistics), "small" or "large"
+    batched_backfill: bool
+    fast_not_null: bool
+    reason: str
+    shadow_type_change: bool = False
+
+
+def choose_strategy(settings: PlannerSettings, stats: Optional[TableStats]) -> TableStrategy:
+    """Backfill / NOT NULL strategy for one table: from its statistics when known, else the global flags."""
+    if stats is None:
+        return TableStrategy(
+            "flags",
+            settings.use_batched_backfill or settings.large_table_mode,
+            settings.use_fast_not_null,
+            "no table statistics; planner flags apply",
+            settings.shadow_type_changes,
+        )
+    size = (stats.heap_bytes or 0) + (stats.index_bytes or 0)
+    checks = [
+        ("rows", stats.row_count, settings.large_table_rows),
+        ("bytes", size if stats.heap_bytes is not None or stats.index_bytes is not None else None, settings.large_table_bytes),
+        ("writes/s", stats.writes_per_sec, settings.hot_table_writes_per_sec),
+    ]
+    over = [f"{label} {_fmt(value)} >= {_fmt(limit)}" for label, value, limit in checks if value is not None and value >= limit]
+    if over:
+        return TableStrategy("large", True, True, "; ".join(over), True)
+    under = [f"{label} {_fmt(value)} < {_fmt(limit)}" for label, value, limit in checks if value is not None]
+    return TableStrategy("small", False, False, "; ".join(under) or "empty statistics row")
+
+
+def _fmt(value: float) -> str:
+    return f"{int(value):,}" if float(value).is_integer() else f"{value:,.1f}"
+
+
+class CompiledPolicy(dict):
+    """Schema hints, compiled once for lookups by diff, planner and sqlgen.
+
+    Still the raw hints mapping (so plugins reading hints["planner"] keep working), plus:
+    column rename maps indexed by (base table, head table), table renames, the unsafe
+    allowlist as a hashed set with glob entries compiled into one regex per kind, and typed
+    planner settings. Instances returned by load_schema_hints are shared; treat them as read-only.
+    """
+
+    column_renames: Dict[Tuple[str, str], Dict[str, str]]
+    table_renames: Dict[str, str]
+    planner: PlannerSettings
+    table_stats: Optional[TableStatsIndex]
+    pg_major: Optional[int]
+    _strategies: Dict[str, TableStrategy]
+    _allow_exact: Set[Tuple[str, Optional[str]]]
+    _allow_patterns: Dict[str, Pattern[str]]
+
+    def allows(self, kind: str, table: Optional[str] = None, name: Optional[str] = None) -> bool:
+        """True when the allowlist permits a destructive `kind` op on table.name, table or name."""
+        if (kind, None) in self._allow_exact:
+            return True
+        target = f"{table}.{name}" if table and name else table or name
+        if target is None:
+            return False
+        if (kind, target) in self._allow_exact:
+            return True
+        pattern = self._allow_patterns.get(kind)
+        return pattern is not None and pattern.fullmatch(target) is not None
+
+    def column_renames_for(self, base_table: str, head_table: str) -> Dict[str, str]:
+        return self.column_renames.get((base_table, head_table), {})
+
+    def strategy(self, table: str) -> TableStrategy:
+        strategy = self._strategies.get(table)
+        if strategy is None:
+            stats = self.table_stats.get(table) if self.table_stats is not None else None
+            strategy = self._strategies[table] = choose_strategy(self.planner, stats)
+        return strategy
+
+    def with_table_stats(self, stats: Optional[TableStatsIndex]) -> "CompiledPolicy":
+        """A copy of this policy planning with the given statistics (the original stays shared)."""
+        policy = copy.copy(self)
+        policy.table_stats = stats
+        policy._strategies = {}
+        return policy
+
+
+def compile_policy(hints: Optional[Mapping[str, Any]]) -> CompiledPolicy:
+    """Compile raw hints; a CompiledPolicy is returned unchanged.
+
+    Raises HintsError when planner settings fail validation or the table_stats file cannot be loaded.
+    """
+    if isinstance(hints, CompiledPolicy):
+        return hints
+    policy = CompiledPolicy(hints or {})
+
+    policy.column_renames = {}
+    for k, v in (policy.get("renames", {}) or {}).items():
+        # format: table.col_old: table.col_new
+        k, v = str(k), str(v)
+        if ":" in k or ":" in v:
+            continue
+        try:
+            left_t, left_c = k.split(".")
+            right_t, right_c = v.split(".")
+        except ValueError:
+            continue
+        policy.column_renames.setdefault((left_t, right_t), {})[left_c] = right_c
+
+    # format: old_table: new_table
+    policy.table_renames = {str(k): str(v) for k, v in (policy.get("table_renames", {}) or {}).items()}
+
+    policy._allow_exact = set()
+    globs: Dict[str, list] = {}
+    for entry in policy.get("unsafe_allow", []) or []:
+        kind, sep, target = str(entry).partition(":")
+        kind, target = kind.strip(), target.strip()
+        if not sep or not target:
+            policy._allow_exact.add((kind, None))
+        elif any(ch in target for ch in "*?["):
+            globs.setdefault(kind, []).append(fnmatch.translate(target))
+        else:
+            policy._allow_exact.add((kind, target))
+    policy._allow_patterns = {kind: re.compile("|".join(f"(?:{p})" for p in pats)) for kind, pats in globs.items()}
+
+    try:
+        policy.planner = PlannerSettings.model_validate(policy.get("planner", {}) or {})
+    except ValidationError as e:
+        rejected = "; ".join(f"planner.{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors())
+        raise HintsError(f"invalid planner settings: {rejected}") from e
+
+    # target server major version, for features that depend on it; None when not stated
+    derived = policy.get("_derived") or {}
+    policy.pg_major = derived["pg_major"] if "pg_major" in derived else _target_major(policy)
+
+    policy.table_stats = None
+    policy._strategies = {}
+    stats_path = policy.get("table_stats")
+    if stats_path:
+        try:
+            policy.table_stats = load_table_stats(str(stats_path))
+        except (OSError, ValueError) as e:
+            raise HintsError(f"table_stats: {e}") from e
+    return policy
+
+
+# resolved path -> (mtime_ns, size, sha256 of content, policy)
+_POLICY_CACHE: Dict[str, Tuple[int, int, str, CompiledPolicy]] = {}
+
+
+def load_schema_hints(path: Optional[str]) -> CompiledPolicy:
+    """Load and compile a hints file; reuses the compiled policy while the file is unchanged."""
     if not path:
-        return {}
+        return compile_policy({})
     p = Path(path)
-    if not p.exists():
-        return {}
     try:
-        content = yaml.safe_load(p.read_text()) or {}
+        st = p.stat()
+    except OSError:
+        return compile_policy({})
+    key = str(p.resolve())
+    cached = _POLICY_CACHE.get(key)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[3]
+    try:
+        raw = p.read_bytes()
+    except OSError:
+        return compile_policy({})
+    digest = hashlib.sha256(raw).hexdigest()
+    if cached and cached[2] == digest:
+        # touched but not edited
+        _POLICY_CACHE[key] = (st.st_mtime_ns, st.st_size, digest, cached[3])
+        return cached[3]
+    policy = compile_policy(_parse_hints(raw))
+    _POLICY_CACHE[key] = (st.st_mtime_ns, st.st_size, digest, policy)
+    return policy
+
+
+def _parse_hints(raw: bytes) -> Dict:
+    try:
+        content = yaml.safe_load(raw) or {}
         if not isinstance(content, dict):
             return {}
         # normalize helpful derived values
-        dialect = content.get("dialect", {}).get("postgres", {})
-        target_version = dialect.get("target_version")
-        if target_version:
-            try:
-                major = int(str(target_version).split(".")[0])
-            except Exception:
-                major = None
-            content.setdefault("_derived", {})["pg_major"] = major
+        if content.get("dialect", {}).get("postgres", {}).get("target_version"):
+            content.setdefault("_derived", {})["pg_major"] = _target_major(content)
         return content
     except Exception:
         return {}
 
 
+def _target_major(hints: Mapping[str, Any]) -> Optional[int]:
+    target_version = ((hints.get("dialect") or {}).get("postgres") or {}).get("target_version")
+    if not target_version:
+        return None
+    try:
+        return int(str(target_version).split(".")[0])
+    except ValueError:
+        return None
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+# Accepted column names, including those of pg_class / pg_stat_user_tables exports
+_TABLE_KEYS = ("table", "table_name", "relname")
+_SCHEMA_KEYS = ("schema", "schemaname", "nspname")
+_ROWS_KEYS = ("row_count", "rows", "n_live_tup", "reltuples")
+_HEAP_KEYS = ("heap_bytes", "table_bytes", "pg_relation_size")
+_INDEX_KEYS = ("index_bytes", "indexes_size", "pg_indexes_size")
+_WRITES_KEYS = ("writes_per_sec", "write_rate")
+_PAGE_BYTES = 8192
+
+
+@dataclass(frozen=True)
+class TableStats:
+    row_count: Optional[int] = None
+    heap_bytes: Optional[int] = None
+    index_bytes: Optional[int] = None
+    writes_per_sec: Optional[float] = None
+
+
+class TableStatsIndex:
+    """Statistics by IR table key. Tables in the public schema match with or without the prefix."""
+
+    __slots__ = ("_by_key",)
+
+    def __init__(self, by_key: Mapping[str, TableStats]):
+        self._by_key = dict(by_key)
+
+    def get(self, table: str) -> Optional[TableStats]:
+        stats = self._by_key.get(table)
+        if stats is None:
+            schema, _, name = table.rpartition(".")
+            if schema == "public":
+                stats = self._by_key.get(name)
+            elif not schema:
+                stats = self._by_key.get(f"public.{table}")
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def __contains__(self, table: object) -> bool:
+        return isinstance(table, str) and self.get(table) is not None
+
+
+# resolved path -> (mtime_ns, size, index)
+_STATS_CACHE: Dict[str, Tuple[int, int, TableStatsIndex]] = {}
+
+
+def load_table_stats(path: str) -> TableStatsIndex:
+    """Load per-table statistics from JSON (a list of rows or an object keyed by table) or CSV.
+
+    Raises OSError if the file cannot be read and ValueError if its content is not usable.
+    """
+    p = Path(path)
+    st = p.stat()
+    key = str(p.resolve())
+    cached = _STATS_CACHE.get(key)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    text = p.read_text(encoding="utf-8")
+    if p.suffix.lower() == ".csv":
+        rows: Iterable[Mapping[str, Any]] = list(csv.DictReader(io.StringIO(text)))
+    else:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: invalid JSON: {e}") from e
+        if isinstance(data, dict):
+            rows = [{"table": name, **(row or {})} for name, row in data.items()]
+        elif isinstance(data, list):
+            rows = data
+        else:
+            raise ValueError(f"{path}: expected a list of rows or an object keyed by table")
+    index = TableStatsIndex(dict(_parse_row(path, row) for row in rows))
+    _STATS_CACHE[key] = (st.st_mtime_ns, st.st_size, index)
+    return index
+
+
+def _parse_row(path: str, row: Mapping[str, Any]) -> Tuple[str, TableStats]:
+    if not isinstance(row, Mapping):
+        raise ValueError(f"{path}: expected an object per table, got {row!r}")
+    name = _first(row, _TABLE_KEYS)
+    if not name:
+        raise ValueError(f"{path}: row without a table name: {dict(row)!r}")
+    schema = _first(row, _SCHEMA_KEYS)
+    key = str(name) if not schema or schema == "public" or "." in str(name) else f"{schema}.{name}"
+
+    rows = _number(path, _first(row, _ROWS_KEYS), int)
+    heap = _number(path, _first(row, _HEAP_KEYS), int)
+    if heap is None and _first(row, ("relpages",)) is not None:
+        heap = _number(path, row["relpages"], int) * _PAGE_BYTES
+    return key, TableStats(
+        row_count=rows if rows is None or rows >= 0 else None,  # reltuples is -1 before the first ANALYZE
+        heap_bytes=heap,
+        index_bytes=_number(path, _first(row, _INDEX_KEYS), int),
+        writes_per_sec=_number(path, _first(row, _WRITES_KEYS), float),
+    )
+
+
+def _first(row: Mapping[str, Any], keys: Tuple[str, ...]) -> Any:
+    for k in keys:
+        value = row.get(k)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _number(path: str, value: Any, kind: type) -> Any:
+    if value is None:
+        return None
+    try:
+        return kind(float(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"{path}: not a number: {value!r}") from None
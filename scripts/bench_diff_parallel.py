@@ -0,0 +1,111 @@
+"""Serial vs process-pool diff_ir on synthetic schemas, to find where parallelism pays off.
+
+    python scripts/bench_diff_parallel.py [--workers N] [--runs N]
+
+Two workloads, every table changed in both:
+  alter   - 20 columns per table with type, nullability and default changes, plus one added
+            column and index; per-table work is mostly building ops
+  renames - 120 columns per table, half of them renamed; per-table work is mostly rename matching
+
+For each size the script reports the serial time, the pool time measured on this host (only
+meaningful with at least --workers CPUs) and the pool time projected for --workers CPUs from
+the measured pool startup, parent-side encode/rebuild cost and worker-side time. The last
+column is the rename work diff_ir compares against PARALLEL_DIFF_MIN_WORK.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from schema_agent.adapters import workers as workers_mod  # noqa: E402
+from schema_agent.core import diff as diff_mod  # noqa: E402
+from schema_agent.core.ir import IR, Column, Index, Table  # noqa: E402
+
+
+def _alter_ir(n: int, head: bool) -> IR:
+    tables = {}
+    for i in range(n):
+        cols = {"id": Column(name="id", data_type="bigint", nullable=False)}
+        for j in range(20):
+            data_type = "bigint" if head and j % 5 == 0 else "integer" if j % 2 else "text"
+            default = "0" if head and j % 4 == 0 else None
+            cols[f"c{j}"] = Column(name=f"c{j}", data_type=data_type, nullable=not (head and j % 3 == 0), default=default)
+        if head:
+            cols["extra"] = Column(name="extra", data_type="text", nullable=True)
+        indexes = {f"ix_t{i}_c1": Index(name=f"ix_t{i}_c1", columns=["c1"])}
+        if head:
+            indexes[f"ix_t{i}_c2"] = Index(name=f"ix_t{i}_c2", columns=["c2"])
+        tables[f"t{i}"] = Table(name=f"t{i}", columns=cols, primary_key=["id"], indexes=indexes)
+    return IR(dialect="postgresql", tables=tables)
+
+
+def _renames_ir(n: int, head: bool) -> IR:
+    tables = {}
+    for i in range(n):
+        cols = {"id": Column(name="id", data_type="bigint", nullable=False)}
+        for j in range(120):
+            name = f"attr_{j}_v2" if head and j % 2 else f"attr_{j}"
+            cols[name] = Column(name=name, data_type="text", nullable=True)
+        tables[f"t{i}"] = Table(name=f"t{i}", columns=cols, primary_key=["id"])
+    return IR(dialect="postgresql", tables=tables)
+
+
+WORKLOADS = {"alter": (_alter_ir, (500, 1000, 2000, 4000, 8000)), "renames": (_renames_ir, (25, 50, 100, 200, 400))}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def _best_of(runs: int, fn):
+    best, result = float("inf"), None
+    for _ in range(runs):
+        elapsed, result = _timed(fn)
+        best = min(best, elapsed)
+    return best, result
+
+
+def _measure_pool(pairs, workers: int):
+    # the same steps as diff_mod._diff_tables' pool path, timed piecewise
+    shards = workers_mod.split_shards(pairs, workers * 4)
+    t_encode, encoded = _timed(lambda: [diff_mod._encode_shard(chunk, "postgresql") for chunk in shards])
+    t_worker, results = _timed(lambda: [r for shard in encoded for r in diff_mod._diff_encoded_shard(shard, {})])
+    t_rebuild, ops = _timed(lambda: [[diff_mod.Op(kind=k, table=t, payload=p) for k, t, p in r] for r in results])
+    t_pool, pooled = _timed(lambda: workers_mod.map_shards(diff_mod._diff_encoded_shard, encoded, workers, {}))
+    return t_encode + t_pool + t_rebuild, t_encode + t_rebuild, t_worker, ops, pooled == results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=max(workers_mod.available_cpus(), 4))
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    startup, _ = _timed(lambda: workers_mod.map_shards(diff_mod._diff_encoded_shard, [diff_mod._encode_shard([], "postgresql")], args.workers, {}))
+    print(f"cpus={workers_mod.available_cpus()} workers={args.workers} pool startup={startup:.3f}s")
+    for name, (build, sizes) in WORKLOADS.items():
+        print(f"\n[{name}]")
+        print(f"{'tables':>8} {'serial s':>9} {'pool s':>9} {'projected s':>12} {'speedup':>8} {'work':>10}")
+        cutover = None
+        for n in sizes:
+            base, head = build(n, False), build(n, True)
+            pairs = [(base.tables[t], head.tables[t], None) for t in base.tables]
+            t_serial, serial = _best_of(args.runs, lambda: diff_mod._diff_tables(pairs, {}, workers=0))
+            t_pool, parent, worker, ops, same = _measure_pool(pairs, args.workers)
+            assert same and ops == serial, "pooled ops differ from serial ops"
+            projected = startup + parent + worker / args.workers
+            if cutover is None and projected < t_serial:
+                cutover = n
+            print(f"{n:>8} {t_serial:>9.3f} {t_pool:>9.3f} {projected:>12.3f} {t_serial / projected:>7.2f}x {diff_mod._rename_work(pairs):>10}")
+        print(f"projected pool faster from: {cutover or 'not reached'} tables")
+    print(f"\nPARALLEL_DIFF_MIN_WORK={diff_mod.PARALLEL_DIFF_MIN_WORK}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""plan_postgres + schedule_steps time per step, from 1k to 100k steps, to check linear scaling.
+
+    python scripts/bench_planner_scaling.py [--runs N]
+
+Each synthetic table gets a NOT NULL tightening with a default change on the same column, a
+second NOT NULL column, a foreign key and a check: the ops that wire steps together across a
+table (backfill -> default, validate -> NOT NULL, NOT VALID constraint -> backfill). With
+use_fast_not_null that is 16 steps per table (the two backfills are merged into one). Time per step should stay flat as the plan grows.
+The cyclic GC is paused while timing; its full collections scale with the number of live
+objects and would otherwise blur the planner's own cost.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from schema_agent.core.diff import Op, OpKind  # noqa: E402
+from schema_agent.core.ir import IR, Column, ForeignKey, Table  # noqa: E402
+from schema_agent.core.planner.postgres import plan_postgres  # noqa: E402
+from schema_agent.core.sched import schedule_steps  # noqa: E402
+
+HINTS = {"planner": {"use_fast_not_null": True}}
+SIZES = (63, 625, 1250, 3125, 6250)
+
+
+def _workload(n: int):
+    tables, ops = {}, []
+    for i in range(n):
+        t = f"t{i}"
+        tables[t] = Table(
+            name=t,
+            columns={
+                "id": Column(name="id", data_type="bigint", nullable=False),
+                "status": Column(name="status", data_type="text", nullable=False, default="'new'"),
+                "owner_id": Column(name="owner_id", data_type="bigint", nullable=False, default="0"),
+            },
+            primary_key=["id"],
+        )
+        fk = ForeignKey(name=f"fk_{t}_owner", columns=["owner_id"], ref_table="owners", ref_columns=["id"])
+        ops += [
+            Op(kind=OpKind.ALTER_NULLABLE, table=t, payload={"name": "status", "nullable": False}),
+            Op(kind=OpKind.ALTER_DEFAULT, table=t, payload={"name": "status", "default": "'new'"}),
+            Op(kind=OpKind.ALTER_NULLABLE, table=t, payload={"name": "owner_id", "nullable": False}),
+            Op(kind=OpKind.ADD_FK, table=t, payload={"fk": fk}),
+            Op(kind=OpKind.ADD_CHECK, table=t, payload={"name": f"ck_{t}_status", "expr": "status <> ''"}),
+        ]
+    head = IR(dialect="postgresql", tables=tables)
+    return head, ops
+
+
+def _best_of(runs: int, fn):
+    best, result = float("inf"), None
+    for _ in range(runs):
+        result = None
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'tables':>8} {'steps':>8} {'plan s':>8} {'sched s':>8} {'us/step':>8} {'vs first':>9}")
+    first = None
+    for n in SIZES:
+        head, ops = _workload(n)
+        t_plan, steps = _best_of(args.runs, lambda: plan_postgres(head, head, ops, HINTS))
+        t_sched, ordered = _best_of(args.runs, lambda: schedule_steps(steps))
+        assert len(ordered) == len(steps)
+        per_step = (t_plan + t_sched) / len(steps) * 1e6
+        first = first or per_step
+        print(f"{n:>8} {len(steps):>8} {t_plan:>8.3f} {t_sched:>8.3f} {per_step:>8.2f} {per_step / first:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
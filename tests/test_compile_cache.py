@@ -0,0 +1,28 @@
+import logging
+
+from sqlalchemy import Numeric, String
+
+from schema_agent.adapters.sqlalchemy.adapter import SQLAlchemyAdapter
+from schema_agent.adapters.sqlalchemy.compiler import CompileCache
+
+
+def test_repeated_type_compiles_hit_the_cache():
+    cache = CompileCache()
+    assert cache.type(String(50)) == cache.type(String(50)) == "VARCHAR(50)"
+    assert cache.type(Numeric(12, 2)) == "NUMERIC(12, 2)"
+    assert cache.stats()["types"] == {"hits": 1, "misses": 2, "entries": 2}
+
+
+def test_compile_cache_stats_are_logged(caplog):
+    from pathlib import Path
+
+    root = Path(__file__).resolve().parents[1]
+    adapter = SQLAlchemyAdapter()
+    with caplog.at_level(logging.DEBUG, logger="schema_agent"):
+        adapter.emit_ir(str(root / "examples/before"), "examples.before.models")
+        adapter.emit_ir(str(root / "examples/after"), "examples.after.models")
+    logged = [r.getMessage() for r in caplog.records if "compile cache" in r.getMessage()]
+    assert len(logged) == 2
+    # the head tree reuses the types compiled for the base tree
+    assert adapter.compiler.stats()["types"]["hits"] > 0
+    assert "types " in logged[1] and " hits / " in logged[1]
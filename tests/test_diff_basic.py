@@ -43,3 +43,299 @@ def test_diff_rename_and_constraints():
     assert OpKind.ALTER_DEFAULT in kinds
 
 
+def test_diff_skips_tables_with_equal_content_hash(monkeypatch):
+    import schema_agent.core.diff as diff_mod
+
+    base, head = make_ir()
+    users = Table(name="users", columns={"id": Column(name="id", data_type="bigint", nullable=False)})
+    base = IR(dialect="postgresql", tables={**base.tables, "users": users})
+    head = IR.model_validate_json(IR(dialect="postgresql", tables={**head.tables, "users": users.model_copy()}).model_dump_json())
+    assert head.tables["users"].content_hash == base.tables["users"].content_hash
+    assert head.tables["orders"].content_hash != base.tables["orders"].content_hash
+
+    seen = []
+    original = diff_mod._diff_table
+    monkeypatch.setattr(diff_mod, "_diff_table", lambda b, h, hints, **kw: seen.append(b.name) or original(b, h, hints, **kw))
+    diff_ir(base, head, hints={})
+    assert seen == ["orders"]
+
+
+def test_stale_content_hashes_are_recomputed():
+    import json
+
+    users = Table(name="users", columns={"id": Column(name="id", data_type="bigint", nullable=False)})
+    base = IR(dialect="postgresql", tables={"users": users})
+
+    # a JSON IR whose content was edited but whose stored hashes were not
+    data = json.loads(base.model_dump_json())
+    data["tables"]["users"]["columns"]["id"]["nullable"] = True
+    edited = IR.model_validate_json(json.dumps(data))
+    assert edited.tables["users"].content_hash != base.tables["users"].content_hash
+    assert [op.kind for op in diff_ir(base, edited, hints={})] == [OpKind.ALTER_NULLABLE]
+
+    # model_copy does not carry the old hash over
+    col = users.columns["id"].model_copy(update={"data_type": "integer"})
+    assert col.content_hash is None
+    copied = IR(dialect="postgresql", tables={"users": users.model_copy(update={"columns": {"id": col}})})
+    assert [op.kind for op in diff_ir(base, copied, hints={})] == [OpKind.ALTER_COLUMN_TYPE]
+
+
+def test_column_renames_use_best_assignment_not_first_match():
+    def cols(*specs):
+        return {name: Column(name=name, data_type=t, nullable=n) for name, t, n in specs}
+
+    base = IR(
+        dialect="postgresql",
+        tables={"t": Table(name="t", columns=cols(("id", "bigint", False), ("first_name", "text", True), ("last_name", "text", False), ("zip", "integer", True)))},
+    )
+    head = IR(
+        dialect="postgresql",
+        tables={"t": Table(name="t", columns=cols(("id", "bigint", False), ("surname", "text", False), ("given_first_name", "text", True), ("zip_code", "bigint", True)))},
+    )
+    for _ in range(3):
+        ops = diff_ir(base, head, hints={})
+        renames = sorted((op.payload["from"], op.payload["to"]) for op in ops if op.kind == OpKind.RENAME_COLUMN)
+        assert renames == [("first_name", "given_first_name"), ("last_name", "surname"), ("zip", "zip_code")]
+        assert not [op for op in ops if op.kind in (OpKind.ADD_COLUMN, OpKind.DROP_COLUMN)]
+
+
+
+def test_column_renames_reject_dissimilar_names():
+    flag = dict(data_type="boolean", nullable=False, default="false")
+    base = IR(dialect="postgresql", tables={"t": Table(name="t", columns={"id": Column(name="id", data_type="bigint", nullable=False), "is_deleted": Column(name="is_deleted", **flag)})})
+    head = IR(dialect="postgresql", tables={"t": Table(name="t", columns={"id": Column(name="id", data_type="bigint", nullable=False), "is_admin": Column(name="is_admin", **flag)})})
+    kinds = sorted(op.kind.value for op in diff_ir(base, head, hints={}))
+    assert kinds == sorted([OpKind.ADD_COLUMN.value, OpKind.DROP_COLUMN.value])
+
+    # a hint still pairs them
+    ops = diff_ir(base, head, hints={"renames": {"t.is_deleted": "t.is_admin"}})
+    assert [op.kind for op in ops] == [OpKind.RENAME_COLUMN]
+
+
+def test_table_rename_inferred_and_hinted():
+    from schema_agent.core.planner.postgres import plan_postgres
+
+    def table(name, *extra):
+        cols = {c: Column(name=c, data_type="text", nullable=True) for c in ("email", "name", "city", *extra)}
+        cols["id"] = Column(name="id", data_type="bigint", nullable=False)
+        return Table(name=name, columns=cols, primary_key=["id"])
+
+    base = IR(dialect="postgresql", tables={"accounts": table("accounts"), "legacy": table("legacy", "zip")})
+    head = IR(dialect="postgresql", tables={"customers": table("customers", "phone"), "archive.legacy": table("legacy", "zip")})
+
+    ops = diff_ir(base, head, hints={})
+    renames = [(op.payload["from"], op.payload["to"]) for op in ops if op.kind == OpKind.RENAME_TABLE]
+    assert renames == [("legacy", "archive.legacy"), ("accounts", "customers")]
+    assert [(op.kind, op.table) for op in ops if op.kind != OpKind.RENAME_TABLE] == [(OpKind.ADD_COLUMN, "customers")]
+
+    steps = plan_postgres(base, head, ops, {})
+    assert steps[0].sql == "ALTER TABLE legacy SET SCHEMA archive;"
+    assert steps[1].sql == "ALTER TABLE accounts RENAME TO customers;"
+    assert steps[1].id in steps[2].depends_on
+
+    # hints win over inference
+    ops = diff_ir(base, head, hints={"table_renames": {"accounts": "archive.legacy"}})
+    renames = [(op.payload["from"], op.payload["to"]) for op in ops if op.kind == OpKind.RENAME_TABLE]
+    assert renames[0] == ("accounts", "archive.legacy")
+
+
+def test_parallel_diff_matches_serial(monkeypatch):
+    import schema_agent.core.diff as diff_mod
+    from schema_agent.adapters import workers
+
+    def ir(head):
+        tables = {}
+        for i in range(6):
+            cols = {"id": Column(name="id", data_type="bigint", nullable=False)}
+            for j in range(8):
+                name = f"c{j}_new" if head and j % 2 else f"c{j}"
+                cols[name] = Column(name=name, data_type="text", nullable=not (head and j == 4))
+            tables[f"t{i}"] = Table(name=f"t{i}", columns=cols, primary_key=["id"])
+        return IR(dialect="postgresql", tables=tables)
+
+    base, head = ir(False), ir(True)
+    serial = diff_ir(base, head, hints={})
+    monkeypatch.setattr(workers, "available_cpus", lambda: 2)
+    monkeypatch.setattr(diff_mod, "PARALLEL_DIFF_MIN_WORK", 0)
+    assert diff_ir(base, head, hints={}, workers=2) == serial
+
+
+def test_op_payloads_reference_head_ir():
+    base, _ = make_ir()
+    orders = base.tables["orders"]
+    note = Column(name="note", data_type="jsonb", nullable=True)
+    new_table = Table(name="items", columns={"id": Column(name="id", data_type="bigint", nullable=False)})
+    head = IR(dialect="postgresql", tables={"orders": Table(name="orders", columns={**orders.columns, "note": note}), "items": new_table})
+    ops = diff_ir(base, head, hints={})
+    create = next(op for op in ops if op.kind == OpKind.CREATE_TABLE)
+    assert create.payload["table"] is new_table
+    added = next(op for op in ops if op.kind == OpKind.ADD_COLUMN)
+    assert added.payload["column"] is note
+    assert create.model_dump()["payload"]["table"]["columns"]["id"]["data_type"] == "bigint"
+
+
+def test_indexes_and_constraints_matched_by_definition():
+    from schema_agent.core.ir import ForeignKey, Index
+    from schema_agent.core.planner.postgres import plan_postgres
+
+    cols = {
+        "id": Column(name="id", data_type="bigint", nullable=False),
+        "user_id": Column(name="user_id", data_type="bigint", nullable=False),
+        "status": Column(name="status", data_type="text", nullable=False),
+    }
+
+    def table(indexes, fks, checks):
+        return Table(
+            name="orders",
+            columns=dict(cols),
+            primary_key=["id"],
+            indexes={i.name: i for i in indexes},
+            fks={f.name: f for f in fks},
+            checks=checks,
+        )
+
+    fk = dict(columns=["user_id"], ref_table="users", ref_columns=["id"])
+    base = IR(dialect="postgresql", tables={"orders": table(
+        [Index(name="ix_orders_user", columns=["user_id"]), Index(name="ix_orders_status", columns=["status"])],
+        [ForeignKey(name="fk_orders_user", **fk)],
+        {"ck_status": "status <> ''"},
+    )})
+    head = IR(dialect="postgresql", tables={"orders": table(
+        [Index(name="ix_orders_user_id", columns=["user_id"]),
+         Index(name="ix_orders_status", columns=["status"], where="status <> 'done'")],
+        [ForeignKey(name="fk_orders_user", on_delete="CASCADE", **fk)],
+        {"ck_status_nonempty": "status  <>  ''"},
+    )})
+    ops = diff_ir(base, head, hints={})
+    kinds = {op.kind: op for op in ops}
+    assert kinds[OpKind.RENAME_INDEX].payload == {"from": "ix_orders_user", "to": "ix_orders_user_id"}
+    assert kinds[OpKind.REBUILD_INDEX].payload["index"] is head.tables["orders"].indexes["ix_orders_status"]
+    assert kinds[OpKind.REBUILD_FK].payload["fk"].on_delete == "CASCADE"
+    assert kinds[OpKind.RENAME_CONSTRAINT].payload == {"from": "ck_status", "to": "ck_status_nonempty"}
+    assert not {OpKind.ADD_INDEX, OpKind.DROP_INDEX, OpKind.ADD_FK, OpKind.DROP_FK} & set(kinds)
+
+    sql = [s.sql for s in plan_postgres(base, head, ops, hints={})]
+    assert "ALTER INDEX ix_orders_user RENAME TO ix_orders_user_id;" in sql
+    assert any("ix_orders_status__new" in s and s.endswith("WHERE status <> 'done';") for s in sql)
+    assert "ALTER INDEX ix_orders_status__new RENAME TO ix_orders_status;" in sql
+    assert "ALTER TABLE orders VALIDATE CONSTRAINT fk_orders_user__new;" in sql
+
+
+
+
+def test_rebuilding_constraint_backed_index_swaps_the_constraint():
+    from schema_agent.core.ir import Index
+    from schema_agent.core.planner.postgres import plan_postgres
+
+    cols = {c: Column(name=c, data_type="text", nullable=c != "id") for c in ("id", "email", "name")}
+
+    def users(**email_key):
+        idx = {"users_email_key": Index(name="users_email_key", columns=["email"], unique=True, **email_key)}
+        return IR(dialect="postgresql", tables={"users": Table(name="users", columns=cols, primary_key=["id"], uniques=[["email"]], indexes=idx)})
+
+    base = users()
+    head = users(include=["name"])
+    ops = diff_ir(base, head, hints={})
+    assert [op.kind for op in ops] == [OpKind.REBUILD_INDEX]
+    sql = [s.sql for s in plan_postgres(base, head, ops, hints={})]
+    assert sql[-1] == "ALTER TABLE users DROP CONSTRAINT users_email_key, ADD CONSTRAINT users_email_key UNIQUE USING INDEX users_email_key__new;"
+    assert not [s for s in sql if "DROP INDEX" in s]
+
+    # a partial index cannot back the constraint, which is dropped instead
+    head = users(where="name IS NOT NULL")
+    sql = [s.sql for s in plan_postgres(base, head, diff_ir(base, head, hints={}), hints={})]
+    assert sql[-2:] == ["ALTER TABLE users DROP CONSTRAINT users_email_key;", "ALTER INDEX users_email_key__new RENAME TO users_email_key;"]
+
+
+def test_renames_carry_into_fks_and_checks():
+    from schema_agent.core.ir import ForeignKey
+
+    def parent(name, key="id"):
+        cols = {c: Column(name=c, data_type="text", nullable=True) for c in ("email", "name", "city")}
+        cols[key] = Column(name=key, data_type="bigint", nullable=False)
+        return Table(name=name, columns=cols, primary_key=[key])
+
+    def orders(ref_table="accounts", ref_col="id", amount="amount", literal="amount"):
+        cols = {
+            "id": Column(name="id", data_type="bigint", nullable=False),
+            "account_id": Column(name="account_id", data_type="bigint", nullable=False),
+            amount: Column(name=amount, data_type="numeric(12,2)", nullable=False),
+        }
+        fk = ForeignKey(name="fk_orders_account", columns=["account_id"], ref_table=ref_table, ref_columns=[ref_col])
+        checks = {"ck_amount": f"{amount} > 0 AND current_setting('app.unit') <> '{literal}'"}
+        return Table(name="orders", columns=cols, primary_key=["id"], fks={fk.name: fk}, checks=checks)
+
+    base = IR(dialect="postgresql", tables={"accounts": parent("accounts"), "orders": orders()})
+
+    # the parent table is renamed
+    head = IR(dialect="postgresql", tables={"customer_accounts": parent("customer_accounts"), "orders": orders("customer_accounts")})
+    ops = diff_ir(base, head, hints={"table_renames": {"accounts": "customer_accounts"}})
+    assert [op.kind for op in ops] == [OpKind.RENAME_TABLE]
+
+    # the referenced parent column is renamed
+    head = IR(dialect="postgresql", tables={"accounts": parent("accounts", "account_id"), "orders": orders(ref_col="account_id")})
+    ops = diff_ir(base, head, hints={"renames": {"accounts.id": "accounts.account_id"}})
+    assert [(op.kind, op.table) for op in ops] == [(OpKind.RENAME_COLUMN, "accounts")]
+
+    # a column used by a check is renamed; string literals are not column references
+    head = IR(dialect="postgresql", tables={"accounts": parent("accounts"), "orders": orders(amount="amount_total")})
+    assert [op.kind for op in diff_ir(base, head, hints={})] == [OpKind.RENAME_COLUMN]
+    head = IR(dialect="postgresql", tables={"accounts": parent("accounts"), "orders": orders(amount="amount_total", literal="amount_total")})
+    assert [op.kind for op in diff_ir(base, head, hints={})] == [OpKind.RENAME_COLUMN, OpKind.REBUILD_CHECK]
+
+
+def test_renamed_column_keeps_its_unique_and_index():
+    from schema_agent.core.ir import Index
+
+    def users(email):
+        cols = {
+            "id": Column(name="id", data_type="bigint", nullable=False),
+            email: Column(name=email, data_type="text", nullable=False),
+        }
+        idx = Index(name="ix_users_email", columns=[email])
+        return Table(name="users", columns=cols, primary_key=["id"], uniques=[[email]], indexes={idx.name: idx})
+
+    base = IR(dialect="postgresql", tables={"users": users("email")})
+    head = IR(dialect="postgresql", tables={"users": users("email_address")})
+    ops = diff_ir(base, head, hints={"renames": {"users.email": "users.email_address"}})
+    assert [op.kind for op in ops] == [OpKind.RENAME_COLUMN]
+
+
+def test_compiled_policy_cached_and_indexed(tmp_path):
+    import os
+
+    from schema_agent.policy.hints import compile_policy, load_schema_hints
+
+    path = tmp_path / "schema_hints.yml"
+    path.write_text(
+        "unsafe_allow:\n  - 'drop_index: tmp_*'\n  - 'drop_column: users.legacy'\n  - drop_table\n"
+        "renames:\n  orders.total_price: orders.amount\n"
+        "planner:\n  default_backfill_batch_rows: '200'\n"
+    )
+    policy = load_schema_hints(str(path))
+    assert policy.allows("drop_index", None, "tmp_orders_x")
+    assert not policy.allows("drop_index", None, "ix_orders")
+    assert policy.allows("drop_column", "users", "legacy")
+    assert not policy.allows("drop_column", "users", "email")
+    assert policy.allows("drop_table", "anything")
+    assert policy.column_renames_for("orders", "orders") == {"total_price": "amount"}
+    assert policy.planner.default_backfill_batch_rows == 200
+    assert policy["planner"]["default_backfill_batch_rows"] == "200"  # raw hints stay readable
+    assert compile_policy(policy) is policy
+
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_schema_hints(str(path)) is policy  # touched, same content
+    path.write_text("unsafe_allow: []\n")
+    assert not load_schema_hints(str(path)).allows("drop_table", "anything")
+
+
+def test_invalid_hints_are_reported(tmp_path):
+    import pytest
+
+    from schema_agent.policy.hints import HintsError, compile_policy
+
+    with pytest.raises(HintsError, match=r"planner\.backfill_sleep_ms.*planner\.merge_backfills"):
+        compile_policy({"planner": {"backfill_sleep_ms": "soon", "merge_backfills": "maybe", "use_fast_not_null": True}})
+    with pytest.raises(HintsError, match="table_stats"):
+        compile_policy({"table_stats": str(tmp_path / "missing.json")})
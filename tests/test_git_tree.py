@@ -0,0 +1,74 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from schema_agent.adapters.sqlalchemy.adapter import SQLAlchemyAdapter
+from schema_agent.adapters.sqlalchemy.static import StaticSQLAlchemyAdapter
+
+MODELS = """
+from sqlalchemy import Column, BigInteger, Text
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class Account(Base):
+    __tablename__ = "accounts"
+    id = Column(BigInteger, primary_key=True)
+    {extra}
+"""
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def _make_repo(tmp_path: Path) -> Path:
+    repo = tmp_path / "repo"
+    pkg = repo / "src" / "gitpkg"
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("")
+    (pkg / "models.py").write_text(MODELS.format(extra="legacy = Column(Text)"))
+    _git(repo, "init", "-q")
+    _git(repo, "add", ".")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "base")
+    # Working tree moves on; the base must still come from the commit
+    (pkg / "models.py").write_text(MODELS.format(extra="name = Column(Text)"))
+    return repo
+
+
+def test_emit_ir_from_git_ref_ignores_working_tree(tmp_path: Path):
+    repo = _make_repo(tmp_path)
+    src = str(repo / "src")
+
+    for adapter in (SQLAlchemyAdapter(), StaticSQLAlchemyAdapter()):
+        base = adapter.emit_ir(repo_path=src, module_hint="gitpkg.models", git_ref="HEAD")
+        head = adapter.emit_ir(repo_path=src, module_hint="gitpkg.models")
+        assert set(base.tables["accounts"].columns) == {"id", "legacy"}
+        assert set(head.tables["accounts"].columns) == {"id", "name"}
+
+    assert not any(m == "gitpkg" or m.startswith("gitpkg.") for m in sys.modules)
+    assert not any(type(f).__name__ == "GitTreeFinder" for f in sys.meta_path)
+
+
+def test_git_tree_finder_only_claims_packages(tmp_path: Path):
+    from schema_agent.adapters.git_tree import GitTree, GitTreeFinder
+
+    repo = tmp_path / "repo"
+    (repo / "src" / "gitpkg").mkdir(parents=True)
+    (repo / "src" / "gitpkg" / "__init__.py").write_text("")
+    (repo / "src" / "helpers").mkdir()
+    (repo / "src" / "helpers" / "__init__.py").write_text("")
+    (repo / "src" / "docs").mkdir()
+    (repo / "src" / "docs" / "conf.py").write_text("")
+    (repo / "src" / "setup.py").write_text("")
+    _git(repo, "init", "-q")
+    _git(repo, "add", ".")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "base")
+
+    with GitTree(str(repo / "src"), "HEAD") as tree:
+        finder = GitTreeFinder(tree, "gitpkg")
+        assert finder.packages == {"gitpkg", "helpers"}
+        assert finder.find_spec("setup") is None and finder.find_spec("docs") is None
+        assert finder.find_spec("gitpkg.missing") is None
+        assert finder.find_spec("helpers").origin == "HEAD:src/helpers/__init__.py"
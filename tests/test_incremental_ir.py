@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from schema_agent.adapters.sqlalchemy.adapter import SQLAlchemyAdapter
+from schema_agent.core.cache import IRCache
+
+BASE = """
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+"""
+
+USERS = """
+from sqlalchemy import Column, BigInteger, Text
+from incpkg.base import Base
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(BigInteger, primary_key=True)
+    email = Column(Text)
+"""
+
+ORDERS = """
+from sqlalchemy import Column, BigInteger, ForeignKey, Text
+from incpkg.base import Base
+
+
+class Order(Base):
+    __tablename__ = "orders"
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(ForeignKey("users.id"))
+    {extra}
+"""
+
+
+def _write(repo: Path, orders_extra: str = "", base_extra: str = "") -> None:
+    pkg = repo / "incpkg"
+    pkg.mkdir(parents=True, exist_ok=True)
+    (pkg / "__init__.py").write_text("from incpkg.base import Base\nfrom incpkg import orders, users\n")
+    (pkg / "base.py").write_text(BASE + base_extra)
+    (pkg / "users.py").write_text(USERS)
+    (pkg / "orders.py").write_text(ORDERS.format(extra=orders_extra))
+
+
+def test_incremental_reemits_only_tables_of_changed_modules(tmp_path: Path, monkeypatch):
+    repo = tmp_path / "repo"
+    _write(repo)
+    adapter = SQLAlchemyAdapter(cache=IRCache(str(tmp_path / "cache")))
+    adapter.emit_ir(repo_path=str(repo), module_hint="incpkg")
+
+    emitted = []
+    original = adapter._emit_table_ir
+
+    def _counting(satable):
+        emitted.append(satable.name)
+        return original(satable)
+
+    monkeypatch.setattr(adapter, "_emit_table_ir", _counting)
+
+    _write(repo, orders_extra="note = Column(Text)")
+    ir = adapter.emit_ir(repo_path=str(repo), module_hint="incpkg")
+    assert emitted == ["orders"]
+    assert set(ir.tables["orders"].columns) == {"id", "user_id", "note"}
+    assert ir == SQLAlchemyAdapter().emit_ir(repo_path=str(repo), module_hint="incpkg")
+
+    # A change to a module every model imports invalidates every table
+    emitted.clear()
+    _write(repo, orders_extra="note = Column(Text)", base_extra="# touched\n")
+    adapter.emit_ir(repo_path=str(repo), module_hint="incpkg")
+    assert sorted(emitted) == ["orders", "users"]
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from schema_agent.adapters.sqlalchemy.adapter import SQLAlchemyAdapter
+from schema_agent.core.cache import IRCache
+from schema_agent.core.ir import IR, Column, Table
+
+MODELS = """
+from sqlalchemy import Column, BigInteger, Text
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class Widget(Base):
+    __tablename__ = "widgets"
+    id = Column(BigInteger, primary_key=True)
+    {extra}
+"""
+
+
+def _write_models(root: Path, extra: str = "") -> None:
+    pkg = root / "cachedpkg"
+    pkg.mkdir(parents=True, exist_ok=True)
+    (pkg / "__init__.py").write_text("")
+    (pkg / "models.py").write_text(MODELS.format(extra=extra))
+
+
+def test_cache_hit_skips_import_and_invalidates_on_change(tmp_path: Path, monkeypatch):
+    repo = tmp_path / "repo"
+    _write_models(repo)
+    adapter = SQLAlchemyAdapter(cache=IRCache(str(tmp_path / "cache")))
+
+    first = adapter.emit_ir(repo_path=str(repo), module_hint="cachedpkg.models")
+    assert set(first.tables["widgets"].columns) == {"id"}
+
+    def _boom(*args, **kwargs):
+        raise AssertionError("models were imported despite a cache hit")
+
+    monkeypatch.setattr(adapter, "_emit_ir", _boom)
+    assert adapter.emit_ir(repo_path=str(repo), module_hint="cachedpkg.models") == first
+
+    monkeypatch.undo()
+    _write_models(repo, extra="name = Column(Text)")
+    changed = adapter.emit_ir(repo_path=str(repo), module_hint="cachedpkg.models")
+    assert set(changed.tables["widgets"].columns) == {"id", "name"}
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    ir = IR(
+        dialect="postgresql",
+        tables={"t": Table(name="t", columns={"id": Column(name="id", data_type="BIGINT", nullable=False)})},
+    )
+    entry_size = len(ir.model_dump_json())
+    cache = IRCache(str(tmp_path), max_bytes=entry_size * 2)
+
+    cache.put("a", ir)
+    cache.put("b", ir)
+    assert cache.get("a") is not None  # refresh "a" so "b" is the LRU entry
+    cache.put("c", ir)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
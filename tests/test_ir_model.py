@@ -0,0 +1,55 @@
+import dataclasses
+
+import pytest
+from pydantic import ValidationError
+
+from schema_agent.core.ir import IR, Column, ForeignKey, Index, Table
+
+
+def _ir() -> IR:
+    users = Table(
+        name="users",
+        columns={
+            "id": Column(name="id", data_type="bigint", nullable=False),
+            "email": Column(name="email", data_type="text", nullable=True, default="''", comment="login"),
+            "org_id": Column(name="org_id", data_type="bigint", nullable=True),
+        },
+        primary_key=["id"],
+        uniques=[["email"]],
+        checks={"ck_email": "email <> ''"},
+        indexes={"ix_users_email": Index(name="ix_users_email", columns=["email"], include=["id"], where="email IS NOT NULL")},
+        fks={"fk_users_org": ForeignKey(name="fk_users_org", columns=["org_id"], ref_table="orgs", ref_columns=["id"], on_delete="CASCADE")},
+    )
+    return IR(dialect="postgresql", version="15", tables={"users": users}, enums={"mood": ["ok", "sad"]}, extensions=["citext"])
+
+
+def test_ir_round_trips_through_json_and_dict():
+    ir = _ir()
+    loaded = IR.model_validate_json(ir.model_dump_json())
+    assert loaded == ir
+    assert isinstance(loaded.tables["users"].indexes["ix_users_email"], Index)
+    assert IR.model_validate(ir.model_dump()) == ir
+    assert Table.model_validate(ir.tables["users"].model_dump()) == ir.tables["users"]
+    # content hashes are derived, so they stay out of the JSON
+    assert "content_hash" not in ir.model_dump_json()
+    assert loaded.tables["users"].content_hash == ir.tables["users"].content_hash
+
+
+def test_invalid_ir_input_is_rejected():
+    with pytest.raises(ValidationError):
+        IR.model_validate({"dialect": "mysql"})
+    with pytest.raises(ValidationError):
+        IR.model_validate_json('{"dialect": "postgresql", "tables": {"t": {"name": "t", "columns": {"id": {"name": "id"}}}}}')
+    with pytest.raises(ValidationError):
+        Column.model_validate({"name": "id", "data_type": "bigint", "nullable": "sometimes"})
+
+
+def test_ir_objects_are_frozen():
+    ir = _ir()
+    col = ir.tables["users"].columns["email"]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        col.nullable = False
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        ir.tables["users"].primary_key = []
+    changed = col.model_copy(update={"nullable": False})
+    assert changed.nullable is False and col.nullable is True
@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from schema_agent.adapters.sqlalchemy.adapter import SQLAlchemyAdapter
+from schema_agent.adapters import workers
+from schema_agent.adapters.workers import emit_irs
+
+
+def test_parallel_extraction_matches_in_process(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    trees = [
+        (str(root / "examples/before"), "examples.before.models", None),
+        (str(root / "examples/after"), "examples.after.models", None),
+    ]
+    monkeypatch.setattr(workers, "available_cpus", lambda: 2)
+    sequential = emit_irs(SQLAlchemyAdapter(), trees, parallel=False)
+    parallel = emit_irs(SQLAlchemyAdapter(), trees, parallel=True)
+    assert parallel == sequential
+    assert "orders" not in parallel[0].tables and "orders" in parallel[1].tables
@@ -0,0 +1,145 @@
+import gzip
+from pathlib import Path
+
+from schema_agent.adapters.pgdump.adapter import PgDumpAdapter
+from schema_agent.adapters.pgdump.splitter import iter_statements
+from schema_agent.adapters.sqlalchemy.adapter import SQLAlchemyAdapter
+from schema_agent.core.ir import Column
+
+DUMP = r"""--
+-- PostgreSQL database dump
+--
+
+SET statement_timeout = 0;
+SELECT pg_catalog.set_config('search_path', '', false);
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto WITH SCHEMA public;
+
+CREATE TYPE public.order_status AS ENUM (
+    'new',
+    'it''s shipped'
+);
+
+CREATE FUNCTION public.touch() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  NEW.note := 'semi; colon'; -- not a statement end
+  RETURN NEW;
+END;
+$$;
+
+/* block /* nested */ comment; */
+
+CREATE TABLE public.users (
+    id integer NOT NULL,
+    email character varying(255) NOT NULL,
+    name text,
+    created_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+COMMENT ON COLUMN public.users.email IS 'login; address';
+
+CREATE SEQUENCE public.users_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1;
+
+ALTER SEQUENCE public.users_id_seq OWNED BY public.users.id;
+
+CREATE TABLE public.orders (
+    id bigint NOT NULL,
+    user_id integer,
+    status public.order_status,
+    total numeric(10,2),
+    CONSTRAINT orders_total_check CHECK ((total >= (0)::numeric))
+);
+
+COPY public.users (id, email, name, created_at) FROM stdin;
+1	a@example.com	x; y	2024-01-01
+\.
+
+ALTER TABLE ONLY public.users ALTER COLUMN id SET DEFAULT nextval('public.users_id_seq'::regclass);
+
+ALTER TABLE ONLY public.users
+    ADD CONSTRAINT users_pkey PRIMARY KEY (id);
+
+ALTER TABLE ONLY public.users
+    ADD CONSTRAINT users_email_key UNIQUE (email);
+
+ALTER TABLE ONLY public.orders
+    ADD CONSTRAINT orders_pkey PRIMARY KEY (id);
+
+CREATE INDEX ix_users_lower_email ON public.users USING btree (lower((email)::text));
+
+CREATE UNIQUE INDEX ix_orders_user ON public.orders USING btree (user_id DESC) INCLUDE (status);
+
+ALTER TABLE ONLY public.orders
+    ADD CONSTRAINT orders_user_id_fkey FOREIGN KEY (user_id) REFERENCES public.users(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED;
+"""
+
+
+def test_splitter_handles_quotes_comments_and_copy():
+    stmts = list(iter_statements(DUMP.splitlines(keepends=True)))
+    assert not any("2024-01-01" in s for s in stmts)
+    assert any("'semi; colon'" in s and s.startswith("CREATE FUNCTION") for s in stmts)
+    assert any(s.startswith("COMMENT ON COLUMN") and "'login; address'" in s for s in stmts)
+    assert not any("nested" in s for s in stmts)
+
+    kept = list(iter_statements(DUMP.splitlines(keepends=True), keep=lambda head: head.startswith("CREATE TABLE")))
+    assert [s.split("(")[0].strip() for s in kept] == ["CREATE TABLE public.users", "CREATE TABLE public.orders"]
+
+
+def test_pgdump_adapter_builds_ir(tmp_path: Path):
+    (tmp_path / "schema.sql.gz").write_bytes(gzip.compress(DUMP.encode("utf-8")))
+    adapter = PgDumpAdapter()
+    ir = adapter.emit_ir(repo_path=str(tmp_path), module_hint="schema.sql.gz")
+    assert adapter.unresolved == []
+    assert ir.enums == {"order_status": ["new", "it's shipped"]}
+    assert ir.extensions == ["pgcrypto"]
+
+    users = ir.tables["users"]
+    assert [(c.name, c.data_type, c.nullable, c.default) for c in users.columns.values()] == [
+        ("id", "INTEGER", False, None),  # serial default dropped
+        ("email", "VARCHAR(255)", False, None),
+        ("name", "TEXT", True, None),
+        ("created_at", "TIMESTAMP WITHOUT TIME ZONE", False, "now()"),
+    ]
+    assert users.columns["email"].comment == "login; address"
+    # filled in across CREATE TABLE and COMMENT ON, but hashed like a column built in one go
+    email = Column(name="email", data_type="VARCHAR(255)", nullable=False, comment="login; address")
+    assert users.columns["email"].content_hash == email.compute_hash()
+    assert users.primary_key == ["id"]
+    assert users.uniques == [["email"]]
+    assert users.indexes["ix_users_lower_email"].columns == ["lower((email)::text)"]
+
+    orders = ir.tables["orders"]
+    assert orders.columns["status"].data_type == "order_status"
+    assert orders.columns["total"].data_type == "NUMERIC(10, 2)"
+    assert orders.checks == {"orders_total_check": "total >= (0)::numeric"}
+    idx = orders.indexes["ix_orders_user"]
+    assert (idx.columns, idx.unique, idx.include) == (["user_id"], True, ["status"])
+    fk = orders.fks["orders_user_id_fkey"]
+    assert (fk.columns, fk.ref_table, fk.ref_columns, fk.on_delete, fk.deferrable, fk.initially_deferred) == (
+        ["user_id"], "users", ["id"], "CASCADE", True, True
+    )
+
+
+def test_pgdump_matches_models(tmp_path: Path):
+    # pg_dump output for examples/before/models.py
+    (tmp_path / "before.sql").write_text(
+        """
+CREATE TABLE public.users (
+    id bigint NOT NULL,
+    email text NOT NULL,
+    name text NOT NULL
+);
+ALTER TABLE ONLY public.users ADD CONSTRAINT users_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY public.users ADD CONSTRAINT users_email_key UNIQUE (email);
+"""
+    )
+    dumped = PgDumpAdapter().emit_ir(repo_path=str(tmp_path / "before.sql"))
+    models = SQLAlchemyAdapter().emit_ir(repo_path="examples/before", module_hint="models")
+    assert dumped.tables["users"].columns == models.tables["users"].columns
+    assert dumped.tables["users"].primary_key == models.tables["users"].primary_key
+    assert dumped.tables["users"].uniques == models.tables["users"].uniques
@@ -0,0 +1,74 @@
+import subprocess
+import sys
+from importlib.metadata import EntryPoint
+
+from schema_agent.core import registry
+from schema_agent.core.registry import AdapterRegistry
+
+
+def test_cli_import_defers_heavy_modules():
+    code = (
+        "import sys, schema_agent.cli\n"
+        "print(sorted(m for m in ('sqlalchemy', 'pydantic', 'yaml', 'schema_agent.core.ir') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+    # entry point discovery (importlib.metadata) waits for the first lookup of an unknown name
+    code = "import sys, schema_agent\nprint('importlib.metadata' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip() == "False"
+
+
+def test_lazy_refs_and_entry_point_discovery(monkeypatch):
+    monkeypatch.setattr(AdapterRegistry, "_registry", dict(AdapterRegistry._registry))
+    monkeypatch.setattr(registry, "_discovered", set())
+    plugin = EntryPoint(name="plugin", value="collections:OrderedDict", group=registry.ADAPTER_ENTRY_POINTS)
+    shadowed = EntryPoint(name="sqlalchemy", value="collections:Counter", group=registry.ADAPTER_ENTRY_POINTS)
+    monkeypatch.setattr("importlib.metadata.entry_points", lambda group: [plugin, shadowed] if group == plugin.group else [])
+
+    AdapterRegistry.register("lazy", "collections:defaultdict")
+    assert isinstance(AdapterRegistry._registry["lazy"], str)
+    from collections import OrderedDict, defaultdict
+
+    assert AdapterRegistry.get("lazy") is defaultdict
+    assert "plugin" not in AdapterRegistry.names(discover=False)
+    assert AdapterRegistry.get("plugin") is OrderedDict
+    # built-in registrations take precedence over same-named entry points
+    assert isinstance(AdapterRegistry._registry["sqlalchemy"], str)
+    assert AdapterRegistry.get("missing") is None
+
+
+def test_planner_op_handlers_and_table_hooks(monkeypatch):
+    from schema_agent.core.diff import Op, OpKind
+    from schema_agent.core.ir import IR
+    from schema_agent.core.planner.postgres import POSTGRES_OP_HANDLERS, plan_postgres
+    from schema_agent.core.registry import DialectRegistry
+
+    monkeypatch.setattr(DialectRegistry, "_op_handlers", {})
+    monkeypatch.setattr(DialectRegistry, "_table_hooks", {})
+    seen = []
+
+    def hot_table(ctx, table, ops):
+        seen.append((table, [op.kind for op in ops]))
+        if table != "events":
+            return ops
+        ctx.add_step(table, f"-- custom plan for {len(ops)} ops", phase="prep")
+        return []
+
+    def drop_column(ctx, op):
+        if op.table == "audit":
+            ctx.add_step(op.table, f"-- keep {op.payload['name']}", phase="finalize")
+        else:
+            POSTGRES_OP_HANDLERS[OpKind.DROP_COLUMN](ctx, op)
+
+    DialectRegistry.register_table_hook("postgresql", hot_table)
+    DialectRegistry.register_op_handler("postgresql", OpKind.DROP_COLUMN, drop_column)
+    ops = [
+        Op(kind=OpKind.DROP_COLUMN, table="events", payload={"name": "a"}),
+        Op(kind=OpKind.DROP_COLUMN, table="audit", payload={"name": "b"}),
+        Op(kind=OpKind.DROP_TABLE, table="events", payload={}),
+        Op(kind=OpKind.DROP_COLUMN, table="users", payload={"name": "c"}),
+    ]
+    ir = IR(dialect="postgresql", tables={})
+    sql = [s.sql for s in plan_postgres(ir, ir, ops, hints={})]
+    assert seen[0] == ("events", [OpKind.DROP_COLUMN, OpKind.DROP_TABLE])
+    assert sql == ["-- custom plan for 2 ops", "-- keep b", "ALTER TABLE users DROP COLUMN IF EXISTS c;"]
@@ -11,3 +11,301 @@ def test_topological_and_phase_order():
     assert ids.index("s1") < ids.index("s2")
 
 
+
+
+def test_step_graph_indexes_and_dedupes_dependencies():
+    from schema_agent.core.steps import StepGraph
+
+    graph = StepGraph([Step(id="s1", table="orders", sql="A", phase="backfill")])
+    graph.add(Step(id="s2", table="orders", sql="B", phase="tighten", depends_on=["s1"]))
+    graph.add(Step(id="s3", table="users", sql="C", phase="prep"))
+    graph.mark_backfill("orders", "s1")
+    graph.add_dependency("s2", "s1")
+    graph.add_dependency("s3", "s2")
+    assert graph["s2"].depends_on == ["s1"]
+    assert [s.id for s in graph.table_steps("orders")] == ["s1", "s2"]
+    assert graph.backfills("orders") == ["s1"] and graph.backfills("users") == []
+    assert [s.id for s in schedule_steps(graph)] == ["s1", "s2", "s3"]
+
+
+def test_coalesce_alter_table_merges_same_level_subcommands():
+    from schema_agent.core.diff import Op, OpKind
+    from schema_agent.core.ir import IR, Column
+    from schema_agent.core.planner.postgres import plan_postgres
+
+    ops = [
+        Op(kind=OpKind.RENAME_COLUMN, table="orders", payload={"from": "total", "to": "amount"}),
+        Op(kind=OpKind.ADD_COLUMN, table="orders", payload={"column": Column(name="note", data_type="text", nullable=True)}),
+        Op(kind=OpKind.ADD_COLUMN, table="orders", payload={"column": Column(name="tag", data_type="text", nullable=True)}),
+        Op(kind=OpKind.ALTER_COLUMN_TYPE, table="orders", payload={"name": "qty", "from": "integer", "to": "bigint"}),
+        Op(kind=OpKind.ALTER_COLUMN_TYPE, table="orders", payload={"name": "ref", "from": "integer", "to": "bigint"}),
+        Op(kind=OpKind.ALTER_NULLABLE, table="orders", payload={"name": "memo", "nullable": True}),
+        Op(kind=OpKind.ALTER_COLUMN_TYPE, table="users", payload={"name": "age", "from": "integer", "to": "bigint"}),
+    ]
+    ir = IR(dialect="postgresql", tables={})
+    plain = plan_postgres(ir, ir, ops, hints={})
+    steps = plan_postgres(ir, ir, ops, hints={"planner": {"coalesce_alter_table": True}})
+    assert len(plain) == 7 and len(steps) == 4
+    rename, add, alter, users = steps
+    assert rename.sql == "ALTER TABLE orders RENAME COLUMN total TO amount;"
+    assert add.sql == "ALTER TABLE orders\n  ADD COLUMN IF NOT EXISTS note text,\n  ADD COLUMN IF NOT EXISTS tag text;"
+    assert add.reverse_sql == "ALTER TABLE orders\n  DROP COLUMN IF EXISTS tag,\n  DROP COLUMN IF EXISTS note;"
+    assert alter.sql.count("TYPE bigint") == 2 and "DROP NOT NULL" in alter.sql
+    # the type changes roll back, DROP NOT NULL has no rollback SQL and is noted instead
+    notes, undo = alter.reverse_sql.split("\n", 1)
+    assert notes == "-- no rollback SQL (may be lossy): ALTER COLUMN memo DROP NOT NULL"
+    assert undo.startswith("ALTER TABLE orders\n") and undo.count("TYPE integer") == 2
+    assert add.depends_on == alter.depends_on == [rename.id]
+    assert users.sql == "ALTER TABLE users ALTER COLUMN age TYPE bigint USING age::bigint;"
+
+
+def test_coalesced_rollback_notes_name_each_member():
+    from schema_agent.core.diff import Op, OpKind
+    from schema_agent.core.ir import IR, Column, Table
+    from schema_agent.core.planner.postgres import plan_postgres
+
+    cols = {
+        "id": Column(name="id", data_type="bigint", nullable=False),
+        "a": Column(name="a", data_type="text", nullable=False, default="'x'"),
+        "c": Column(name="c", data_type="text", nullable=True, default="'y'"),
+    }
+    head = IR(dialect="postgresql", tables={"t": Table(name="t", columns=cols, primary_key=["id"])})
+    ops = [
+        Op(kind=OpKind.ADD_COLUMN, table="t", payload={"column": cols["a"]}),
+        Op(kind=OpKind.ALTER_DEFAULT, table="t", payload={"name": "c", "default": "'y'"}),
+    ]
+    steps = plan_postgres(head, head, ops, hints={"planner": {"coalesce_alter_table": True}})
+    merged = next(s for s in steps if "SET DEFAULT 'y'" in s.sql)
+    assert "SET DEFAULT 'x'" in merged.sql
+    # the first member has no rollback SQL; its note names its own action, read before the merge
+    assert merged.reverse_sql == (
+        "-- no rollback SQL (may be lossy): ALTER COLUMN a SET DEFAULT 'x'\nALTER TABLE t ALTER COLUMN c DROP DEFAULT;"
+    )
+
+
+def test_backfills_merged_into_one_update_per_table():
+    from schema_agent.core.diff import Op, OpKind
+    from schema_agent.core.ir import IR, Column, Table
+    from schema_agent.core.planner.postgres import plan_postgres
+
+    cols = {
+        "id": Column(name="id", data_type="bigint", nullable=False),
+        "status": Column(name="status", data_type="text", nullable=False, default="'new'"),
+        "score": Column(name="score", data_type="integer", nullable=False, default="0"),
+    }
+    head = IR(dialect="postgresql", tables={"orders": Table(name="orders", columns=cols, primary_key=["id"])})
+    ops = [
+        Op(kind=OpKind.ALTER_NULLABLE, table="orders", payload={"name": "status", "nullable": False}),
+        Op(kind=OpKind.ADD_COLUMN, table="orders", payload={"column": cols["score"]}),
+    ]
+    steps = plan_postgres(head, head, ops, hints={"planner": {"merge_backfills": True}})
+    backfills = [s for s in steps if s.phase == "backfill"]
+    assert [s.sql for s in backfills] == [
+        "UPDATE orders SET status = COALESCE(status, 'new'), score = COALESCE(score, 0) WHERE status IS NULL OR score IS NULL;"
+    ]
+    not_nulls = [s for s in steps if s.sql.endswith("SET NOT NULL;")]
+    assert len(not_nulls) == 2 and all(backfills[0].id in s.depends_on for s in not_nulls)
+    default = next(s for s in steps if "SET DEFAULT 0" in s.sql)
+    assert default.id in backfills[0].depends_on
+    assert [s.id for s in schedule_steps(steps)].index(default.id) < [s.id for s in schedule_steps(steps)].index(backfills[0].id)
+
+    unmerged = plan_postgres(head, head, ops, hints={})  # opt-in
+    assert len([s for s in unmerged if s.phase == "backfill"]) == 2
+
+
+def test_backfill_behind_a_shadow_swap_is_not_merged():
+    from schema_agent.core.diff import diff_ir
+    from schema_agent.core.ir import IR, Column, Table
+    from schema_agent.core.planner.postgres import plan_postgres
+
+    def ir(head):
+        cols = {
+            "id": Column(name="id", data_type="bigint", nullable=False),
+            "amount": Column(name="amount", data_type="NUMERIC" if head else "INTEGER", nullable=not head, default="0" if head else None),
+        }
+        if head:
+            cols["status"] = Column(name="status", data_type="TEXT", nullable=False, default="'new'")
+        return IR(dialect="postgresql", tables={"orders": Table(name="orders", columns=cols, primary_key=["id"])})
+
+    base, head = ir(False), ir(True)
+    hints = {"planner": {"shadow_type_changes": True, "merge_backfills": True}}
+    steps = plan_postgres(base, head, diff_ir(base, head, hints), hints)
+    by_id = {s.id: s for s in steps}
+    swap = next(s for s in steps if s.phase == "finalize" and "RENAME COLUMN amount TO" in s.sql)
+    status = next(s for s in steps if s.sql == "UPDATE orders SET status = 'new' WHERE status IS NULL;")
+    amount = next(s for s in steps if s.sql == "UPDATE orders SET amount = 0 WHERE amount IS NULL;")
+
+    def waits_on(step, target):
+        return any(d == target.id or waits_on(by_id[d], target) for d in step.depends_on)
+
+    # the status backfill does not wait for the finalize-phase swap; the amount one has to
+    assert not waits_on(status, swap) and waits_on(amount, swap)
+
+
+def test_batched_backfill_walks_primary_key_or_ctid_ranges():
+    from schema_agent.core.diff import Op, OpKind
+    from schema_agent.core.ir import IR, Column, Table
+    from schema_agent.core.planner.postgres import plan_postgres
+    from schema_agent.core.sqlgen.postgres import generate_postgres_sql
+
+    cols = {
+        "id": Column(name="id", data_type="bigint", nullable=False),
+        "status": Column(name="status", data_type="text", nullable=False, default="'new'"),
+    }
+    ops = [
+        Op(kind=OpKind.ALTER_NULLABLE, table="orders", payload={"name": "status", "nullable": False}),
+        Op(kind=OpKind.ALTER_NULLABLE, table="logs", payload={"name": "status", "nullable": False}),
+    ]
+    head = IR(dialect="postgresql", tables={
+        "orders": Table(name="orders", columns=dict(cols), primary_key=["id"]),
+        "logs": Table(name="logs", columns=dict(cols)),
+    })
+    hints = {
+        "planner": {"use_batched_backfill": True, "default_backfill_batch_rows": 1000, "backfill_sleep_ms": 250},
+        "dialect": {"postgres": {"target_version": "15"}},
+    }
+    steps = plan_postgres(head, head, ops, hints)
+    orders, logs = [s.sql for s in steps if s.phase == "backfill"]
+    assert "keyset over orders (id)" in orders
+    assert "SELECT id INTO _hi0 FROM orders WHERE id >= _lo0 ORDER BY id OFFSET _batch LIMIT 1;" in orders
+    assert "WHERE id >= _lo0 AND id < _hi0 AND status IS NULL;" in orders
+    assert "_sleep FLOAT := 0.25;" in orders and "_batch INT := 1000;" in orders
+    assert "ctid" not in orders
+    assert "ctid ranges over logs" in logs and "::tid" in logs
+    for sql in (orders, logs):
+        assert sql.count("COMMIT;") == 1 and "RAISE NOTICE" in sql
+    forward, _, _ = generate_postgres_sql(steps, hints)
+    assert forward.startswith("-- NOTE: This migration must run OUTSIDE a transaction due to batched backfills that COMMIT inside DO blocks.")
+
+    # before PostgreSQL 14 (or with no target version) ctid ranges would rescan the table per batch
+    for dialect in ({"postgres": {"target_version": "13.4"}}, {}):
+        logs = [s.sql for s in plan_postgres(head, head, ops, {**hints, "dialect": dialect}) if s.phase == "backfill"][1]
+        assert "ctid" not in logs.splitlines()[-1]
+        assert logs.endswith("\nUPDATE logs SET status = 'new' WHERE status IS NULL;")
+
+
+def test_table_stats_pick_strategy_per_table(tmp_path):
+    import json
+
+    from schema_agent.core.diff import Op, OpKind
+    from schema_agent.core.ir import IR, Column, Table
+    from schema_agent.core.planner.postgres import plan_postgres
+    from schema_agent.core.sqlgen.postgres import generate_postgres_sql
+    from schema_agent.policy.hints import compile_policy
+    from schema_agent.policy.stats import load_table_stats
+
+    csv_path = tmp_path / "stats.csv"
+    csv_path.write_text("schemaname,relname,reltuples,pg_relation_size,pg_indexes_size\npublic,events,2e9,900000000000,1\npublic,tags,-1,8192,0\n")
+    stats = load_table_stats(str(csv_path))
+    assert stats.get("public.events").row_count == 2_000_000_000 and stats.get("tags").row_count is None
+    json_path = tmp_path / "stats.json"
+    json_path.write_text(json.dumps({"events": {"row_count": 2000000000}, "tags": {"row_count": 40, "writes_per_sec": 2}}))
+    stats = load_table_stats(str(json_path))
+
+    cols = {
+        "id": Column(name="id", data_type="bigint", nullable=False),
+        "kind": Column(name="kind", data_type="text", nullable=False, default="'x'"),
+    }
+    head = IR(dialect="postgresql", tables={t: Table(name=t, columns=dict(cols), primary_key=["id"]) for t in ("events", "tags", "misc")})
+    ops = [Op(kind=OpKind.ALTER_NULLABLE, table=t, payload={"name": "kind", "nullable": False}) for t in ("events", "tags", "misc")]
+    hints = compile_policy({"planner": {"use_batched_backfill": True}}).with_table_stats(stats)
+    steps = plan_postgres(head, head, ops, hints)
+    by_table = {t: [s.sql for s in steps if s.table == t] for t in ("events", "tags", "misc")}
+    assert any("keyset over events" in sql for sql in by_table["events"])
+    assert any("CHECK (kind IS NOT NULL) NOT VALID" in sql for sql in by_table["events"])
+    assert "UPDATE tags SET kind = 'x' WHERE kind IS NULL;" in by_table["tags"]
+    assert not any("CHECK" in sql for sql in by_table["tags"])
+    assert any("keyset over misc" in sql for sql in by_table["misc"])  # no stats: global flags
+
+    summary = generate_postgres_sql(steps, hints)[2]["tables"]
+    assert summary["events"]["strategy"] == {"name": "large", "reason": "rows 2,000,000,000 >= 1,000,000"}
+    assert summary["tags"]["strategy"]["name"] == "small"
+    assert summary["misc"]["strategy"]["name"] == "flags"
+    assert "strategy" not in generate_postgres_sql(steps, {})[2]["tables"]["events"]
+
+
+def test_type_change_classifier():
+    from schema_agent.core.planner.pg_types import TypeChange, classify_type_change
+
+    metadata_only = [
+        ("VARCHAR(50)", "character varying(100)"),
+        ("varchar(50)", "text"),
+        ("text", "varchar"),
+        ("numeric(10,2)", "numeric(12, 2)"),
+        ("numeric(10,2)", "numeric"),
+        ("timestamp(3) with time zone", "timestamptz"),
+        ("cidr", "inet"),
+    ]
+    rewrite = [
+        ("integer", "bigint"),
+        ("varchar(100)", "varchar(50)"),
+        ("text", "varchar(20)"),
+        ("numeric(10,2)", "numeric(12,3)"),
+        ("char(5)", "char(10)"),
+        ("varchar(20)[]", "varchar(40)[]"),
+        ("json", "jsonb"),
+    ]
+    assert all(classify_type_change(a, b) == TypeChange.METADATA_ONLY for a, b in metadata_only)
+    assert all(classify_type_change(a, b) == TypeChange.REWRITE for a, b in rewrite)
+
+
+def test_rewriting_type_change_uses_shadow_column():
+    from schema_agent.core.diff import Op, OpKind
+    from schema_agent.core.ir import IR, Column, ForeignKey, Index, Table
+    from schema_agent.core.planner.postgres import plan_postgres
+    from schema_agent.core.sched import schedule_steps
+
+    seq = "nextval('users_id_seq'::regclass)"
+    users = Table(
+        name="users",
+        columns={
+            "id": Column(name="id", data_type="bigint", nullable=False, default=seq),
+            "email": Column(name="email", data_type="varchar(100)", nullable=True),
+        },
+        primary_key=["id"],
+        indexes={"ix_users_id_email": Index(name="ix_users_id_email", columns=["id", "email"])},
+    )
+    head = IR(dialect="postgresql", tables={"users": users})
+    ops = [
+        Op(kind=OpKind.ALTER_COLUMN_TYPE, table="users", payload={"name": "id", "from": "integer", "to": "bigint", "nullable": False, "default": seq}),
+        Op(kind=OpKind.ALTER_COLUMN_TYPE, table="users", payload={"name": "email", "from": "varchar(50)", "to": "varchar(100)"}),
+    ]
+    # without the setting (or table statistics) the in-place rewrite is kept
+    plain = plan_postgres(head, head, ops, hints={})
+    assert [s.sql for s in plain] == [
+        "ALTER TABLE users ALTER COLUMN id TYPE bigint USING id::bigint;",
+        "ALTER TABLE users ALTER COLUMN email TYPE varchar(100);",
+    ]
+    assert plain[1].reverse_sql == "ALTER TABLE users ALTER COLUMN email TYPE varchar(50) USING email::varchar(50);"
+
+    steps = schedule_steps(plan_postgres(head, head, ops, hints={"planner": {"shadow_type_changes": True}}))
+    sqls = [s.sql for s in steps]
+
+    def order(needle):
+        return next(i for i, sql in enumerate(sqls) if needle in sql)
+
+    assert order("ADD COLUMN id__new bigint") < order("CREATE TRIGGER users_id__sync") < order("SET id__new = id::bigint")
+    assert order("SET id__new = id::bigint") < order("ON users (id__new)") < order("RENAME COLUMN id__new TO id")
+    assert "ix_users_id_email__new ON users USING btree (id__new, email)" in sqls[order("ix_users_id_email__new")]
+    swap = steps[order("RENAME COLUMN id__new TO id")]
+    # the key constraint keeps whatever name it has in the database
+    assert "_key0 := (SELECT conname FROM pg_constraint WHERE conrelid = 'users'::regclass AND contype = 'p');" in swap.sql
+    assert "ADD CONSTRAINT %1$I PRIMARY KEY USING INDEX users_pkey__new', _key0);" in swap.sql
+    assert "users_pkey," not in swap.sql and "users_pkey " not in swap.sql
+    assert "ALTER SEQUENCE users_id_seq AS bigint OWNED BY users.id;" in swap.sql
+    assert "RENAME COLUMN id__old TO id" in swap.reverse_sql and "USING INDEX users_pkey__old" in swap.reverse_sql
+    drop_old = steps[order("DROP COLUMN IF EXISTS id__old")]
+    assert drop_old.destructive and order("DROP FUNCTION IF EXISTS users_id__sync()") < sqls.index(drop_old.sql)
+    assert "ALTER TABLE users ALTER COLUMN email TYPE varchar(100);" in sqls
+
+    # a foreign key pointing at the column keeps the in-place rewrite
+    head.tables["orders"] = Table(
+        name="orders",
+        columns={"user_id": Column(name="user_id", data_type="bigint", nullable=False)},
+        fks={"fk_orders_user": ForeignKey(name="fk_orders_user", columns=["user_id"], ref_table="users", ref_columns=["id"])},
+    )
+    steps = plan_postgres(head, head, ops[:1], hints={"planner": {"shadow_type_changes": True}})
+    assert [s.sql for s in steps] == [
+        "-- no shadow column: referenced by foreign key orders.fk_orders_user\n"
+        "ALTER TABLE users ALTER COLUMN id TYPE bigint USING id::bigint;"
+    ]
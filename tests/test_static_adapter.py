@@ -0,0 +1,89 @@
+from pathlib import Path
+
+from schema_agent.adapters.sqlalchemy.adapter import SQLAlchemyAdapter
+from schema_agent.adapters.sqlalchemy.static import StaticSQLAlchemyAdapter
+
+BASE = """
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+"""
+
+MIXINS = """
+import sqlalchemy as sa
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class Timestamped:
+    created_at = sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+    note: Mapped[str | None] = mapped_column(sa.Text)
+"""
+
+MODELS = """
+import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, CheckConstraint, Column, ForeignKey, Index, Numeric, String, Text, UniqueConstraint, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from .base import Base
+from .mixins import Timestamped
+
+
+class User(Timestamped, Base):
+    __tablename__ = "users"
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True)
+    nickname: Mapped[Optional[str]] = mapped_column(index=True)
+    born: Mapped[datetime.date]
+
+
+class Order(Base):
+    __tablename__ = "orders"
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(Text, nullable=False, server_default="pending")
+    amount = Column(Numeric(12, 2), nullable=False, server_default=text("0"))
+    user = relationship("User")
+    __table_args__ = (
+        UniqueConstraint("user_id", "status"),
+        CheckConstraint("amount >= 0", name="chk_orders_amount_pos"),
+        Index("ix_orders_status", "status", postgresql_using="hash"),
+    )
+
+
+Index("ix_orders_user_amount", Order.user_id, Order.amount)
+"""
+
+
+def _write_pkg(root: Path, name: str, models: str) -> None:
+    pkg = root / name
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("")
+    (pkg / "base.py").write_text(BASE)
+    (pkg / "mixins.py").write_text(MIXINS)
+    (pkg / "models.py").write_text(models)
+
+
+def test_static_ir_matches_imported_ir(tmp_path: Path):
+    _write_pkg(tmp_path, "staticpkg", MODELS)
+    imported = SQLAlchemyAdapter().emit_ir(repo_path=str(tmp_path), module_hint="staticpkg.models")
+    adapter = StaticSQLAlchemyAdapter()
+    static = adapter.emit_ir(repo_path=str(tmp_path), module_hint="staticpkg.models")
+    assert adapter.unresolved == []
+    assert static == imported
+
+
+def test_static_adapter_reports_unresolved_constructs(tmp_path: Path):
+    models = MODELS + """
+
+class Event(Base):
+    __tablename__ = "events"
+    id = Column(BigInteger, primary_key=True)
+    payload = Column(MyJsonType(), nullable=False)
+"""
+    _write_pkg(tmp_path, "staticpkg2", models)
+    adapter = StaticSQLAlchemyAdapter()
+    ir = adapter.emit_ir(repo_path=str(tmp_path), module_hint="staticpkg2.models")
+    assert "payload" not in ir.tables["events"].columns
+    assert any("Event.payload" in msg and "MyJsonType" in msg for msg in adapter.unresolved)
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from schema_agent.core.diff import diff_ir, iter_diff_ir
+from schema_agent.core.ir import IR, Column, Index, Table
+from schema_agent.core.planner.postgres import plan_postgres
+from schema_agent.core.sched import plan_stream, schedule_steps
+from schema_agent.core.sqlgen.postgres import generate_postgres_sql, write_postgres_sql
+
+
+def _ir(head: bool) -> IR:
+    tables = {}
+    for i in range(5):
+        cols = {"id": Column(name="id", data_type="bigint", nullable=False)}
+        cols["email" if not head or i % 2 else "email_address"] = Column(name="email", data_type="text", nullable=True)
+        if head and i != 3:
+            cols["created_at"] = Column(name="created_at", data_type="timestamp", nullable=False, default="now()")
+        indexes = {f"ix_t{i}_email": Index(name=f"ix_t{i}_email", columns=["email"])} if head and i == 1 else {}
+        tables[f"t{i}"] = Table(name=f"t{i}", columns=cols, primary_key=["id"], indexes=indexes)
+    if head:
+        tables["fresh"] = Table(name="fresh", columns={"id": Column(name="id", data_type="bigint", nullable=False)})
+    else:
+        tables["gone"] = Table(name="gone", columns={"k": Column(name="k", data_type="uuid", nullable=False)})
+    return IR(dialect="postgresql", tables=tables)
+
+
+def test_streamed_sql_matches_batch(tmp_path: Path):
+    base, head = _ir(False), _ir(True)
+    hints = {"planner": {"add_banner_for_non_txn": True}}
+    assert [op for ops in iter_diff_ir(base, head, hints) for op in ops] == diff_ir(base, head, hints)
+
+    forward, rollback, summary = generate_postgres_sql(schedule_steps(plan_postgres(base, head, diff_ir(base, head, hints), hints)), hints)
+    groups = plan_stream(plan_postgres, base, head, iter_diff_ir(base, head, hints), hints)
+    streamed = write_postgres_sql(groups, str(tmp_path / "forward.sql"), str(tmp_path / "rollback.sql"), hints)
+
+    assert forward.startswith("-- NOTE")
+    assert (tmp_path / "forward.sql").read_text() == forward
+    assert (tmp_path / "rollback.sql").read_text() == rollback
+    assert streamed == summary
+
+
+def test_streamed_sql_without_changes(tmp_path: Path):
+    ir = _ir(False)
+    groups = plan_stream(plan_postgres, ir, ir, iter_diff_ir(ir, ir, {}), {})
+    summary = write_postgres_sql(groups, str(tmp_path / "forward.sql"), str(tmp_path / "rollback.sql"), {})
+    assert summary == {"tables": {}, "unsafe": False}
+    assert (tmp_path / "forward.sql").read_text() == "-- no schema changes detected\n"
+
+
+def test_streamed_step_ids_match_batch_after_merges(tmp_path: Path):
+    def ir(head: bool) -> IR:
+        tables = {}
+        for name in ("a_orders", "b_users"):
+            cols = {"id": Column(name="id", data_type="bigint", nullable=False)}
+            if head:
+                # two NOT NULL columns with defaults: their backfills are merged into one step
+                cols["status"] = Column(name="status", data_type="text", nullable=False, default="'new'")
+                cols["score"] = Column(name="score", data_type="integer", nullable=False, default="0")
+                cols["memo"] = Column(name="memo", data_type="text", nullable=True)
+            tables[name] = Table(name=name, columns=cols, primary_key=["id"])
+        return IR(dialect="postgresql", tables=tables)
+
+    base, head = ir(False), ir(True)
+    hints = {"planner": {"coalesce_alter_table": True, "merge_backfills": True}}
+    batch = schedule_steps(plan_postgres(base, head, diff_ir(base, head, hints), hints))
+    streamed = [s for group in plan_stream(plan_postgres, base, head, iter_diff_ir(base, head, hints), hints) for s in group]
+    # batch scheduling interleaves the tables, so compare by id
+    assert {s.id: (s.depends_on, s.sql) for s in streamed} == {s.id: (s.depends_on, s.sql) for s in batch}
+    # the merges left gaps, which the streamed ids keep
+    assert len(batch) < max(int(s.id[1:]) for s in batch)
+
+    forward, rollback, _ = generate_postgres_sql(batch, hints)
+    write_postgres_sql(plan_stream(plan_postgres, base, head, iter_diff_ir(base, head, hints), hints), str(tmp_path / "f.sql"), str(tmp_path / "r.sql"), hints)
+    assert (tmp_path / "f.sql").read_text() == forward
+    assert (tmp_path / "r.sql").read_text() == rollback